@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""Asyncio HTTP/1.1 server for the web app routes (stdlib only).
+
+An alternative to ``web_app.main`` (one thread per connection) for many
+long-lived clients such as store tablets polling the dashboard. Each
+connection is a coroutine, so idle keep-alive clients cost a socket and a
+small buffer rather than an OS thread. Health checks, the HTML page and the
+unfiltered dashboard are answered on the event loop, the dashboard only once
+its body is encoded for the current snapshot (``publish`` encodes it on the
+refresher thread). Everything else, including a dashboard cache miss, runs in
+a bounded thread pool, and at most ``max_concurrency`` requests are in flight
+there at once; further requests wait without blocking the loop. A route that
+raises is answered with a 500 and the connection stays usable.
+
+Routing is ``web_app.dispatch``, so response bodies match the threaded server
+and the WSGI app. With ``--tenants-root`` requests are routed per tenant
+through ``tenant_registry.tenant_dispatch``; inline routes stay on the loop
+only for tenants that are already loaded and fresh.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import functools
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import web_app
+from pos_metrics import METRICS
+from pos_refresh import DataRefresher
+from tenant_registry import TenantRegistry, split_tenant, tenant_dispatch
+
+log = logging.getLogger(__name__)
+
+MAX_HEADER_BYTES = 16 * 1024
+MAX_BODY_BYTES = 1024 * 1024
+# Served on the event loop: static or cheap, no analytics work behind them.
+INLINE_ROUTES = {
+    ("GET", "/healthz"), ("GET", "/"), ("GET", "/index.html"), ("GET", "/api/stats"), ("GET", "/metrics"),
+}
+# Served on the event loop only when their snapshot body is already encoded: route -> body name.
+CACHED_ROUTES = {("GET", "/api/dashboard"): "dashboard"}
+
+
+class _BadRequest(Exception):
+    def __init__(self, status: int) -> None:
+        super().__init__(status)
+        self.status = status
+
+
+def _parse_head(head: bytes) -> Tuple[str, str, str, Dict[str, str]]:
+    try:
+        lines = head.decode("latin-1").split("\r\n")
+        method, target, version = lines[0].split(" ")
+    except ValueError:
+        raise _BadRequest(400) from None
+    headers: Dict[str, str] = {}
+    for line in lines[1:]:
+        if not line:
+            continue
+        name, sep, value = line.partition(":")
+        if not sep:
+            raise _BadRequest(400)
+        headers[name.strip().lower()] = value.strip()
+    return method.upper(), target, version.upper(), headers
+
+
+def _keep_alive(version: str, headers: Dict[str, str]) -> bool:
+    connection = headers.get("connection", "").lower()
+    if version == "HTTP/1.0":
+        return connection == "keep-alive"
+    return connection != "close"
+
+
+class AsyncApp:
+    """Serves the current ``AppState`` (or a ``TenantRegistry``'s tenants) over asyncio streams."""
+
+    def __init__(self, state: Optional[web_app.AppState], max_concurrency: int = 32,
+                 keepalive_timeout: float = 75.0, executor_threads: Optional[int] = None,
+                 registry: Optional[TenantRegistry] = None) -> None:
+        self.state = state
+        self.registry = registry
+        self.keepalive_timeout = keepalive_timeout
+        self.max_concurrency = max_concurrency
+        self.executor = ThreadPoolExecutor(
+            max_workers=executor_threads or max_concurrency, thread_name_prefix="pos-analytics"
+        )
+        self._limit: Optional[asyncio.Semaphore] = None
+        self.open_connections = 0
+
+    def publish(self, snapshot) -> None:
+        # Called from the refresher thread: encode the dashboard here rather than on the
+        # loop's first request, then one reference assignment swaps the state.
+        web_app.dashboard_body(snapshot)
+        self.state = self.state._replace(snapshot=snapshot)
+
+    @staticmethod
+    def _inline(state: web_app.AppState, method: str, route: str) -> bool:
+        if (method, route) in INLINE_ROUTES:
+            return True
+        name = CACHED_ROUTES.get((method, route))
+        return name is not None and web_app.snapshot_body_cached(state.snapshot, name)
+
+    async def _dispatch(self, method: str, path: str, query: str, body: bytes,
+                        headers: Dict[str, str]) -> web_app.Response:
+        if self.registry is None:
+            state, route = self.state, path
+            call = functools.partial(web_app.dispatch, state)
+        else:
+            tenant_id, route = split_tenant(path, headers)
+            state = self.registry.peek(tenant_id) if tenant_id else None
+            call = functools.partial(tenant_dispatch, self.registry)
+        if state is not None and not query and self._inline(state, method, route):
+            return web_app.dispatch(state, method, route, query, body, headers)
+        if self._limit is None:
+            self._limit = asyncio.Semaphore(self.max_concurrency)
+        async with self._limit:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, call, method, path, query, body, headers)
+
+    async def _read_request(self, reader: asyncio.StreamReader):
+        try:
+            head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), self.keepalive_timeout)
+        except asyncio.LimitOverrunError:
+            raise _BadRequest(431) from None
+        method, target, version, headers = _parse_head(head[:-4])
+        try:
+            length = int(headers.get("content-length", "0"))
+        except ValueError:
+            raise _BadRequest(400) from None
+        if length < 0:
+            raise _BadRequest(400)
+        if length > MAX_BODY_BYTES:
+            raise _BadRequest(413)
+        body = await reader.readexactly(length) if length else b""
+        return method, target, version, headers, body
+
+    @staticmethod
+    def _write(writer: asyncio.StreamWriter, response: web_app.Response, keep_alive: bool,
+               timeout: float, head_only: bool = False) -> None:
+        status = HTTPStatus(response.status)
+        lines = [f"HTTP/1.1 {status.value} {status.phrase}"]
+        lines += [f"{name}: {value}" for name, value in response.headers]
+        if keep_alive:
+            lines += ["Connection: keep-alive", f"Keep-Alive: timeout={int(timeout)}"]
+        else:
+            lines.append("Connection: close")
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+        if not head_only:
+            writer.write(response.body)
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.open_connections += 1
+        try:
+            while True:
+                try:
+                    method, target, version, headers, body = await self._read_request(reader)
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+                    return
+                except _BadRequest as exc:
+                    self._write(writer, web_app.json_response({"error": HTTPStatus(exc.status).phrase}, exc.status),
+                                False, self.keepalive_timeout)
+                    await writer.drain()
+                    return
+                path, _, query = target.partition("?")
+                head_only = method == "HEAD"
+                try:
+                    response = await self._dispatch("GET" if head_only else method, path, query, body, headers)
+                except Exception:
+                    log.exception("%s %s failed", method, path)
+                    response = web_app.json_response({"error": HTTPStatus(500).phrase}, 500)
+                keep_alive = _keep_alive(version, headers)
+                self._write(writer, response, keep_alive, self.keepalive_timeout, head_only)
+                await writer.drain()
+                if not keep_alive:
+                    return
+        except ConnectionError:
+            return
+        finally:
+            self.open_connections -= 1
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def start(self, host: str, port: int) -> asyncio.AbstractServer:
+        return await asyncio.start_server(self.handle, host, port, limit=MAX_HEADER_BYTES, backlog=1024)
+
+    def close(self) -> None:
+        self.executor.shutdown(wait=False)
+
+
+async def serve(app: AsyncApp, host: str, port: int) -> None:
+    server = await app.start(host, port)
+    sockname = server.sockets[0].getsockname()
+    print(f"Serving (asyncio) on http://{sockname[0]}:{sockname[1]}")
+    async with server:
+        await server.serve_forever()
+
+
+def main() -> None:
+    p = argparse.ArgumentParser()
+    p.add_argument("--data-dir", default="./data")
+    p.add_argument("--config", default="./data/sample_account.json")
+    p.add_argument("--host", default="0.0.0.0")
+    p.add_argument("--port", type=int, default=8000)
+    p.add_argument("--refresh-interval", type=float, default=0,
+                   help="Seconds between data dir polls for new/changed CSVs (0 disables)")
+    p.add_argument("--cache-dir", help="Normalized column cache dir (default: POS_CACHE_DIR or <data-dir>/.pos_cache)")
+    p.add_argument("--no-cache", action="store_true", help="Always parse CSVs; do not read or write the column cache")
+    p.add_argument("--workers", type=int, default=1, help="Parse CSV files in N processes")
+    p.add_argument("--sqlite", help="Serve KPIs from this SQLite database (sql/schema.sql), synced from --data-dir")
+    p.add_argument("--max-concurrency", type=int, default=32,
+                   help="Analytics requests (chat, dashboard) processed at once; others wait")
+    p.add_argument("--keepalive-timeout", type=float, default=75.0, help="Seconds an idle connection stays open")
+    p.add_argument("--executor-threads", type=int, help="Analytics thread pool size (default: --max-concurrency)")
+    p.add_argument("--tenants-root", help="Serve every tenant directory under this root instead of --data-dir")
+    p.add_argument("--memory-budget-mb", type=int, default=512,
+                   help="With --tenants-root: estimated memory for loaded tenants before LRU eviction")
+    p.add_argument("--profile-every", type=int, default=web_app.PROFILER.every,
+                   help="cProfile every Nth request into --profile-dir (0 disables; default PROFILE_EVERY)")
+    p.add_argument("--profile-dir", default=web_app.PROFILER.out_dir)
+    p.add_argument("--profile-memory", action="store_true", help="Also dump tracemalloc top allocations per sample")
+    args = p.parse_args()
+    web_app.configure_profiler(args.profile_every, args.profile_dir, args.profile_memory)
+
+    if args.tenants_root:
+        registry = TenantRegistry(args.tenants_root, args.memory_budget_mb * 1024 * 1024, args.refresh_interval,
+                                  cache_root=args.cache_dir, use_cache=not args.no_cache, workers=args.workers)
+        METRICS.collector(registry.collect)
+        app = AsyncApp(None, args.max_concurrency, args.keepalive_timeout, args.executor_threads, registry)
+    else:
+        cache_dir = None if args.no_cache else (args.cache_dir or web_app.default_cache_dir(args.data_dir))
+        state = web_app.load_state(args.data_dir, args.config if Path(args.config).exists() else None, cache_dir,
+                                   args.workers, args.sqlite)
+        app = AsyncApp(state, args.max_concurrency, args.keepalive_timeout, args.executor_threads)
+        if args.refresh_interval > 0:
+            DataRefresher(state.catalog, app.publish, args.refresh_interval).start()
+    try:
+        asyncio.run(serve(app, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        app.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""Compiled keyword matching and intent registry for chat routing.
+
+``KeywordMatcher`` is an Aho-Corasick automaton: every keyword, phrase and
+store name is found in one left-to-right pass over the message, whatever the
+number of patterns. A match only counts on word boundaries (the characters
+around it are not letters or digits), so ``tea-001`` does not match inside
+``tea-0011`` and ``table`` does not match inside ``vegetable``.
+
+``IntentRouter`` is the registry: each intent has keywords and a priority,
+the highest-priority intent whose keyword appears wins, and per-intent hit
+counts are kept for metrics. New intents register with the ``intent``
+decorator instead of growing an if-chain.
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import Counter, deque
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+Match = Tuple[int, int, object]
+
+
+def normalize_text(text: str) -> str:
+    """Lower-case and collapse whitespace, so phrases match however they were typed."""
+    return " ".join(text.lower().split())
+
+
+class KeywordMatcher:
+    """Aho-Corasick automaton over lower-case patterns, each carrying a payload."""
+
+    def __init__(self, patterns: Iterable[Tuple[str, object]]) -> None:
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[Tuple[int, object]]] = [[]]
+        for pattern, payload in patterns:
+            pattern = normalize_text(pattern)
+            if not pattern:
+                continue
+            node = 0
+            for ch in pattern:
+                nxt = self._goto[node].get(ch)
+                if nxt is None:
+                    nxt = self._goto[node][ch] = len(self._goto)
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                node = nxt
+            self._out[node].append((len(pattern), payload))
+        self._link()
+
+    def _link(self) -> None:
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self._goto[node].items():
+                queue.append(nxt)
+                f = self._fail[node]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                target = self._goto[f].get(ch, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def find(self, text: str) -> List[Match]:
+        """Whole-word matches in ``text`` (already normalized) as (start, end, payload)."""
+        goto, fail, outs = self._goto, self._fail, self._out
+        found: List[Match] = []
+        node = 0
+        last = len(text) - 1
+        for i, ch in enumerate(text):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if not outs[node]:
+                continue
+            after_ok = i == last or not text[i + 1].isalnum()
+            if not after_ok:
+                continue
+            for length, payload in outs[node]:
+                start = i - length + 1
+                if start == 0 or not text[start - 1].isalnum():
+                    found.append((start, i + 1, payload))
+        return found
+
+
+class Intent(NamedTuple):
+    name: str
+    keywords: Tuple[str, ...]
+    priority: int
+    handler: Callable[..., str]
+
+
+class IntentRouter:
+    """Registry of intents matched by keyword; lower priority numbers win."""
+
+    def __init__(self) -> None:
+        self.intents: Dict[str, Intent] = {}
+        self.counts: Counter = Counter()
+        self._lock = threading.Lock()
+        self._version = 0
+
+    def register(self, name: str, keywords: Sequence[str], priority: int, handler: Callable[..., str]) -> None:
+        self.intents[name] = Intent(name, tuple(keywords), priority, handler)
+        self._version += 1
+
+    def intent(self, name: str, keywords: Sequence[str] = (), priority: int = 100):
+        """Decorator form of :meth:`register`."""
+        def wrap(handler: Callable[..., str]) -> Callable[..., str]:
+            self.register(name, keywords, priority, handler)
+            return handler
+        return wrap
+
+    @property
+    def version(self) -> int:
+        """Bumped on every registration, so compiled matchers can be rebuilt."""
+        return self._version
+
+    def keyword_patterns(self) -> List[Tuple[str, object]]:
+        return [(kw, ("intent", intent.name)) for intent in self.intents.values() for kw in intent.keywords]
+
+    def pick(self, names: Iterable[str]) -> Optional[Intent]:
+        best: Optional[Intent] = None
+        for name in names:
+            intent = self.intents.get(name)
+            if intent is not None and (best is None or intent.priority < best.priority):
+                best = intent
+        return best
+
+    def record(self, name: str) -> None:
+        with self._lock:
+            self.counts[name] += 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.counts)
@@ -5,6 +5,15 @@ Now includes:
 - multi-store rollup and per-store drill-down
 - owner account config (bot name + store list)
 - SMS brief formatter
+- streaming ingestion (file -> rows -> normalized records -> aggregators)
+- per-file schema detection for mixed-vendor exports
+- columnar row store (see ``pos_columnar``) with array-based aggregation
+- optional NumPy aggregation engine (see ``pos_numpy``)
+- immutable analytics snapshot precomputed once per dataset
+- optional multi-process file parsing (``--workers``)
+- date-range and store filters served from a date/store partition index
+- prefix-sum rollups for 7/28-day trends and week-over-week comparisons
+- compiled intent router (see ``intent_router``) with store aliases
 """
 
 from __future__ import annotations
@@ -14,188 +23,999 @@ import csv
 import glob
 import json
 import os
+import itertools
+import re
+import sys
 from collections import defaultdict
-from datetime import datetime
-from typing import Dict, List, Optional
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from functools import lru_cache
+from operator import itemgetter
+from types import MappingProxyType
+from typing import Callable, Dict, Iterable, Iterator, List, Mapping, NamedTuple, Optional, Sequence, Set, Tuple
 
+import pos_columnar
+import pos_numpy
+from intent_router import IntentRouter, KeywordMatcher, normalize_text
+from pos_columnar import ColumnarRows, GroupTotals, StringTable
+from pos_costs import LABOR, WASTE, CostLedger
+from pos_dedup import Deduper, LineIndex, dedup_chunks
+from pos_distinct import DistinctCounter, HyperLogLog, hash_key
+from pos_forecast import DemandForecast, ItemForecast, fit as fit_forecast
+from pos_hourly import HourCell, HourGrid, dayparts, labor_heavy_hours
+from pos_inventory import load_inventory
+from pos_metrics import timed
+from pos_parse import (
+    BadValue, FieldParser, by_source, cents, match_column, match_columns, parse_time, to_number, write_report,
+)
+from pos_partition import PartitionIndex
+from pos_shifts import load_shifts
+from pos_trends import PrefixSums, WindowSums, pct_change
 
 DEFAULT_BOT_NAME = "Nomi"
+# "auto" uses NumPy for columnar aggregation when installed; "python" forces the stdlib kernels.
+AGGREGATION_ENGINE = os.getenv("POS_ENGINE", "auto")
+SOURCE_FILE_KEY = "_source_file"
+# Bump whenever normalization output changes; persisted column caches are keyed on it.
+PARSER_VERSION = 3
+# Items listed in a chat demand forecast; the prep list shows every item.
+FORECAST_LINES = 10
 
+# Normalized field -> header candidates, in match priority order.
+COLUMN_CANDIDATES: Dict[str, List[str]] = {
+    "date": ["date", "business_date", "day", "transaction_date"],
+    "store_id": ["store_id", "location_id", "store", "location"],
+    "revenue": ["revenue", "sales", "net_sales", "total_sales", "amount"],
+    "quantity": ["quantity", "qty", "items"],
+    "labor_cost": ["labor_cost", "labor", "staff_cost", "payroll"],
+    "waste_cost": ["waste", "waste_cost", "spoilage"],
+    "item_name": ["item", "menu_item", "product", "sku"],
+    "order_key": ["order_id", "ticket_id", "check_id", "receipt_id"],
+    "hour": ["order_ts", "order_time", "timestamp", "time", "opened_at", "created_at"],
+}
 
-def _match_col(cols: List[str], candidates: List[str]) -> Optional[str]:
-    lower_map = {c.lower().strip(): c for c in cols}
-    for key in candidates:
-        if key in lower_map:
-            return lower_map[key]
-    for c in cols:
-        cl = c.lower().strip()
-        for key in candidates:
-            if key in cl:
-                return c
-    return None
+
+# Kept under its old name for existing callers.
+_match_col = match_column
 
 
 def _to_float(v: str) -> float:
+    """Lenient ``to_number`` kept for existing callers: 0.0 instead of ValueError."""
     try:
-        return float(str(v).replace(",", "").strip())
-    except Exception:
+        return to_number(v)
+    except ValueError:
         return 0.0
 
 
+def _to_store(v: Optional[str]) -> str:
+    return str(v or "default-store")
+
+
+def _to_hour(v: Optional[str]) -> Optional[int]:
+    minutes = parse_time(v)
+    return None if minutes is None else minutes // 60
+
+
+def _date_hour(v: Optional[str]) -> Optional[int]:
+    """Hour from the time part of a date column, if any; a bad date is quarantined as a date only."""
+    if v is None or len(v) <= 10:
+        return None
+    try:
+        return _to_hour(v)
+    except ValueError:
+        return None
+
+
+# Converters raise ValueError for malformed values, which ``RowSchema.bind`` quarantines.
+# Dates are converted by the file's ``FieldParser`` (memoized per file).
+_FIELD_CONVERTERS: Dict[str, Callable[[Optional[str]], object]] = {
+    "store_id": _to_store,
+    "revenue": to_number,
+    "quantity": to_number,
+    "labor_cost": to_number,
+    "waste_cost": to_number,
+    "item_name": str,
+    "order_key": str,
+    "hour": _to_hour,
+}
+
+_FIELD_DEFAULTS: Dict[str, object] = {
+    "date": None,
+    "store_id": "default-store",
+    "revenue": 0.0,
+    "quantity": 1.0,
+    "labor_cost": 0.0,
+    "waste_cost": 0.0,
+    "item_name": "unknown",
+    "order_key": "",
+    "hour": None,
+}
+
+
+def _tuple_getter(keys: Sequence[object]) -> Callable[[Sequence[object]], Tuple[object, ...]]:
+    if not keys:
+        return lambda row: ()
+    if len(keys) == 1:
+        key = keys[0]
+        return lambda row: (row[key],)
+    return itemgetter(*keys)
+
+
+class RowSchema:
+    """Column mapping for one CSV header, resolved once and reused for every row.
+
+    ``by_index`` extracts from ``csv.reader`` lists and ``by_name`` from
+    ``csv.DictReader`` dicts; both return the mapped raw values as one tuple so
+    per-row work is a single C-level getter plus the field converters.
+    Schemas are shared across files; ``bind`` attaches one file's
+    ``FieldParser`` (date memo, quarantine) and returns its record builder.
+    """
+
+    def __init__(self, header: Tuple[str, ...]) -> None:
+        cols = list(header)
+        self.header = header
+        self.columns = match_columns(cols, COLUMN_CANDIDATES)
+        mapped = [(field, col) for field, col in self.columns.items() if col is not None]
+        self.has_order_col = self.columns["order_key"] is not None
+        # Without a time column, timestamps in the date column still give the hour.
+        self.hour_from_date = self.columns["hour"] is None and self.columns["date"] is not None
+        if self.hour_from_date:
+            mapped.append(("hour", self.columns["date"]))
+        self._fields = [(pos, field, col) for pos, (field, col) in enumerate(mapped)]
+        self.by_name = _tuple_getter([col for _, col in mapped])
+        self.by_index = _tuple_getter([cols.index(col) for _, col in mapped])
+
+    def bind(self, parser: FieldParser) -> Callable[[Tuple[object, ...], str, int], Dict[str, object]]:
+        """``record(raw, fallback_key, line)`` for rows of ``parser``'s file.
+
+        A malformed value keeps the field's default and is quarantined with
+        its line number.
+        """
+        special = {"date": parser.date, "hour": _date_hour if self.hour_from_date else _to_hour}
+        converters = [(pos, field, col, special.get(field) or _FIELD_CONVERTERS[field])
+                      for pos, field, col in self._fields]
+        has_order_col = self.has_order_col
+        bad = parser.bad
+
+        def record(raw: Tuple[object, ...], fallback_key: str, line: int = 0) -> Dict[str, object]:
+            rec = dict(_FIELD_DEFAULTS)
+            for pos, field, column, conv in converters:
+                try:
+                    rec[field] = conv(raw[pos])
+                except ValueError:
+                    bad(line, column, raw[pos])
+            if not has_order_col:
+                rec["order_key"] = fallback_key
+            return rec
+
+        return record
+
+
+@lru_cache(maxsize=256)
+def compile_schema(header: Tuple[str, ...]) -> RowSchema:
+    return RowSchema(header)
+
+
 def load_account_config(config_path: Optional[str]) -> Dict[str, object]:
     if not config_path:
-        return {"owner_name": "Owner", "bot_name": DEFAULT_BOT_NAME, "stores": []}
+        return {"owner_name": "Owner", "bot_name": DEFAULT_BOT_NAME, "stores": [], "store_aliases": {},
+                "sms_to": None, "store_sms_to": {}}
     with open(config_path, "r", encoding="utf-8") as fh:
         cfg = json.load(fh)
+    aliases = cfg.get("store_aliases") or {}
+    if not isinstance(aliases, dict):
+        raise ValueError("store_aliases must map alias -> store id")
+    store_sms_to = cfg.get("store_sms_to") or {}
+    if not isinstance(store_sms_to, dict):
+        raise ValueError("store_sms_to must map store id -> recipient")
     return {
         "owner_name": cfg.get("owner_name", "Owner"),
         "bot_name": cfg.get("bot_name", DEFAULT_BOT_NAME),
         "stores": cfg.get("stores", []),
+        "store_aliases": {str(alias).lower(): str(sid) for alias, sid in aliases.items()},
+        # Brief recipients (phone number or email-to-SMS address); stores fall back to sms_to.
+        "sms_to": cfg.get("sms_to") or None,
+        "store_sms_to": {str(sid): str(to) for sid, to in store_sms_to.items()},
     }
 
 
-def load_rows(data_dir: str) -> List[Dict[str, str]]:
+def csv_files(data_dir: str) -> List[str]:
     files = sorted(glob.glob(os.path.join(data_dir, "*.csv")))
     if not files:
         raise FileNotFoundError(f"No CSV files found in {data_dir}")
+    return files
 
-    rows: List[Dict[str, str]] = []
+
+def _iter_file_rows(files: List[str]) -> Iterator[Dict[str, str]]:
     for f in files:
+        source = os.path.basename(f)
         with open(f, newline="", encoding="utf-8") as fh:
-            reader = csv.DictReader(fh)
-            for r in reader:
-                r["_source_file"] = os.path.basename(f)
-                rows.append(r)
-    return rows
-
-
-def normalize(rows: List[Dict[str, str]]) -> List[Dict[str, object]]:
-    if not rows:
-        return []
-    cols = list(rows[0].keys())
-
-    date_col = _match_col(cols, ["date", "business_date", "day", "transaction_date"])
-    rev_col = _match_col(cols, ["revenue", "sales", "net_sales", "total_sales", "amount"])
-    qty_col = _match_col(cols, ["quantity", "qty", "items"])
-    labor_col = _match_col(cols, ["labor_cost", "labor", "staff_cost", "payroll"])
-    waste_col = _match_col(cols, ["waste", "waste_cost", "spoilage"])
-    item_col = _match_col(cols, ["item", "menu_item", "product", "sku"])
-    order_col = _match_col(cols, ["order_id", "ticket_id", "check_id", "receipt_id"])
-    store_col = _match_col(cols, ["store_id", "location_id", "store", "location"])
-
-    out: List[Dict[str, object]] = []
+            for r in csv.DictReader(fh):
+                r[SOURCE_FILE_KEY] = source
+                yield r
+
+
+def iter_rows(data_dir: str) -> Iterator[Dict[str, str]]:
+    """Lazily yield raw CSV rows; a missing CSV set raises before the first row is read."""
+    return _iter_file_rows(csv_files(data_dir))
+
+
+def load_rows(data_dir: str) -> List[Dict[str, str]]:
+    return list(iter_rows(data_dir))
+
+
+def iter_normalized(rows: Iterable[Dict[str, str]],
+                    quarantine: Optional[List[BadValue]] = None) -> Iterator[Dict[str, object]]:
+    """Normalize dict rows, resolving the column mapping per header signature.
+
+    Rows from different vendor exports can be mixed freely. When no order
+    column exists the row gets a synthetic key that is unique per source file.
+    Malformed values are appended to ``quarantine`` when given; their line
+    numbers assume one line per row, as ``DictReader`` does not report them.
+    """
+    per_source: Dict[str, int] = defaultdict(int)
+    parsers: Dict[Optional[str], FieldParser] = {}
+    # (header keys, source) -> (getter, record builder)
+    bound: Dict[Tuple[Tuple[object, ...], Optional[str]], tuple] = {}
     for i, r in enumerate(rows):
-        d = None
-        if date_col and r.get(date_col):
-            try:
-                d = datetime.fromisoformat(str(r[date_col])[:10]).date()
-            except Exception:
-                d = None
-
-        out.append(
-            {
-                "date": d,
-                "store_id": str(r.get(store_col, "default-store") or "default-store") if store_col else "default-store",
-                "revenue": _to_float(r.get(rev_col, "0")) if rev_col else 0.0,
-                "quantity": _to_float(r.get(qty_col, "1")) if qty_col else 1.0,
-                "labor_cost": _to_float(r.get(labor_col, "0")) if labor_col else 0.0,
-                "waste_cost": _to_float(r.get(waste_col, "0")) if waste_col else 0.0,
-                "item_name": str(r.get(item_col, "unknown")) if item_col else "unknown",
-                "order_key": str(r.get(order_col, i)) if order_col else str(i),
-            }
-        )
-    return out
+        source = r.get(SOURCE_FILE_KEY)
+        keys = tuple(r)
+        pair = bound.get((keys, source))
+        if pair is None:
+            schema = compile_schema(tuple(k for k in keys if k is not None and k != SOURCE_FILE_KEY))
+            parser = parsers.get(source)
+            if parser is None:
+                parser = parsers[source] = FieldParser(source or "", quarantine)
+            pair = bound[(keys, source)] = (schema.by_name, schema.bind(parser))
+        getter, record = pair
+        if source is None:
+            n = i
+            fallback = str(i)
+        else:
+            n = per_source[source]
+            fallback = f"{source}:{n}"
+            per_source[source] += 1
+        yield record(getter(r), fallback, n + 2)
 
 
-def metrics(rows: List[Dict[str, object]]) -> Dict[str, object]:
-    revenue = sum(float(r["revenue"]) for r in rows)
-    orders = len(set(str(r["order_key"]) for r in rows))
-    avg_order = revenue / orders if orders else 0.0
-    labor = sum(float(r["labor_cost"]) for r in rows)
-    waste = sum(float(r["waste_cost"]) for r in rows)
-    labor_ratio = (labor / revenue * 100) if revenue else 0.0
-    waste_ratio = (waste / revenue * 100) if revenue else 0.0
+def iter_file_records(path: str, quarantine: Optional[List[BadValue]] = None) -> Iterator[Dict[str, object]]:
+    """Parse one CSV straight into normalized records without building row dicts.
 
-    item_sales: Dict[str, float] = defaultdict(float)
-    for r in rows:
-        item_sales[str(r["item_name"])] += float(r["revenue"])
-    top_item = "n/a"
-    top_sales = 0.0
-    if item_sales:
-        top_item, top_sales = max(item_sales.items(), key=lambda x: x[1])
+    Malformed values are appended to ``quarantine`` (when given) as ``BadValue``s.
+    """
+    source = os.path.basename(path)
+    parser = FieldParser(source, quarantine)
+    with open(path, newline="", encoding="utf-8") as fh:
+        reader = csv.reader(fh)
+        header = next(reader, None)
+        if header is None:
+            return
+        schema = compile_schema(tuple(header))
+        width = len(header)
+        getter = schema.by_index
+        record = schema.bind(parser)
+        i = 0
+        for row in reader:
+            if not row:
+                continue
+            if len(row) < width:
+                row += [None] * (width - len(row))
+            yield record(getter(row), f"{source}:{i}", reader.line_num)
+            i += 1
+
+
+def iter_records(data_dir: str, quarantine: Optional[List[BadValue]] = None,
+                 deduper: Optional[Deduper] = None) -> Iterator[Dict[str, object]]:
+    """Normalized records for every CSV in ``data_dir``, one file schema at a time.
+
+    With a ``Deduper``, lines already seen in an earlier file are skipped and
+    counted in ``deduper.dropped``.
+    """
+    files = csv_files(data_dir)
+    if deduper is not None:
+        return (rec for f in files for rec in deduper.records(iter_file_records(f, quarantine), os.path.basename(f)))
+    return (rec for f in files for rec in iter_file_records(f, quarantine))
+
+
+@timed("normalize")
+def normalize(rows: Iterable[Dict[str, str]]) -> List[Dict[str, object]]:
+    return list(iter_normalized(rows))
+
+
+def parse_file_columns(path: str) -> ColumnarRows:
+    """Parse one CSV into a columnar chunk (module-level so process pools can pickle it).
+
+    The chunk carries the file's quarantined values in ``quarantine``.
+    """
+    bad: List[BadValue] = []
+    cols = ColumnarRows.from_records(iter_file_records(path, bad))
+    cols.quarantine = bad
+    return cols
+
+
+@timed("parse")
+def parse_files(paths: List[str], workers: int = 1) -> List[ColumnarRows]:
+    """Parse files into chunks, in ``paths`` order, optionally across processes.
+
+    Workers return compact columnar chunks (typed arrays + string tables), and
+    ``map`` keeps input order, so merging is deterministic and identical to the
+    serial path.
+    """
+    if workers > 1 and len(paths) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(paths))) as pool:
+            return list(pool.map(parse_file_columns, paths))
+    return [parse_file_columns(p) for p in paths]
+
+
+def load_columns(data_dir: str, workers: int = 1, dedup: bool = True,
+                 spill_dir: Optional[str] = None) -> ColumnarRows:
+    """Every CSV in ``data_dir`` as one columnar table, in file order.
+
+    Unless ``dedup`` is False, lines already present in an earlier file are
+    dropped (``pos_dedup``; its key index spills to ``spill_dir`` when given)
+    and counted per file in ``duplicates``.
+    """
+    paths = csv_files(data_dir)
+    chunks = parse_files(paths, workers)
+    if dedup:
+        with LineIndex(spill_dir) as index:
+            chunks = dedup_chunks(chunks, [os.path.basename(p) for p in paths], index)
+    return ColumnarRows.concat(chunks)
+
+
+def _row_cents(r: Dict[str, object]) -> Tuple[int, int, int]:
+    return cents(r["revenue"]), cents(r["labor_cost"]), cents(r["waste_cost"])
+
+
+class _KpiBucket:
+    """Running sums for one aggregation scope (all rows, one store or one day).
+
+    Money is summed in integer cents, like the columnar kernels, so both paths
+    return the same exact totals. ``orders`` is the bucket's own set of order keys, a ``HyperLogLog`` sketch,
+    or ``None`` when the owner counts orders itself (``KpiAccumulator``).
+    """
+
+    __slots__ = ("revenue", "labor", "waste", "orders", "item_sales")
+
+    def __init__(self, track_items: bool = True, track_orders: bool = True,
+                 sketch: Optional[HyperLogLog] = None) -> None:
+        self.revenue = 0
+        self.labor = 0
+        self.waste = 0
+        self.orders = sketch if sketch is not None else set() if track_orders else None
+        self.item_sales: Optional[Dict[str, int]] = defaultdict(int) if track_items else None
+
+    def add(self, r: Dict[str, object]) -> None:
+        self.add_cents(r, *_row_cents(r))
+
+    def add_cents(self, r: Dict[str, object], rev: int, lab: int, wst: int) -> None:
+        self.revenue += rev
+        self.labor += lab
+        self.waste += wst
+        if type(self.orders) is set:
+            self.orders.add(str(r["order_key"]))
+        if self.item_sales is not None:
+            self.item_sales[str(r["item_name"])] += rev
+
+    def absorb(self, other: "_KpiBucket") -> None:
+        """Add another bucket's sums and item sales (not its orders)."""
+        self.revenue += other.revenue
+        self.labor += other.labor
+        self.waste += other.waste
+        if self.item_sales is not None and other.item_sales is not None:
+            for item, sales in other.item_sales.items():
+                self.item_sales[item] += sales
 
+    def totals(self, orders: Optional[int] = None) -> GroupTotals:
+        top_item = "n/a"
+        top_sales = 0.0
+        if self.item_sales:
+            top_item, top_cents = max(self.item_sales.items(), key=lambda x: x[1])
+            top_sales = top_cents / 100
+        if orders is None:
+            orders = len(self.orders)
+        return GroupTotals(self.revenue / 100, self.labor / 100, self.waste / 100, orders, top_item, top_sales)
+
+    def metrics(self, orders: Optional[int] = None) -> Dict[str, object]:
+        return metrics_from_totals(self.totals(orders))
+
+
+def metrics_from_totals(t: GroupTotals) -> Dict[str, object]:
+    revenue = t.revenue
+    orders = t.orders
     return {
         "revenue": revenue,
         "orders": orders,
-        "avg_order": avg_order,
-        "labor": labor,
-        "waste": waste,
-        "labor_ratio": labor_ratio,
-        "waste_ratio": waste_ratio,
-        "top_item": top_item,
-        "top_sales": top_sales,
+        "avg_order": revenue / orders if orders else 0.0,
+        "labor": t.labor,
+        "waste": t.waste,
+        "labor_ratio": (t.labor / revenue * 100) if revenue else 0.0,
+        "waste_ratio": (t.waste / revenue * 100) if revenue else 0.0,
+        "top_item": t.top_item,
+        "top_sales": t.top_sales,
     }
 
 
-def store_metrics_map(rows: List[Dict[str, object]]) -> Dict[str, Dict[str, object]]:
-    grouped: Dict[str, List[Dict[str, object]]] = defaultdict(list)
+class KpiAccumulator:
+    """Single-pass aggregator feeding metrics, per-store metrics and the daily rollup.
+
+    Memory is bounded by the number of stores, days, items and distinct orders,
+    not by the number of rows, so records can be streamed straight from disk.
+
+    Order keys are interned once to integer codes and counted per store and
+    per day with ``DistinctCounter`` (about 5 bytes per order plus the key
+    itself), instead of one set of key strings per scope. With
+    ``distinct="hll"`` each store and day keeps a fixed-size ``HyperLogLog``
+    sketch instead: order counts (and so average order values) become
+    estimates within a couple of percent, memory no longer grows with the
+    number of orders, the chain-wide count is the merge of the store sketches,
+    and accumulators over separate inputs combine with :meth:`merge`.
+    """
+
+    def __init__(self, distinct: str = "exact", precision: int = 12) -> None:
+        if distinct not in ("exact", "hll"):
+            raise ValueError(f"unknown distinct mode {distinct!r} (expected 'exact' or 'hll')")
+        self.distinct = distinct
+        self.precision = precision
+        self.total = _KpiBucket(track_orders=False)
+        self.stores: Dict[str, _KpiBucket] = {}
+        self.days: Dict[object, _KpiBucket] = {}
+        self.row_count = 0
+        # Exact mode: interned order keys and per-store/per-day distinct counters,
+        # grouped by the store's/day's position in ``stores``/``days``.
+        self._order_keys = StringTable()
+        self._store_orders = DistinctCounter()
+        self._day_orders = DistinctCounter()
+        self._store_groups: Dict[str, int] = {}
+        self._day_groups: Dict[object, int] = {}
+
+    def _new_bucket(self, track_items: bool = True) -> _KpiBucket:
+        sketch = HyperLogLog(self.precision) if self.distinct == "hll" else None
+        return _KpiBucket(track_items, track_orders=False, sketch=sketch)
+
+    def add(self, r: Dict[str, object]) -> None:
+        self.row_count += 1
+        cents = _row_cents(r)
+        self.total.add_cents(r, *cents)
+        sid = str(r["store_id"])
+        bucket = self.stores.get(sid)
+        if bucket is None:
+            bucket = self.stores[sid] = self._new_bucket()
+            self._store_groups[sid] = len(self._store_groups)
+        bucket.add_cents(r, *cents)
+        d = r["date"]
+        day = None
+        if d is not None:
+            day = self.days.get(d)
+            if day is None:
+                day = self.days[d] = self._new_bucket(track_items=False)
+                self._day_groups[d] = len(self._day_groups)
+            day.add_cents(r, *cents)
+        key = str(r["order_key"])
+        if self.distinct == "hll":
+            h = hash_key(key)
+            bucket.orders.add_hash(h)
+            if day is not None:
+                day.orders.add_hash(h)
+            return
+        code = self._order_keys.code(key)
+        self._store_orders.add(self._store_groups[sid], code)
+        if day is not None:
+            self._day_orders.add(self._day_groups[d], code)
+
+    def add_costs(self, store_id: str, d: date, labor: int, waste: int) -> None:
+        """Add sourced labor/waste cents (``pos_costs``) to a store and day that already have sales."""
+        for bucket in (self.total, self.stores[store_id], self.days[d]):
+            bucket.labor += labor
+            bucket.waste += waste
+
+    def consume(self, records: Iterable[Dict[str, object]]) -> "KpiAccumulator":
+        for r in records:
+            self.add(r)
+        return self
+
+    def merge(self, other: "KpiAccumulator") -> "KpiAccumulator":
+        """Fold another ``distinct="hll"`` accumulator (e.g. over other files) into this one."""
+        if self.distinct != "hll" or other.distinct != "hll":
+            raise ValueError("only distinct='hll' accumulators can be merged")
+        self.row_count += other.row_count
+        self.total.absorb(other.total)
+        for mine, theirs, track_items in ((self.stores, other.stores, True), (self.days, other.days, False)):
+            for key, src in theirs.items():
+                dst = mine.get(key)
+                if dst is None:
+                    dst = mine[key] = self._new_bucket(track_items)
+                dst.absorb(src)
+                dst.orders.merge(src.orders)
+        return self
+
+    def _total_orders(self) -> int:
+        if self.distinct == "exact":
+            return len(self._order_keys)
+        sketch = HyperLogLog(self.precision)
+        for bucket in self.stores.values():
+            sketch.merge(bucket.orders)
+        return len(sketch)
+
+    def _orders_by(self, buckets: Dict, groups: Dict, counter: DistinctCounter) -> Dict[object, Optional[int]]:
+        if self.distinct == "hll":
+            return {key: None for key in buckets}
+        counts = counter.counts()
+        return {key: counts.get(groups[key], 0) for key in buckets}
+
+    def metrics(self) -> Dict[str, object]:
+        return self.total.metrics(self._total_orders())
+
+    def store_metrics(self) -> Dict[str, Dict[str, object]]:
+        orders = self._orders_by(self.stores, self._store_groups, self._store_orders)
+        return {store_id: bucket.metrics(orders[store_id]) for store_id, bucket in self.stores.items()}
+
+    def daily_totals(self) -> Dict[object, GroupTotals]:
+        orders = self._orders_by(self.days, self._day_groups, self._day_orders)
+        return {d: day.totals(orders[d]) for d, day in self.days.items()}
+
+    def daily_table(self) -> str:
+        return format_daily(self.daily_totals())
+
+
+def _engine():
+    if AGGREGATION_ENGINE != "python" and pos_numpy.AVAILABLE:
+        return pos_numpy
+    return pos_columnar
+
+
+def metrics(rows: Iterable[Dict[str, object]]) -> Dict[str, object]:
+    if isinstance(rows, ColumnarRows):
+        return metrics_from_totals(_engine().totals(rows))
+    bucket = _KpiBucket()
     for r in rows:
-        grouped[str(r["store_id"])].append(r)
-    return {store_id: metrics(store_rows) for store_id, store_rows in grouped.items()}
+        bucket.add(r)
+    return bucket.metrics()
 
 
-def top_action(m: Dict[str, object]) -> str:
+def store_metrics_map(rows: Iterable[Dict[str, object]]) -> Dict[str, Dict[str, object]]:
+    if isinstance(rows, ColumnarRows):
+        names = rows.stores.values
+        grouped = _engine().totals_by(rows, rows.store_codes)
+        return {names[code]: metrics_from_totals(t) for code, t in grouped.items()}
+    buckets: Dict[str, _KpiBucket] = {}
+    for r in rows:
+        sid = str(r["store_id"])
+        bucket = buckets.get(sid)
+        if bucket is None:
+            bucket = buckets[sid] = _KpiBucket()
+        bucket.add(r)
+    return {store_id: bucket.metrics() for store_id, bucket in buckets.items()}
+
+
+def top_action(m: Mapping[str, object], hours: Optional[Sequence[HourCell]] = None,
+               prep: Optional[Sequence[ItemForecast]] = None) -> str:
+    """The one thing to act on.
+
+    ``hours`` (the scope's 24 ``HourCell``s) pinpoints labor advice and
+    ``prep`` (tomorrow's ``ItemForecast``s) puts numbers on waste advice.
+    """
     if m["labor_ratio"] > 30:
+        heavy = labor_heavy_hours(hours) if hours else []
+        if heavy:
+            at = ", ".join(f"{c.hour:02d}:00 (${c.labor:,.0f} labor vs ${c.sales:,.0f} sales)" for c in heavy)
+            return f"Labor ratio is high. Review shift overlap at {at}."
         return "Labor ratio is high. Review shift overlap and overtime today."
     if m["waste_ratio"] > 5:
+        if prep:
+            top = ", ".join(f"{f.item} {f.prep}" for f in prep[:3])
+            return f"Waste is high. Prep to tomorrow's forecast: {top} (ask for the prep list)."
         return "Waste is high. Reduce prep volume for low-demand windows."
     if m["avg_order"] < 15:
         return "Average order is low. Test bundle/upsell prompts."
     return "KPIs look stable. Keep monitoring daily trend and item mix."
 
 
-def summary(m: Dict[str, object], scope: str = "all stores") -> str:
+def summary(m: Mapping[str, object], scope: str = "all stores", hours: Optional[Sequence[HourCell]] = None,
+            prep: Optional[Sequence[ItemForecast]] = None) -> str:
     return (
         f"Status ({scope}): Revenue ${m['revenue']:,.2f} from {m['orders']} orders. "
         f"Avg order ${m['avg_order']:,.2f}. Labor ratio {m['labor_ratio']:.1f}%. "
         f"Waste ratio {m['waste_ratio']:.1f}%. Top item: {m['top_item']} (${m['top_sales']:,.2f}).\n"
-        f"Top action: {top_action(m)}"
+        f"Top action: {top_action(m, hours, prep)}"
     )
 
 
-def sms_brief(m: Dict[str, object], bot_name: str) -> str:
-    return (
+def _fmt_change(current: float, previous: float) -> str:
+    change = pct_change(current, previous)
+    return "n/a" if change is None else f"{change:+.1f}%"
+
+
+def sms_brief(m: Mapping[str, object], bot_name: str, trends: Optional[PrefixSums] = None,
+              store_id: Optional[str] = None) -> str:
+    brief = (
         f"{bot_name}: Revenue ${m['revenue']:,.0f}; Labor {m['labor_ratio']:.1f}%; "
         f"Waste {m['waste_ratio']:.1f}%. Action: {top_action(m)}"
     )
+    if trends is None or trends.last is None:
+        return brief
+    week, prev_week = trends.trailing(7, store_id)
+    month, prev_month = trends.trailing(28, store_id)
+    return (
+        f"{brief} 7d ${week.revenue:,.0f} ({_fmt_change(week.revenue, prev_week.revenue)} WoW); "
+        f"28d ${month.revenue:,.0f} ({_fmt_change(month.revenue, prev_month.revenue)})."
+    )
 
 
-def daily_table(rows: List[Dict[str, object]]) -> str:
-    by_day: Dict[object, Dict[str, float]] = defaultdict(lambda: {"revenue": 0.0, "labor": 0.0, "waste": 0.0})
-    orders_by_day: Dict[object, set] = defaultdict(set)
+def _trend_line(label: str, current: WindowSums, previous: WindowSums) -> str:
+    def ratio(field: str) -> str:
+        delta = f"{current.ratio(field) - previous.ratio(field):+.1f} pts" if previous.revenue else "n/a"
+        return f"{field} {current.ratio(field):.1f}% ({delta})"
+
+    return (
+        f"{label} {current.date_from} to {current.date_to}: Revenue ${current.revenue:,.2f} "
+        f"({_fmt_change(current.revenue, previous.revenue)}), {current.orders} orders "
+        f"({_fmt_change(current.orders, previous.orders)}), {ratio('labor')}, {ratio('waste')}."
+    )
+
+
+def trend_report(trends: PrefixSums, store_id: Optional[str] = None, end: Optional[date] = None,
+                 windows: Sequence[int] = (7, 28)) -> str:
+    """Each trailing window ending at ``end`` against the window before it."""
+    if trends.last is None:
+        return "No valid date column detected in CSVs."
+    scope = f"store {store_id}" if store_id is not None else "all stores"
+    lines = [f"Trends ({scope}, change vs the prior period):"]
+    for days in windows:
+        lines.append(_trend_line(f"{days}d", *trends.trailing(days, store_id, end)))
+    return "\n".join(lines)
+
+
+def format_hourly(cells: Sequence[HourCell], scope: str = "all stores") -> str:
+    """Hour-by-hour sales vs staffing, daypart rollup and labor-heavy hours."""
+    active = [c for c in cells if c.active()]
+    if not active:
+        return (f"No timed sales or shifts for {scope}. Hourly answers need an order time column "
+                "(or timestamps in the date column) and shift exports in shifts/.")
+    staffed = any(c.staff_hours for c in active)
+    lines = [f"Sales vs labor by hour ({scope}):", "hour     sales  orders  staff_h  labor%"]
+    for c in active:
+        labor = f"{c.labor_ratio:6.1f}%" if staffed and c.sales else "      -"
+        lines.append(f"{c.hour:02d}:00 {c.sales:9.2f} {c.orders:7d} {c.staff_hours:8.1f} {labor}")
+    parts = [f"{name} ${part.sales:,.0f}" + (f" ({part.labor_ratio:.0f}% labor)" if staffed and part.sales else "")
+             for name, part in dayparts(cells) if part.active()]
+    lines.append("Dayparts: " + ", ".join(parts))
+    heavy = labor_heavy_hours(cells)
+    if heavy:
+        lines.append("Labor-heavy hours: " + ", ".join(f"{c.hour:02d}:00" for c in heavy))
+    elif not staffed:
+        lines.append("No shift exports yet; add them under shifts/ to compare labor by hour.")
+    return "\n".join(lines)
 
-    for r in rows:
-        d = r["date"]
-        if d is None:
-            continue
-        by_day[d]["revenue"] += float(r["revenue"])
-        by_day[d]["labor"] += float(r["labor_cost"])
-        by_day[d]["waste"] += float(r["waste_cost"])
-        orders_by_day[d].add(str(r["order_key"]))
 
+def format_forecast(items: Sequence[ItemForecast], day: date, forecast: DemandForecast, scope: str = "all stores",
+                    prep: bool = False) -> str:
+    """Forecast units per item for one day, or with ``prep`` the full prep list."""
+    if not items:
+        return (f"No demand to forecast for {scope} on {day.isoformat()}. Forecasts cover the "
+                f"{len(forecast.days())} days after the last business date in the data.")
+    title = "Prep list" if prep else "Demand forecast"
+    lines = [f"{title} for {day:%a} {day.isoformat()} ({scope}), from {forecast.history} day(s) of history:"]
+    if prep:
+        lines.append("item                 forecast   prep")
+        lines += [f"{f.item[:20]:20} {f.units:8.1f} {f.prep:6d}" for f in items]
+        lines.append("Prep covers the forecast plus its typical daily miss.")
+    else:
+        lines += [f"{f.item[:20]:20} {f.units:8.1f} units" for f in items[:FORECAST_LINES]]
+        total = sum(f.units for f in items)
+        models = ", ".join(f"{n} {name.replace('_', ' ')}" for name, n in forecast.model_counts().items())
+        lines.append(f"Total {total:,.1f} units across {len(items)} item(s). Models: {models}.")
+    return "\n".join(lines)
+
+
+def format_daily(by_day: Dict[object, GroupTotals]) -> str:
     if not by_day:
         return "No valid date column detected in CSVs."
 
     lines = ["date        revenue   orders  avg_order labor   waste"]
     for d in sorted(by_day.keys()):
-        orders = len(orders_by_day[d])
-        rev = by_day[d]["revenue"]
+        day = by_day[d]
+        orders = day.orders
+        rev = day.revenue
         avg = rev / orders if orders else 0.0
-        lines.append(f"{d}  {rev:8.2f} {orders:7d} {avg:9.2f} {by_day[d]['labor']:7.2f} {by_day[d]['waste']:7.2f}")
+        lines.append(f"{d}  {rev:8.2f} {orders:7d} {avg:9.2f} {day.labor:7.2f} {day.waste:7.2f}")
     return "\n".join(lines)
 
 
-def diagram(m: Dict[str, object]) -> str:
+def daily_totals(rows: Iterable[Dict[str, object]]) -> Dict[object, GroupTotals]:
+    """Per-day totals (no top item) for rows with a valid date."""
+    if isinstance(rows, ColumnarRows):
+        grouped = _engine().totals_by(rows, rows.dates, track_items=False, skip=0)
+        return {date.fromordinal(d): t for d, t in grouped.items()}
+    by_day: Dict[object, _KpiBucket] = {}
+    for r in rows:
+        d = r["date"]
+        if d is None:
+            continue
+        day = by_day.get(d)
+        if day is None:
+            day = by_day[d] = _KpiBucket(track_items=False)
+        day.add(r)
+    return {d: day.totals() for d, day in by_day.items()}
+
+
+def daily_table(rows: Iterable[Dict[str, object]]) -> str:
+    return format_daily(daily_totals(rows))
+
+
+class QueryFilter(NamedTuple):
+    """Optional store and inclusive business-date bounds for a KPI query."""
+
+    store_id: Optional[str] = None
+    date_from: Optional[date] = None
+    date_to: Optional[date] = None
+
+    def active(self) -> bool:
+        return self.store_id is not None or self.dated()
+
+    def dated(self) -> bool:
+        return self.date_from is not None or self.date_to is not None
+
+    def merged(self, other: "QueryFilter") -> "QueryFilter":
+        """This filter with every field ``other`` sets taken from ``other``."""
+        return QueryFilter(*(b if b is not None else a for a, b in zip(self, other)))
+
+    def matches(self, r: Mapping[str, object]) -> bool:
+        if self.store_id is not None and str(r["store_id"]) != self.store_id:
+            return False
+        if not self.dated():
+            return True
+        d = r["date"]
+        if d is None:
+            return False
+        return (self.date_from is None or d >= self.date_from) and (self.date_to is None or d <= self.date_to)
+
+    def scope(self) -> str:
+        parts = [f"store {self.store_id}" if self.store_id is not None else "all stores"]
+        if self.date_from is not None and self.date_from == self.date_to:
+            parts.append(str(self.date_from))
+        elif self.dated():
+            parts.append(f"{self.date_from or 'start'} to {self.date_to or 'latest'}")
+        return ", ".join(parts)
+
+
+_ISO_DATE_RE = re.compile(r"\b(\d{4}-\d{2}-\d{2})\b")
+_LAST_DAYS_RE = re.compile(r"\b(?:last|past)\s+(\d+)\s+days?\b")
+_RELATIVE_DATE_RE = re.compile(r"\b(?:yesterday|last|past)\b")
+
+
+def _iso_dates(ql: str) -> List[date]:
+    out = []
+    for s in _ISO_DATE_RE.findall(ql):
+        try:
+            out.append(date.fromisoformat(s))
+        except ValueError:
+            continue
+    return out
+
+
+def _date_window(ql: str, latest: Optional[date]) -> Tuple[Optional[date], Optional[date]]:
+    date_from = date_to = None
+    dates = _iso_dates(ql)
+    if len(dates) >= 2:
+        date_from, date_to = min(dates), max(dates)
+    elif dates:
+        date_from = dates[0]
+        if not re.search(r"\b(?:since|from|after)\b", ql):
+            date_to = dates[0]
+    elif latest is not None:
+        days = _LAST_DAYS_RE.search(ql)
+        if days:
+            date_from, date_to = latest - timedelta(days=max(1, int(days.group(1))) - 1), latest
+        elif re.search(r"\b(?:last|past) week\b", ql):
+            date_from, date_to = latest - timedelta(days=6), latest
+        elif "yesterday" in ql:
+            date_from = date_to = latest - timedelta(days=1)
+    return date_from, date_to
+
+
+def parse_query_filter(q: str, store_ids: Sequence[str], latest: Optional[date],
+                       aliases: Optional[Mapping[str, str]] = None) -> QueryFilter:
+    """Store and date window named in a chat message.
+
+    Explicit ISO dates win (one date = that day, two = a range, ``since``/``from``
+    + one date = open-ended). Relative phrases (``yesterday``, ``last N days``,
+    ``last week``) count back from ``latest``, the newest business date in the
+    data, so answers stay meaningful for exports that lag the calendar.
+    """
+    scan = _scan(q, store_ids, aliases)
+    return QueryFilter(scan.store, *_date_window(scan.text, latest))
+
+
+def filter_from_params(params: Mapping[str, str]) -> QueryFilter:
+    """QueryFilter from ``store``/``from``/``to`` request parameters (ISO dates).
+
+    Raises ValueError for a malformed date.
+    """
+    def day(key: str) -> Optional[date]:
+        value = (params.get(key) or "").strip()
+        return date.fromisoformat(value) if value else None
+
+    store = (params.get("store") or "").strip() or None
+    return QueryFilter(store, day("from"), day("to"))
+
+
+def filter_records(records: Iterable[Dict[str, object]], flt: QueryFilter) -> Iterator[Dict[str, object]]:
+    if not flt.active():
+        return iter(records)
+    return (r for r in records if flt.matches(r))
+
+
+_snapshot_versions = itertools.count(1)
+
+
+@dataclass(frozen=True)
+class AnalyticsSnapshot:
+    """Every aggregate the bot answers from, computed once per dataset.
+
+    Readers never regroup rows, so answer latency does not depend on dataset
+    size. Servers replace the whole snapshot rather than mutating it.
+    """
+
+    rows: Iterable[Dict[str, object]]
+    metrics: Mapping[str, object]
+    store_metrics: Mapping[str, Mapping[str, object]]
+    daily: Mapping[object, GroupTotals]
+    daily_table: str
+    stores: Tuple[str, ...]
+    trends: Optional[PrefixSums] = None
+    # PartitionIndex, or any object with the same window queries (e.g. pos_sqlite.SqliteStore).
+    index: Optional[PartitionIndex] = None
+    # Store x day x hour grid; None when the data has neither order times nor shifts.
+    hourly: Optional[HourGrid] = None
+    # Labor/waste booked from shift and inventory exports; None when there are neither.
+    costs: Optional[CostLedger] = None
+    version: int = field(default_factory=lambda: next(_snapshot_versions))
+    # Built on first use (forecast, encoded response bodies) and dropped with the snapshot,
+    # so every tenant keeps its own.
+    derived: Dict[object, object] = field(default_factory=dict, compare=False, repr=False)
+
+
+@timed("snapshot")
+def build_snapshot(rows: Iterable[Dict[str, object]], m: Optional[Mapping[str, object]] = None,
+                   shifts: Iterable = (), inventory: Iterable = ()) -> AnalyticsSnapshot:
+    """Snapshot of ``rows``.
+
+    ``shifts`` (``pos_shifts.Shift``) add staffing to the hourly grid. They
+    and ``inventory`` (``pos_inventory.InventoryCount``) replace the rows'
+    labor and waste where they cover them (``pos_costs``); ``m`` is then
+    recomputed.
+    """
+    shifts = list(shifts)
+    cols = rows if isinstance(rows, ColumnarRows) else ColumnarRows.from_records(rows)
+    costs = CostLedger(shifts, inventory)
+    if costs:
+        rows = cols = costs.apply(cols)
+        m = None
+    if m is None:
+        m = metrics(rows)
+    hourly = HourGrid.build(cols, shifts)
+    return make_snapshot(rows, m, store_metrics_map(rows), daily_totals(rows), PartitionIndex(cols),
+                         hourly if hourly else None, costs if costs else None)
+
+
+def make_snapshot(
+    rows: Iterable[Dict[str, object]],
+    m: Mapping[str, object],
+    smap: Mapping[str, Mapping[str, object]],
+    daily: Dict[object, GroupTotals],
+    index: Optional[PartitionIndex] = None,
+    hourly: Optional[HourGrid] = None,
+    costs: Optional[CostLedger] = None,
+) -> AnalyticsSnapshot:
+    """Freeze precomputed aggregates from any backend into a snapshot."""
+    by_store = index.daily_by_store() if index is not None else {}
+    return AnalyticsSnapshot(
+        rows=rows,
+        metrics=MappingProxyType(dict(m)),
+        store_metrics=MappingProxyType({sid: MappingProxyType(dict(sm)) for sid, sm in smap.items()}),
+        daily=MappingProxyType(daily),
+        daily_table=format_daily(daily),
+        stores=tuple(sorted(smap.keys())),
+        trends=PrefixSums({None: daily, **by_store}),
+        index=index,
+        hourly=hourly,
+        costs=costs,
+    )
+
+
+def latest_date(rows: Iterable[Dict[str, object]], snapshot: Optional[AnalyticsSnapshot] = None) -> Optional[date]:
+    """Newest business date in the data; relative chat dates count back from it."""
+    if snapshot is not None:
+        if snapshot.index is not None:
+            bounds = snapshot.index.date_bounds()
+            return bounds[1] if bounds else None
+        return max(snapshot.daily) if snapshot.daily else None
+    if isinstance(rows, ColumnarRows):
+        latest = max(rows.dates, default=0)
+        return date.fromordinal(latest) if latest else None
+    return max((r["date"] for r in rows if r["date"] is not None), default=None)
+
+
+def window_metrics(flt: QueryFilter, rows: Iterable[Dict[str, object]],
+                   snapshot: Optional[AnalyticsSnapshot] = None) -> Mapping[str, object]:
+    """KPIs for one store and/or date window; the snapshot index avoids a row scan."""
+    if snapshot is not None:
+        if not flt.active():
+            return snapshot.metrics
+        if not flt.dated() and flt.store_id in snapshot.store_metrics:
+            return snapshot.store_metrics[flt.store_id]
+        if snapshot.index is not None:
+            return metrics_from_totals(snapshot.index.totals(*flt))
+        rows = snapshot.rows
+    return metrics(filter_records(rows, flt))
+
+
+def window_store_metrics(flt: QueryFilter, rows: Iterable[Dict[str, object]],
+                         snapshot: Optional[AnalyticsSnapshot] = None) -> Mapping[str, Mapping[str, object]]:
+    if snapshot is not None and not flt.dated():
+        smap = snapshot.store_metrics
+    elif snapshot is not None and snapshot.index is not None:
+        smap = {sid: metrics_from_totals(t) for sid, t in snapshot.index.store_totals(flt.date_from, flt.date_to).items()}
+    else:
+        smap = store_metrics_map(filter_records(snapshot.rows if snapshot is not None else rows, flt._replace(store_id=None)))
+    if flt.store_id is None:
+        return smap
+    return {sid: sm for sid, sm in smap.items() if sid == flt.store_id}
+
+
+def window_trends(rows: Iterable[Dict[str, object]], snapshot: Optional[AnalyticsSnapshot] = None,
+                  store_id: Optional[str] = None) -> PrefixSums:
+    """The snapshot's prefix sums, or ones built from ``rows`` for a single scope."""
+    if snapshot is not None and snapshot.trends is not None:
+        return snapshot.trends
+    daily = daily_totals(filter_records(snapshot.rows if snapshot is not None else rows, QueryFilter(store_id)))
+    return PrefixSums({store_id: daily})
+
+
+def window_daily(flt: QueryFilter, rows: Iterable[Dict[str, object]],
+                 snapshot: Optional[AnalyticsSnapshot] = None) -> Mapping[object, GroupTotals]:
+    if snapshot is not None:
+        if not flt.active():
+            return snapshot.daily
+        if snapshot.index is not None:
+            return snapshot.index.daily_totals(*flt)
+        rows = snapshot.rows
+    return daily_totals(filter_records(rows, flt))
+
+
+def window_hours(flt: QueryFilter, rows: Iterable[Dict[str, object]],
+                 snapshot: Optional[AnalyticsSnapshot] = None) -> Optional[List[HourCell]]:
+    """The 24 hourly cells for ``flt`` from the snapshot's grid (a grid of ``rows`` without one)."""
+    if snapshot is not None:
+        return snapshot.hourly.by_hour(*flt) if snapshot.hourly is not None else None
+    cols = rows if isinstance(rows, ColumnarRows) else ColumnarRows.from_records(rows)
+    grid = HourGrid.build(cols)
+    return grid.by_hour(*flt) if grid else None
+
+
+def window_forecast(rows: Iterable[Dict[str, object]],
+                    snapshot: Optional[AnalyticsSnapshot] = None) -> DemandForecast:
+    """Demand forecast of the data, fitted on first use once per snapshot (``pos_forecast``)."""
+    if snapshot is None:
+        return fit_forecast(rows if isinstance(rows, ColumnarRows) else ColumnarRows.from_records(rows))
+    forecast = snapshot.derived.get("forecast")
+    if forecast is None:
+        rows = snapshot.rows
+        forecast = fit_forecast(rows if isinstance(rows, ColumnarRows) else ColumnarRows.from_records(rows))
+        snapshot.derived["forecast"] = forecast
+    return forecast
+
+
+def forecast_day(forecast: DemandForecast, flt: QueryFilter) -> Optional[date]:
+    """The filter's first date when the forecast covers it, else the first forecast day."""
+    if flt.date_from is not None and flt.date_from in forecast.days():
+        return flt.date_from
+    return forecast.first
+
+
+def diagram(m: Mapping[str, object]) -> str:
     def bar(pct: float) -> str:
         n = max(0, min(20, int(round(pct / 5))))
         return "█" * n + "░" * (20 - n)
@@ -207,40 +1027,274 @@ def diagram(m: Dict[str, object]) -> str:
     )
 
 
-def _parse_store_request(q: str, store_ids: List[str]) -> Optional[str]:
-    ql = q.lower()
-    if "store" not in ql:
-        return None
-    for sid in store_ids:
-        if sid.lower() in ql:
-            return sid
-    return None
-
-
-def respond(q: str, m: Dict[str, object], rows: List[Dict[str, object]], bot_name: str) -> str:
-    ql = q.lower()
-    smap = store_metrics_map(rows)
-    requested_store = _parse_store_request(q, list(smap.keys()))
-    if requested_store:
-        return summary(smap[requested_store], scope=f"store {requested_store}")
-
-    if any(k in ql for k in ["status", "summary", "how did", "insight"]):
-        return summary(m)
-    if "labor" in ql:
-        return f"Labor cost ${m['labor']:,.2f} ({m['labor_ratio']:.1f}% of revenue)."
-    if "waste" in ql:
-        return f"Waste cost ${m['waste']:,.2f} ({m['waste_ratio']:.1f}% of revenue)."
-    if "top" in ql and "item" in ql:
-        return f"Top item is {m['top_item']} at ${m['top_sales']:,.2f}."
-    if "table" in ql or "detail" in ql:
-        return "\n" + daily_table(rows)
-    if "diagram" in ql or "chart" in ql:
-        return "\n" + diagram(m)
-    if "sms" in ql:
-        return sms_brief(m, bot_name)
-    if "stores" in ql:
-        return "Known stores: " + ", ".join(sorted(smap.keys()))
-    return "Ask me: status, store <id> status, labor, waste, top item, table, diagram, sms."
+ROUTER = IntentRouter()
+# Words that make a bare store id count as a store filter ("store tea-001", "at la-burbank").
+_STORE_HINTS = ("store", "stores", "at", "for")
+
+
+@lru_cache(maxsize=32)
+def _compiled_matcher(router_version: int, store_ids: Tuple[str, ...],
+                      aliases: Tuple[Tuple[str, str], ...]) -> KeywordMatcher:
+    patterns = ROUTER.keyword_patterns()
+    patterns += [(word, ("hint",)) for word in _STORE_HINTS]
+    patterns += [(sid, ("store", sid)) for sid in store_ids]
+    patterns += [(alias, ("alias", sid)) for alias, sid in aliases]
+    return KeywordMatcher(patterns)
+
+
+class _Scan(NamedTuple):
+    text: str
+    intents: List[str]
+    store: Optional[str]
+    hinted: bool
+
+
+def _scan(q: str, store_ids: Sequence[str], aliases: Optional[Mapping[str, str]] = None) -> _Scan:
+    """One matcher pass over ``q`` for intent keywords, store ids and aliases."""
+    text = normalize_text(q)
+    matcher = _compiled_matcher(ROUTER.version, tuple(store_ids), tuple(sorted((aliases or {}).items())))
+    intents: List[str] = []
+    hinted = False
+    by_id: Tuple[int, Optional[str]] = (0, None)
+    by_alias: Tuple[int, Optional[str]] = (0, None)
+    for start, end, payload in matcher.find(text):
+        kind = payload[0]
+        if kind == "intent":
+            intents.append(payload[1])
+        elif kind == "hint":
+            hinted = True
+        # Longest name wins, so "tea-0011" is not read as "tea-001".
+        elif kind == "store" and end - start > by_id[0]:
+            by_id = (end - start, payload[1])
+        elif kind == "alias" and end - start > by_alias[0]:
+            by_alias = (end - start, payload[1])
+    # Aliases come from the owner's config and always count; raw ids need a hint word.
+    store = by_alias[1] or (by_id[1] if hinted else None)
+    return _Scan(text, intents, store, hinted)
+
+
+def _parse_store_request(q: str, store_ids: Sequence[str]) -> Optional[str]:
+    return _scan(q, store_ids).store
+
+
+def _store_ids(rows: Iterable[Dict[str, object]], snapshot: Optional[AnalyticsSnapshot]) -> Sequence[str]:
+    if snapshot is not None:
+        return snapshot.stores
+    return tuple(dict.fromkeys(str(r["store_id"]) for r in rows))
+
+
+class ResolvedQuery(NamedTuple):
+    """The intent a message routes to and the store/date window it applies to."""
+
+    intent: str
+    flt: QueryFilter
+
+
+@timed("intent")
+def resolve_query(
+    q: str,
+    rows: Iterable[Dict[str, object]],
+    snapshot: Optional[AnalyticsSnapshot] = None,
+    flt: Optional[QueryFilter] = None,
+    aliases: Optional[Mapping[str, str]] = None,
+) -> ResolvedQuery:
+    store_ids = snapshot.stores if snapshot is not None else ()
+    scan = _scan(q, store_ids, aliases)
+    if snapshot is None and scan.hinted:
+        # Without a snapshot, store ids cost a row scan; only pay it when a store can be named.
+        scan = _scan(q, _store_ids(rows, None), aliases)
+    latest = latest_date(rows, snapshot) if _RELATIVE_DATE_RE.search(scan.text) else None
+    flt = (flt or QueryFilter()).merged(QueryFilter(scan.store, *_date_window(scan.text, latest)))
+    intent = ROUTER.pick(scan.intents)
+    if intent is None:
+        return ResolvedQuery("scoped_summary" if flt.active() else "help", flt)
+    return ResolvedQuery(intent.name, flt)
+
+
+class Ask(NamedTuple):
+    """What an intent handler gets: the message, scoped KPIs and the data behind them."""
+
+    q: str
+    m: Mapping[str, object]
+    rows: Iterable[Dict[str, object]]
+    bot_name: str
+    snapshot: Optional[AnalyticsSnapshot]
+    flt: QueryFilter
+
+    def note(self) -> str:
+        return f" Scope: {self.flt.scope()}." if self.flt.active() else ""
+
+    def hours(self) -> Optional[List[HourCell]]:
+        """Hourly cells of the scope when the snapshot has a grid (never a row scan)."""
+        return window_hours(self.flt, self.rows, self.snapshot) if self.snapshot is not None else None
+
+    def prep(self) -> Optional[List[ItemForecast]]:
+        """Tomorrow's prep list for the scope's store, only when waste is high (snapshot only)."""
+        if self.snapshot is None or self.m["waste_ratio"] <= 5:
+            return None
+        forecast = window_forecast(self.rows, self.snapshot)
+        return forecast.items(forecast.first, self.flt.store_id) if forecast else None
+
+
+@timed("answer")
+def answer(resolved: ResolvedQuery, q: str, m: Mapping[str, object], rows: Iterable[Dict[str, object]],
+           bot_name: str, snapshot: Optional[AnalyticsSnapshot] = None) -> str:
+    """Run the handler for an already-resolved message."""
+    if snapshot is not None:
+        m = snapshot.metrics
+    if resolved.flt.active():
+        m = window_metrics(resolved.flt, rows, snapshot)
+    ROUTER.record(resolved.intent)
+    return ROUTER.intents[resolved.intent].handler(Ask(q, m, rows, bot_name, snapshot, resolved.flt))
+
+
+def respond(
+    q: str,
+    m: Mapping[str, object],
+    rows: Iterable[Dict[str, object]],
+    bot_name: str,
+    snapshot: Optional[AnalyticsSnapshot] = None,
+    flt: Optional[QueryFilter] = None,
+    aliases: Optional[Mapping[str, str]] = None,
+) -> str:
+    """Answer one chat message.
+
+    With ``snapshot`` every answer is a lookup; without it, per-store and daily
+    aggregates are computed from ``rows`` only for the intents that need them.
+    A store or date window named in ``q`` (or passed as ``flt``) scopes the
+    answer; see :func:`parse_query_filter`. ``aliases`` maps extra store names
+    (``store_aliases`` in the account config) to store ids.
+    """
+    return answer(resolve_query(q, rows, snapshot, flt, aliases), q, m, rows, bot_name, snapshot)
+
+
+def _store_scope(flt: QueryFilter) -> str:
+    # Forecast days are picked separately, so the scope names only the store.
+    return flt._replace(date_from=None, date_to=None).scope()
+
+
+@ROUTER.intent("prep_list", ("prep list", "prep sheet", "prep plan", "what to prep", "how much to prep"), priority=5)
+def _prep_list(ask: Ask) -> str:
+    forecast = window_forecast(ask.rows, ask.snapshot)
+    day = forecast_day(forecast, ask.flt)
+    if day is None:
+        return "No sales history to forecast from yet."
+    return "\n" + format_forecast(forecast.items(day, ask.flt.store_id), day, forecast, _store_scope(ask.flt), prep=True)
+
+
+@ROUTER.intent("forecast", ("forecast", "tomorrow", "predict", "prediction", "expected demand"), priority=6)
+def _forecast(ask: Ask) -> str:
+    forecast = window_forecast(ask.rows, ask.snapshot)
+    day = forecast_day(forecast, ask.flt)
+    if day is None:
+        return "No sales history to forecast from yet."
+    return "\n" + format_forecast(forecast.items(day, ask.flt.store_id), day, forecast, _store_scope(ask.flt))
+
+
+@ROUTER.intent("trend", ("trend", "trends"), priority=10)
+def _trend(ask: Ask) -> str:
+    return trend_report(window_trends(ask.rows, ask.snapshot, ask.flt.store_id), ask.flt.store_id, ask.flt.date_to)
+
+
+@ROUTER.intent("week_over_week", ("wow", "week over week", "week-over-week", "compare", "compares",
+                                  "compared", "vs", "versus"), priority=11)
+def _week_over_week(ask: Ask) -> str:
+    trends = window_trends(ask.rows, ask.snapshot, ask.flt.store_id)
+    return trend_report(trends, ask.flt.store_id, ask.flt.date_to, windows=(7,))
+
+
+@ROUTER.intent("status", ("status", "summary", "how did", "insight", "insights"), priority=20)
+def _status(ask: Ask) -> str:
+    return summary(ask.m, scope=ask.flt.scope(), hours=ask.hours(), prep=ask.prep())
+
+
+@ROUTER.intent("hourly", ("by hour", "hourly", "per hour", "each hour", "hour by hour", "daypart", "dayparts",
+                          "peak hour", "peak hours", "busiest hour", "busiest hours"), priority=25)
+def _hourly(ask: Ask) -> str:
+    cells = window_hours(ask.flt, ask.rows, ask.snapshot)
+    return "\n" + format_hourly(cells or [], ask.flt.scope())
+
+
+@ROUTER.intent("labor", ("labor", "labour"), priority=30)
+def _labor(ask: Ask) -> str:
+    m = ask.m
+    return f"Labor cost ${m['labor']:,.2f} ({m['labor_ratio']:.1f}% of revenue).{ask.note()}"
+
+
+@ROUTER.intent("waste", ("waste",), priority=40)
+def _waste(ask: Ask) -> str:
+    m = ask.m
+    return f"Waste cost ${m['waste']:,.2f} ({m['waste_ratio']:.1f}% of revenue).{ask.note()}"
+
+
+@ROUTER.intent("top_item", ("top item", "top items", "top seller", "best seller", "top selling",
+                            "best selling"), priority=50)
+def _top_item(ask: Ask) -> str:
+    m = ask.m
+    return f"Top item is {m['top_item']} at ${m['top_sales']:,.2f}.{ask.note()}"
+
+
+@ROUTER.intent("table", ("table", "detail", "details"), priority=60)
+def _table(ask: Ask) -> str:
+    if ask.snapshot is not None and not ask.flt.active():
+        return "\n" + ask.snapshot.daily_table
+    return "\n" + format_daily(dict(window_daily(ask.flt, ask.rows, ask.snapshot)))
+
+
+@ROUTER.intent("diagram", ("diagram", "chart"), priority=70)
+def _diagram(ask: Ask) -> str:
+    return "\n" + diagram(ask.m)
+
+
+@ROUTER.intent("sms", ("sms",), priority=80)
+def _sms(ask: Ask) -> str:
+    trends = None if ask.flt.dated() else window_trends(ask.rows, ask.snapshot, ask.flt.store_id)
+    return sms_brief(ask.m, ask.bot_name, trends, ask.flt.store_id)
+
+
+@ROUTER.intent("stores", ("stores",), priority=90)
+def _stores(ask: Ask) -> str:
+    return "Known stores: " + ", ".join(sorted(_store_ids(ask.rows, ask.snapshot)))
+
+
+@ROUTER.intent("scoped_summary")
+def _scoped_summary(ask: Ask) -> str:
+    return summary(ask.m, scope=ask.flt.scope(), hours=ask.hours(), prep=ask.prep())
+
+
+@ROUTER.intent("help")
+def _help(ask: Ask) -> str:
+    return (
+        "Ask me: status, store <id> status, labor, waste, top item, table, diagram, sms, trend, "
+        "week over week, labor by hour, forecast tomorrow, prep list. "
+        "Add 'yesterday', 'last 7 days' or YYYY-MM-DD dates to narrow the window."
+    )
+
+
+def report_quarantine(quarantine: List[BadValue], path: Optional[str] = None) -> None:
+    """Summarize malformed values per file on stderr and optionally write them all to ``path``."""
+    for source, entries in by_source(quarantine).items():
+        first = entries[0]
+        print(f"warning: {source}: {len(entries)} malformed value(s) counted as missing "
+              f"(first: line {first.line}, {first.column}={first.value!r})", file=sys.stderr)
+    if path:
+        with open(path, "w", newline="", encoding="utf-8") as fh:
+            write_report(quarantine, fh)
+
+
+def report_duplicates(dropped: Mapping[str, int]) -> None:
+    """One stderr line per file that repeated lines of an earlier file."""
+    for source, n in dropped.items():
+        print(f"note: {source}: {n} duplicate line(s) already in an earlier file were dropped", file=sys.stderr)
+
+
+def report_unmatched_costs(costs: Optional[CostLedger]) -> None:
+    """One stderr line per source whose costs found no sales day, usually a store id the POS does not use."""
+    if costs is None:
+        return
+    for label, cents in (("shift labor", costs.unmatched[LABOR]), ("inventory waste", costs.unmatched[WASTE])):
+        if cents:
+            print(f"note: ${cents / 100:,.2f} of {label} matched no store with sales on those days", file=sys.stderr)
 
 
 def main() -> None:
@@ -249,18 +1303,68 @@ def main() -> None:
     p.add_argument("--config", help="Path to owner account JSON config")
     p.add_argument("--no-chat", action="store_true")
     p.add_argument("--print-sms", action="store_true", help="Print SMS brief and exit")
+    p.add_argument("--workers", type=int, default=1, help="Parse CSV files in N processes")
+    p.add_argument("--from", dest="date_from", type=date.fromisoformat, help="First business date (YYYY-MM-DD)")
+    p.add_argument("--to", dest="date_to", type=date.fromisoformat, help="Last business date (YYYY-MM-DD)")
+    p.add_argument("--store", help="Only this store id")
+    p.add_argument("--quarantine-report", metavar="PATH",
+                   help="Write malformed CSV values (source, line, column, value) to PATH as CSV")
+    p.add_argument("--approx-orders", action="store_true",
+                   help="Count distinct orders with HyperLogLog sketches in the streaming path (--no-chat/--print-sms)")
+    p.add_argument("--keep-duplicates", action="store_true",
+                   help="Keep lines that repeat an earlier file (overlapping exports are deduplicated by default)")
+    p.add_argument("--dedup-spill-dir", metavar="DIR",
+                   help="Keep the duplicate-line key index in sorted run files under DIR instead of memory")
     args = p.parse_args()
 
     account = load_account_config(args.config)
-    rows = normalize(load_rows(args.data_dir))
-    m = metrics(rows)
+    flt = QueryFilter(args.store, args.date_from, args.date_to)
+
+    snapshot: Optional[AnalyticsSnapshot] = None
+    quarantine: List[BadValue] = []
+    duplicates: Dict[str, int] = {}
+    # Shift and inventory exports; their bad values are reported after the POS files'.
+    side_bad: List[BadValue] = []
+    shifts = load_shifts(args.data_dir, side_bad)
+    inventory = load_inventory(args.data_dir, side_bad)
+    if (args.print_sms or args.no_chat) and args.workers <= 1:
+        # One streaming pass; normalized rows are never held in memory.
+        acc = KpiAccumulator("hll" if args.approx_orders else "exact")
+        deduper = None if args.keep_duplicates else Deduper(LineIndex(args.dedup_spill_dir))
+        costs = CostLedger(shifts, inventory)
+        seen: Dict[str, Set[int]] = {}
+        records = iter_records(args.data_dir, quarantine, deduper)
+        try:
+            acc.consume(filter_records(costs.track(records, seen) if costs else records, flt))
+        finally:
+            if deduper is not None:
+                deduper.index.close()
+                duplicates = deduper.dropped
+        for (store_id, day), (labor, waste) in costs.allocate({s: sorted(d) for s, d in seen.items()}).items():
+            d = date.fromordinal(day)
+            if flt.matches({"store_id": store_id, "date": d}):
+                acc.add_costs(store_id, d, labor, waste)
+        quarantine += side_bad
+        m = acc.metrics()
+        report_unmatched_costs(costs)
+        # The stream is already narrowed to --store, so its daily rollup is that store's series.
+        trends, trend_store = PrefixSums({None: acc.daily_totals()}), None
+    else:
+        snapshot = build_snapshot(load_columns(args.data_dir, args.workers, not args.keep_duplicates,
+                                               args.dedup_spill_dir), shifts=shifts, inventory=inventory)
+        quarantine, duplicates = snapshot.rows.quarantine + side_bad, snapshot.rows.duplicates
+        report_unmatched_costs(snapshot.costs)
+        m = window_metrics(flt, snapshot.rows, snapshot)
+        trends, trend_store = snapshot.trends, flt.store_id
+    report_quarantine(quarantine, args.quarantine_report)
+    report_duplicates(duplicates)
 
     if args.print_sms:
-        print(sms_brief(m, str(account["bot_name"])))
+        print(sms_brief(m, str(account["bot_name"]), None if flt.dated() else trends, trend_store))
         return
 
     bot_name = str(account["bot_name"])
-    print(f"{bot_name}> {summary(m)}")
+    print(f"{bot_name}> {summary(m, scope=flt.scope())}")
 
     if args.no_chat:
         return
@@ -271,7 +1375,8 @@ def main() -> None:
         if q.lower() in {"exit", "quit"}:
             print(f"{bot_name}> Bye")
             break
-        print(f"{bot_name}>", respond(q, m, rows, bot_name))
+        print(f"{bot_name}>", respond(q, m, snapshot.rows, bot_name, snapshot=snapshot, flt=flt,
+                                      aliases=account["store_aliases"]))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+"""Benchmarks for ingestion, aggregation and chat latency on synthetic POS exports.
+
+``generate_dataset`` writes seeded synthetic exports in the Clover, Square
+and Toast layouts of ``data/pos_samples`` (stores are split across the three
+layouts, one CSV per layout), sized by stores x days x lines per store-day.
+``run_benchmarks`` times each pipeline stage on that data and measures chat
+latency both in-process (``respond`` against the snapshot) and over HTTP
+against the threaded web app, then returns a JSON-ready result.
+
+Stage timings are the best of ``--repeat`` runs. ``rss_peak_mb`` is the
+process high-water mark after the stage (``ru_maxrss``), so it only grows
+across stages; the largest value is the run's peak. Chat latency is reported
+as p50/p99 over a fixed query mix, with the answer cache disabled unless
+``--answer-cache`` is given.
+
+    python3 pos_bench.py run --stores 40 --days 90 --lines 60 --out bench_results/new.json
+    python3 pos_bench.py compare bench_results/old.json bench_results/new.json --threshold 10
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import gc
+import http.client
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, datetime, timedelta, timezone
+from http.server import ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import mvp_pos_insight_bot as bot
+import web_app
+
+# Column headers per vendor layout, as in data/pos_samples:
+# date, store, order, item, sales, labor, waste.
+LAYOUTS: Dict[str, Tuple[str, ...]] = {
+    "clover": ("date", "store_id", "receipt_id", "item", "amount", "staff_cost", "waste_cost"),
+    "square": ("business_date", "location_id", "ticket_id", "menu_item", "net_sales", "labor", "spoilage"),
+    "toast": ("transaction_date", "store", "check_id", "product", "total_sales", "payroll", "waste"),
+}
+MENU = (
+    ("Milk Tea", 6.5), ("Boba", 1.5), ("Iced Latte", 5.75), ("Cold Brew", 5.5), ("Extra Shot", 1.5),
+    ("Acai Bowl", 11.5), ("Burger", 14.0), ("Fries", 4.0), ("Salad", 10.5), ("Soup", 7.0),
+    ("Croissant", 3.75), ("Bagel", 3.25), ("Matcha", 6.0), ("Smoothie", 8.25), ("Wrap", 9.5),
+    ("Pizza Slice", 4.5), ("Cookie", 2.5), ("Lemonade", 3.5), ("Sandwich", 9.0), ("Tacos", 11.0),
+)
+CHAT_QUERIES = (
+    "what is my status today?", "labor", "waste", "top item", "table", "sms", "stores",
+    "show store {store} status", "revenue trend", "how did this week compare to last week?",
+    "status last 7 days", "top item at store {store} last 7 days",
+)
+BENCH_START = date(2026, 1, 1)
+
+
+def generate_csv(path: str, layout: str, stores: Sequence[str], days: int, lines: int,
+                 start: date = BENCH_START, seed: int = 0) -> int:
+    """Write ``len(stores) * days * lines`` rows in ``layout``; returns the row count.
+
+    Lines are grouped into tickets of 1-4 items; labor is booked on a ticket's
+    first line and waste is sparse, like the vendor samples.
+    """
+    rng = random.Random(f"{seed}:{layout}")
+    header = LAYOUTS[layout]
+    order_no = 1000
+    n = 0
+    with open(path, "w", newline="", encoding="utf-8") as fh:
+        w = csv.writer(fh)
+        w.writerow(header)
+        for d in range(days):
+            day = (start + timedelta(days=d)).isoformat()
+            for store in stores:
+                left = lines
+                while left:
+                    size = min(left, rng.randint(1, 4))
+                    order_no += 1
+                    for i in range(size):
+                        item, price = MENU[rng.randrange(len(MENU))]
+                        labor = round(price * rng.uniform(0.15, 0.35), 2) if i == 0 else 0.0
+                        waste = round(price * rng.uniform(0.01, 0.1), 2) if rng.random() < 0.2 else 0.0
+                        w.writerow((day, store, order_no, item, f"{price:.2f}", f"{labor:.2f}", f"{waste:.2f}"))
+                    left -= size
+                    n += size
+    return n
+
+
+def generate_dataset(out_dir: str, stores: int, days: int, lines: int, seed: int = 0,
+                     layouts: Sequence[str] = tuple(LAYOUTS)) -> int:
+    """One CSV per layout in ``out_dir``, stores dealt round-robin across layouts."""
+    os.makedirs(out_dir, exist_ok=True)
+    store_ids = [f"store-{i:03d}" for i in range(stores)]
+    total = 0
+    for k, layout in enumerate(layouts):
+        mine = store_ids[k::len(layouts)]
+        if mine:
+            total += generate_csv(os.path.join(out_dir, f"{layout}_bench.csv"), layout, mine, days, lines, seed=seed)
+    return total
+
+
+def _rss_mb() -> float:
+    # ru_maxrss is KiB on Linux and bytes on macOS.
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def _time_stage(fn: Callable[[], object], repeat: int) -> Tuple[float, object]:
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        result = None
+        gc.collect()
+        t0 = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+def _percentiles(samples: List[float]) -> Dict[str, float]:
+    ordered = sorted(samples)
+
+    def pct(p: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(p * len(ordered)))] * 1000, 3)
+
+    return {"n": len(ordered), "p50_ms": pct(0.50), "p99_ms": pct(0.99), "max_ms": round(ordered[-1] * 1000, 3)}
+
+
+def _queries(stores: Sequence[str], n: int) -> List[str]:
+    return [CHAT_QUERIES[i % len(CHAT_QUERIES)].format(store=stores[i % len(stores)]) for i in range(n)]
+
+
+def bench_http_chat(state: web_app.AppState, queries: Sequence[str]) -> Dict[str, float]:
+    """p50/p99 of POST /api/chat against the threaded web app on a loopback port."""
+    class Handler(web_app.Handler):
+        def log_message(self, *args):
+            pass
+
+    Handler.account = state.account
+    Handler.publish(state.snapshot)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    samples = []
+    try:
+        for q in queries:
+            body = json.dumps({"q": q})
+            t0 = time.perf_counter()
+            conn = http.client.HTTPConnection("127.0.0.1", server.server_address[1], timeout=30)
+            conn.request("POST", "/api/chat", body=body, headers={"Content-Type": "application/json"})
+            resp = conn.getresponse()
+            resp.read()
+            samples.append(time.perf_counter() - t0)
+            conn.close()
+            if resp.status != 200:
+                raise RuntimeError(f"chat request failed with HTTP {resp.status}: {q}")
+    finally:
+        server.shutdown()
+        server.server_close()
+        thread.join(timeout=5)
+    return _percentiles(samples)
+
+
+def run_benchmarks(data_dir: str, repeat: int = 3, chat_requests: int = 200,
+                   answer_cache: bool = False) -> Dict[str, object]:
+    stages: Dict[str, Dict[str, float]] = {}
+
+    def stage(name: str, fn: Callable[[], object], rows: int) -> object:
+        seconds, result = _time_stage(fn, repeat)
+        stages[name] = {
+            "seconds": round(seconds, 6),
+            "rows": rows,
+            "rows_per_sec": round(rows / seconds) if seconds else 0,
+            "rss_peak_mb": _rss_mb(),
+        }
+        return result
+
+    n = sum(1 for _ in bot.iter_rows(data_dir))
+    raw = stage("load_rows", lambda: bot.load_rows(data_dir), n)
+    records = stage("normalize", lambda: bot.normalize(raw), n)
+    del raw
+    stage("metrics_dicts", lambda: bot.metrics(records), n)
+    del records
+    cols = stage("load_columns", lambda: bot.load_columns(data_dir), n)
+    stage("metrics", lambda: bot.metrics(cols), n)
+    stage("store_metrics_map", lambda: bot.store_metrics_map(cols), n)
+    stage("daily_table", lambda: bot.daily_table(cols), n)
+    snapshot = stage("build_snapshot", lambda: bot.build_snapshot(cols), n)
+
+    state = web_app.AppState(bot.load_account_config(None), snapshot)
+    queries = _queries(snapshot.stores, chat_requests)
+    bot_name = str(state.account["bot_name"])
+    samples = []
+    for q in queries:
+        t0 = time.perf_counter()
+        bot.respond(q, snapshot.metrics, snapshot.rows, bot_name, snapshot=snapshot)
+        samples.append(time.perf_counter() - t0)
+
+    saved = web_app.ANSWER_CACHE.maxsize
+    if not answer_cache:
+        web_app.ANSWER_CACHE.maxsize = 0
+    web_app.ANSWER_CACHE.clear()
+    try:
+        http_chat = bench_http_chat(state, queries)
+    finally:
+        web_app.ANSWER_CACHE.maxsize = saved
+
+    return {
+        "meta": _meta(),
+        "params": {"data_dir": data_dir, "rows": n, "stores": len(snapshot.stores), "repeat": repeat,
+                   "answer_cache": answer_cache},
+        "stages": stages,
+        "chat": {"respond": _percentiles(samples), "http": http_chat},
+        "rss_peak_mb": _rss_mb(),
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=10,
+                             cwd=os.path.dirname(os.path.abspath(__file__)))
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return out.stdout.strip() or None
+
+
+def _meta() -> Dict[str, object]:
+    return {
+        "commit": _git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def _metrics_of(result: Dict[str, object]) -> Dict[str, float]:
+    """Flat {name: value} of every lower-is-better number in a result."""
+    flat = {f"{name}.seconds": s["seconds"] for name, s in result["stages"].items()}
+    for kind, lat in result["chat"].items():
+        flat[f"chat.{kind}.p50_ms"] = lat["p50_ms"]
+        flat[f"chat.{kind}.p99_ms"] = lat["p99_ms"]
+    flat["rss_peak_mb"] = result["rss_peak_mb"]
+    return flat
+
+
+def compare(old: Dict[str, object], new: Dict[str, object], threshold: float = 10.0) -> Tuple[List[str], List[str]]:
+    """(report lines, regressions): metrics more than ``threshold`` percent worse in ``new``."""
+    before, after = _metrics_of(old), _metrics_of(new)
+    lines = [f"{'metric':32} {'old':>12} {'new':>12} {'change':>9}"]
+    regressions = []
+    for name, value in after.items():
+        prev = before.get(name)
+        if prev is None:
+            lines.append(f"{name:32} {'-':>12} {value:>12g} {'new':>9}")
+            continue
+        change = (value - prev) / prev * 100 if prev else 0.0
+        flag = ""
+        if change > threshold:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        lines.append(f"{name:32} {prev:>12g} {value:>12g} {change:>+8.1f}%{flag}")
+    return lines, regressions
+
+
+def main() -> None:
+    p = argparse.ArgumentParser()
+    sub = p.add_subparsers(dest="command", required=True)
+    for name in ("generate", "run"):
+        sp = sub.add_parser(name)
+        sp.add_argument("--stores", type=int, default=12)
+        sp.add_argument("--days", type=int, default=30)
+        sp.add_argument("--lines", type=int, default=40, help="Rows per store per day")
+        sp.add_argument("--seed", type=int, default=0)
+    sub.choices["generate"].add_argument("--out-dir", required=True)
+    run = sub.choices["run"]
+    run.add_argument("--data-dir", help="Benchmark these CSVs instead of generating a dataset")
+    run.add_argument("--repeat", type=int, default=3, help="Best of N runs per stage")
+    run.add_argument("--chat-requests", type=int, default=200)
+    run.add_argument("--answer-cache", action="store_true", help="Leave the web app answer cache on")
+    run.add_argument("--out", help="Write the JSON result here (default: stdout)")
+    cmp = sub.add_parser("compare")
+    cmp.add_argument("old")
+    cmp.add_argument("new")
+    cmp.add_argument("--threshold", type=float, default=10.0, help="Percent slowdown that counts as a regression")
+    args = p.parse_args()
+
+    if args.command == "generate":
+        n = generate_dataset(args.out_dir, args.stores, args.days, args.lines, args.seed)
+        print(f"Wrote {n} rows to {args.out_dir}", file=sys.stderr)
+        return
+
+    if args.command == "compare":
+        with open(args.old, encoding="utf-8") as fh:
+            old = json.load(fh)
+        with open(args.new, encoding="utf-8") as fh:
+            new = json.load(fh)
+        lines, regressions = compare(old, new, args.threshold)
+        print("\n".join(lines))
+        if regressions:
+            raise SystemExit(1)
+        return
+
+    with tempfile.TemporaryDirectory() as td:
+        data_dir = args.data_dir
+        if data_dir is None:
+            data_dir = td
+            generate_dataset(td, args.stores, args.days, args.lines, args.seed)
+        result = run_benchmarks(data_dir, args.repeat, args.chat_requests, args.answer_cache)
+    if args.data_dir is None:
+        result["params"].update(data_dir=None, generated={"stores": args.stores, "days": args.days,
+                                                          "lines": args.lines, "seed": args.seed})
+    text = json.dumps(result, indent=2)
+    if args.out:
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        with open(args.out, "w", encoding="utf-8") as fh:
+            fh.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""Persistent, memory-mappable cache of normalized columnar chunks.
+
+One cache file per source CSV, keyed by the CSV's absolute path, mtime, size
+and ``PARSER_VERSION``. A warm start maps the file read-only and wraps the
+numeric columns as ``memoryview``s, so no CSV byte is read or parsed and the
+pages are shared by every gunicorn worker mapping the same file. Only the
+string tables (stores, items, order keys) and the file's quarantined values
+are decoded per process.
+
+File layout (native byte order, recorded in the header)::
+
+    b"POSCOLS1" | u64 header length | JSON header | pad to 8 | column bytes
+"""
+
+from __future__ import annotations
+
+import glob
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from typing import NamedTuple, Optional
+
+from mvp_pos_insight_bot import PARSER_VERSION
+from pos_columnar import NUMERIC_COLUMNS, STRING_TABLES, ColumnarRows
+from pos_parse import BadValue
+
+CACHE_MAGIC = b"POSCOLS1"
+CACHE_SUFFIX = ".cols"
+_LEN = struct.Struct("<Q")
+
+
+class CachedChunk(NamedTuple):
+    sha256: str
+    rows: ColumnarRows
+
+
+def _pad(n: int) -> int:
+    return (-n) % 8
+
+
+class ColumnCache:
+    def __init__(self, cache_dir: str) -> None:
+        self.cache_dir = cache_dir
+        self.hits = 0
+        self.misses = 0
+
+    def _prefix(self, source: str) -> str:
+        return hashlib.sha1(os.path.abspath(source).encode("utf-8")).hexdigest()[:16]
+
+    def path_for(self, source: str, mtime_ns: int, size: int) -> str:
+        key = hashlib.sha1(f"{mtime_ns}|{size}|{PARSER_VERSION}".encode()).hexdigest()[:16]
+        return os.path.join(self.cache_dir, f"{self._prefix(source)}-{key}{CACHE_SUFFIX}")
+
+    def load(self, source: str, mtime_ns: int, size: int) -> Optional[CachedChunk]:
+        """Map the cached chunk for this exact file version, or None on a miss."""
+        try:
+            with open(self.path_for(source, mtime_ns, size), "rb") as fh:
+                mm = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        chunk = _decode(mm)
+        if chunk is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return chunk
+
+    def store(self, source: str, mtime_ns: int, size: int, sha256: str, rows: ColumnarRows) -> None:
+        """Write the chunk atomically and drop cache files for older versions of ``source``."""
+        target = self.path_for(source, mtime_ns, size)
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            with os.fdopen(fd, "wb") as fh:
+                _encode(fh, sha256, rows)
+            os.replace(tmp, target)
+        except OSError:
+            # A read-only or full disk only costs the warm start, never the ingest.
+            return
+        for stale in glob.glob(os.path.join(self.cache_dir, f"{self._prefix(source)}-*{CACHE_SUFFIX}")):
+            if stale != target:
+                try:
+                    os.remove(stale)
+                except OSError:
+                    pass
+
+
+def _encode(fh, sha256: str, rows: ColumnarRows) -> None:
+    columns = {}
+    offset = 0
+    for name, typecode in NUMERIC_COLUMNS:
+        nbytes = len(getattr(rows, name)) * getattr(rows, name).itemsize
+        columns[name] = [typecode, offset, nbytes]
+        offset += nbytes + _pad(nbytes)
+    header = json.dumps({
+        "parser_version": PARSER_VERSION,
+        "byteorder": sys.byteorder,
+        "rows": len(rows),
+        "sha256": sha256,
+        "columns": columns,
+        "tables": {name: getattr(rows, name).values for name in STRING_TABLES},
+        "quarantine": rows.quarantine,
+    }).encode("utf-8")
+    fh.write(CACHE_MAGIC)
+    fh.write(_LEN.pack(len(header)))
+    fh.write(header)
+    fh.write(b"\0" * _pad(len(CACHE_MAGIC) + _LEN.size + len(header)))
+    for name, _ in NUMERIC_COLUMNS:
+        data = memoryview(getattr(rows, name)).cast("B")
+        fh.write(data)
+        fh.write(b"\0" * _pad(len(data)))
+
+
+def _decode(mm: mmap.mmap) -> Optional[CachedChunk]:
+    if mm[: len(CACHE_MAGIC)] != CACHE_MAGIC:
+        return None
+    start = len(CACHE_MAGIC) + _LEN.size
+    try:
+        (header_len,) = _LEN.unpack_from(mm, len(CACHE_MAGIC))
+        header = json.loads(mm[start:start + header_len])
+    except (struct.error, ValueError):
+        # Truncated or garbled: a miss, and the CSV is parsed again.
+        return None
+    if header.get("parser_version") != PARSER_VERSION or header.get("byteorder") != sys.byteorder:
+        return None
+    data_start = start + header_len + _pad(start + header_len)
+    view = memoryview(mm)
+    columns = {}
+    for name, typecode in NUMERIC_COLUMNS:
+        code, offset, nbytes = header["columns"][name]
+        if code != typecode or data_start + offset + nbytes > len(mm):
+            return None
+        columns[name] = view[data_start + offset:data_start + offset + nbytes].cast(typecode)
+    rows = ColumnarRows.from_columns(columns, header["tables"])
+    rows.quarantine = [BadValue(*bad) for bad in header.get("quarantine", ())]
+    return CachedChunk(header["sha256"], rows)
@@ -0,0 +1,246 @@
+"""Columnar, array-backed storage for normalized POS rows.
+
+Each normalized field lives in its own typed ``array``: money amounts
+(revenue, labor, waste) as integer cents, quantities as doubles, dates as
+ordinal ints (0 = missing), the hour of day as a signed byte (-1 = no
+timestamp) and the string fields as integer codes into
+per-column string tables. A row costs ~49 bytes instead of an 8-key dict with
+boxed floats and ``date`` objects, aggregation kernels run over the arrays
+without any ``float()``/``str()`` conversion per access, and money sums are
+exact integer additions, converted to dollars only in the returned totals. Distinct
+orders are counted over the integer order codes (``pos_distinct``), never over
+sets of order-key strings.
+"""
+
+from __future__ import annotations
+
+from array import array
+from datetime import date
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence
+
+from pos_distinct import DistinctCounter, distinct_count
+from pos_parse import BadValue, cents
+
+
+class StringTable:
+    """Interns strings to dense integer codes in first-seen order."""
+
+    __slots__ = ("codes", "values")
+
+    def __init__(self) -> None:
+        self.codes: Dict[str, int] = {}
+        self.values: List[str] = []
+
+    def code(self, value: str) -> int:
+        c = self.codes.get(value)
+        if c is None:
+            c = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return c
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def __getstate__(self):
+        # Ship only the values list; the reverse index is rebuilt on unpickle.
+        return self.values
+
+    def __setstate__(self, values: List[str]) -> None:
+        self.values = values
+        self.codes = {v: i for i, v in enumerate(values)}
+
+    @classmethod
+    def from_values(cls, values: List[str]) -> "StringTable":
+        table = cls()
+        table.values = list(values)
+        table.codes = {v: i for i, v in enumerate(table.values)}
+        return table
+
+
+class GroupTotals(NamedTuple):
+    revenue: float
+    labor: float
+    waste: float
+    orders: int
+    top_item: str
+    top_sales: float
+
+
+NUMERIC_COLUMNS = (
+    ("revenue", "q"), ("quantity", "d"), ("labor", "q"), ("waste", "q"),
+    ("dates", "i"), ("store_codes", "i"), ("item_codes", "i"), ("order_codes", "i"), ("hours", "b"),
+)
+STRING_TABLES = ("stores", "items", "orders")
+
+
+class ColumnarRows:
+    """Normalized rows stored column-wise.
+
+    Iterating yields the same dict records ``normalize`` produces, so code that
+    only needs a sequence of rows keeps working; the aggregate functions in
+    ``mvp_pos_insight_bot`` detect this type and use the array kernels below.
+    Columns may also be read-only ``memoryview``s (e.g. over an mmap'd cache
+    file, see ``pos_cache``); such instances cannot be appended to.
+    """
+
+    def __init__(self) -> None:
+        self.revenue = array("q")
+        self.quantity = array("d")
+        self.labor = array("q")
+        self.waste = array("q")
+        self.dates = array("i")
+        self.store_codes = array("i")
+        self.item_codes = array("i")
+        self.order_codes = array("i")
+        self.hours = array("b")
+        self.stores = StringTable()
+        self.items = StringTable()
+        self.orders = StringTable()
+        # Values that failed to parse in the source file(s), see ``pos_parse``.
+        self.quarantine: List[BadValue] = []
+        # Lines dropped per source file as duplicates of an earlier file, see ``pos_dedup``.
+        self.duplicates: Dict[str, int] = {}
+
+    @classmethod
+    def from_records(cls, records: Iterable[Dict[str, object]]) -> "ColumnarRows":
+        cols = cls()
+        cols.extend(records)
+        return cols
+
+    @classmethod
+    def from_columns(cls, columns: Dict[str, Sequence], tables: Dict[str, List[str]]) -> "ColumnarRows":
+        cols = cls()
+        for name, _ in NUMERIC_COLUMNS:
+            setattr(cols, name, columns[name])
+        for name in STRING_TABLES:
+            setattr(cols, name, StringTable.from_values(tables[name]))
+        return cols
+
+    @classmethod
+    def concat(cls, chunks: Sequence["ColumnarRows"]) -> "ColumnarRows":
+        """Concatenate chunks in order, remapping string codes into shared tables.
+
+        Codes stay in first-seen order, so the result aggregates exactly like
+        ``from_records`` over the chunks' records in the same order. A single
+        chunk is returned as-is.
+        """
+        if len(chunks) == 1:
+            return chunks[0]
+        out = cls()
+        for chunk in chunks:
+            for name in ("revenue", "quantity", "labor", "waste", "dates", "hours"):
+                getattr(out, name).frombytes(memoryview(getattr(chunk, name)).cast("B"))
+            for table, codes, out_table, out_codes in (
+                (chunk.stores, chunk.store_codes, out.stores, out.store_codes),
+                (chunk.items, chunk.item_codes, out.items, out.item_codes),
+                (chunk.orders, chunk.order_codes, out.orders, out.order_codes),
+            ):
+                remap = [out_table.code(v) for v in table.values]
+                out_codes.extend(array("i", map(remap.__getitem__, codes)))
+            out.quarantine.extend(chunk.quarantine)
+            out.duplicates.update(chunk.duplicates)
+        return out
+
+    def append(self, r: Dict[str, object]) -> None:
+        d = r["date"]
+        self.dates.append(d.toordinal() if d is not None else 0)
+        self.store_codes.append(self.stores.code(str(r["store_id"])))
+        self.revenue.append(cents(r["revenue"]))
+        self.quantity.append(float(r["quantity"]))
+        self.labor.append(cents(r["labor_cost"]))
+        self.waste.append(cents(r["waste_cost"]))
+        self.item_codes.append(self.items.code(str(r["item_name"])))
+        self.order_codes.append(self.orders.code(str(r["order_key"])))
+        h = r.get("hour")
+        self.hours.append(-1 if h is None else h)
+
+    def extend(self, records: Iterable[Dict[str, object]]) -> None:
+        append = self.append
+        for r in records:
+            append(r)
+
+    def __len__(self) -> int:
+        return len(self.revenue)
+
+    def __bool__(self) -> bool:
+        return len(self.revenue) > 0
+
+    def row(self, i: int) -> Dict[str, object]:
+        d = self.dates[i]
+        h = self.hours[i]
+        return {
+            "date": date.fromordinal(d) if d else None,
+            "store_id": self.stores.values[self.store_codes[i]],
+            "revenue": self.revenue[i] / 100,
+            "quantity": self.quantity[i],
+            "labor_cost": self.labor[i] / 100,
+            "waste_cost": self.waste[i] / 100,
+            "item_name": self.items.values[self.item_codes[i]],
+            "order_key": self.orders.values[self.order_codes[i]],
+            "hour": h if h >= 0 else None,
+        }
+
+    def __iter__(self) -> Iterator[Dict[str, object]]:
+        for i in range(len(self.revenue)):
+            yield self.row(i)
+
+    def nbytes(self) -> int:
+        """Bytes held by the numeric columns (string tables excluded)."""
+        return sum(getattr(self, name).itemsize * len(getattr(self, name)) for name, _ in NUMERIC_COLUMNS)
+
+
+def _top_item(item_sales: Dict[int, int], items: StringTable):
+    if not item_sales:
+        return "n/a", 0.0
+    code, sales = max(item_sales.items(), key=lambda x: x[1])
+    return items.values[code], sales / 100
+
+
+def totals(cols: ColumnarRows) -> GroupTotals:
+    """Whole-table totals (dollars, from exact cent sums)."""
+    item_sales: Dict[int, int] = {}
+    get = item_sales.get
+    for item, rev in zip(cols.item_codes, cols.revenue):
+        item_sales[item] = get(item, 0) + rev
+    top_item, top_sales = _top_item(item_sales, cols.items)
+    return GroupTotals(
+        revenue=sum(cols.revenue) / 100,
+        labor=sum(cols.labor) / 100,
+        waste=sum(cols.waste) / 100,
+        orders=distinct_count(cols.order_codes, len(cols.orders)),
+        top_item=top_item,
+        top_sales=top_sales,
+    )
+
+
+def totals_by(cols: ColumnarRows, keys: array, track_items: bool = True,
+              skip: Optional[int] = None) -> Dict[int, GroupTotals]:
+    """Per-group totals keyed by the codes in ``keys``, in first-seen order.
+
+    Rows whose key equals ``skip`` are ignored (e.g. ordinal 0 for missing dates).
+    """
+    sums: Dict[int, List[int]] = {}
+    item_sales: Dict[int, Dict[int, int]] = {}
+    for key, rev, lab, wst, item in zip(keys, cols.revenue, cols.labor, cols.waste, cols.item_codes):
+        if key == skip:
+            continue
+        acc = sums.get(key)
+        if acc is None:
+            acc = sums[key] = [0, 0, 0]
+            item_sales[key] = {}
+        acc[0] += rev
+        acc[1] += lab
+        acc[2] += wst
+        if track_items:
+            per_item = item_sales[key]
+            per_item[item] = per_item.get(item, 0) + rev
+
+    counter = DistinctCounter(len(cols.orders))
+    # Skipped rows form a group of their own that is simply never read back.
+    counter.extend(zip(keys, cols.order_codes))
+    orders = counter.counts()
+    out: Dict[int, GroupTotals] = {}
+    for key, (rev, lab, wst) in sums.items():
+        top_item, top_sales = _top_item(item_sales[key], cols.items)
+        out[key] = GroupTotals(rev / 100, lab / 100, wst / 100, orders[key], top_item, top_sales)
+    return out
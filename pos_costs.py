@@ -0,0 +1,184 @@
+"""Labor and waste per store and business day from shift and inventory exports.
+
+Few POS vendors export accurate per-line ``labor_cost``/``waste_cost``.
+``CostLedger`` books them from the real sources instead:
+
+- a shift's labor cost goes to the day it starts, so an overnight shift
+  belongs to its shift date
+- an inventory count's waste goes to its count date. The count's own waste
+  cost is used if it has one. Otherwise the waste quantity is valued at the
+  SKU's unit cost as of the count date: the latest cost at or before it, or
+  the first later one for counts before any cost
+
+Each store's source covers the days from its first to its last booked day.
+Inside that span, sourced costs replace the labor (or waste) of that store's
+POS lines. Outside it, and in stores without that source, the POS values
+stay. A cost booked on a day without sales moves to the store's latest
+earlier sales day in the span, or to the first later one. A store with no
+sales in the span cannot take its costs; they are counted in ``unmatched``.
+
+Both joins are sort-merges. Counts are sorted once by (store, SKU, date) and
+walked with the running unit cost. Cost days and sales days are sorted once
+per store and walked with two pointers (``merge_asof``). A month of tens of
+thousands of shifts costs one sort, not a search per shift.
+"""
+
+from __future__ import annotations
+
+import copy
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import groupby
+from typing import Dict, Iterable, Iterator, List, Mapping, Sequence, Set, Tuple
+
+from pos_columnar import ColumnarRows
+from pos_inventory import InventoryCount
+from pos_parse import cents
+from pos_shifts import MINUTES_PER_DAY, Shift
+
+LABOR, WASTE = 0, 1
+# Ledger kind -> normalized record field it replaces.
+FIELDS = ("labor_cost", "waste_cost")
+
+
+def merge_asof(keys: Sequence[int], probes: Iterable[int]) -> Iterator[int]:
+    """For each of the ascending ``probes``, the position of the last of the
+    ascending, non-empty ``keys`` at or before it (0 when it precedes them all)."""
+    j, last = 0, len(keys) - 1
+    for p in probes:
+        while j < last and keys[j + 1] <= p:
+            j += 1
+        yield j
+
+
+def waste_cents(counts: Iterable[InventoryCount]) -> Iterator[Tuple[str, int, int]]:
+    """(store, day, waste cents) per count; counts with waste but no cost at all are skipped."""
+    ordered = sorted(counts, key=lambda c: (c.store_id, c.sku, c.day))
+    for _, group in groupby(ordered, key=lambda c: (c.store_id, c.sku)):
+        group = list(group)
+        cost = next((c.unit_cost for c in group if c.unit_cost is not None), None)
+        for c in group:
+            if c.unit_cost is not None:
+                cost = c.unit_cost
+            if c.waste_cents is not None:
+                yield c.store_id, c.day, c.waste_cents
+            elif not c.waste_qty:
+                yield c.store_id, c.day, 0
+            elif cost is not None:
+                yield c.store_id, c.day, cents(c.waste_qty * cost)
+
+
+class CostLedger:
+    """Sourced labor and waste cents per store and date ordinal."""
+
+    def __init__(self, shifts: Iterable[Shift] = (), inventory: Iterable[InventoryCount] = ()) -> None:
+        self.shifts = 0
+        self.counts = 0
+        # kind (LABOR/WASTE) -> store -> date ordinal -> cents
+        self.days: Tuple[Dict[str, Dict[int, int]], Dict[str, Dict[int, int]]] = ({}, {})
+        for s in shifts:
+            self._book(LABOR, s.store_id, s.start // MINUTES_PER_DAY, s.labor_cents)
+            self.shifts += 1
+        inventory = list(inventory)
+        for store, day, cents in waste_cents(inventory):
+            self._book(WASTE, store, day, cents)
+        self.counts = len(inventory)
+        # Per kind: store -> (first, last) booked date ordinal, the days the source covers.
+        self.spans = tuple({store: (min(by_day), max(by_day)) for store, by_day in kind.items()}
+                           for kind in self.days)
+        # Cents that found no sales day, per kind; set by ``allocate``.
+        self.unmatched = [0, 0]
+
+    def _book(self, kind: int, store: str, day: int, cents: int) -> None:
+        by_day = self.days[kind].setdefault(store, {})
+        by_day[day] = by_day.get(day, 0) + cents
+
+    def __bool__(self) -> bool:
+        return any(self.days)
+
+    def covers(self, kind: int, store: str, day: int) -> bool:
+        span = self.spans[kind].get(store)
+        return span is not None and span[0] <= day <= span[1]
+
+    def allocate(self, sales_days: Mapping[str, Sequence[int]]) -> Dict[Tuple[str, int], List[int]]:
+        """(store, sales day) -> [labor, waste] cents, given each store's ascending sales days."""
+        booked: Dict[Tuple[str, int], List[int]] = {}
+        self.unmatched = [0, 0]
+        for kind, by_store in enumerate(self.days):
+            for store, by_day in by_store.items():
+                lo, hi = self.spans[kind][store]
+                days = sales_days.get(store, ())
+                inside = days[bisect_left(days, lo):bisect_right(days, hi)]
+                if not inside:
+                    self.unmatched[kind] += sum(by_day.values())
+                    continue
+                cost_days = sorted(by_day)
+                for day, j in zip(cost_days, merge_asof(inside, cost_days)):
+                    booked.setdefault((store, inside[j]), [0, 0])[kind] += by_day[day]
+        return booked
+
+    def apply(self, cols: ColumnarRows) -> ColumnarRows:
+        """A copy of ``cols`` whose labor and waste come from the ledger where it covers them.
+
+        A store-day's sourced costs are booked on its first line, the other
+        covered lines of that day carry none. Every aggregate is per store or
+        day or coarser, so where on the day they sit does not matter.
+        """
+        labor, waste = array("q", cols.labor), array("q", cols.waste)
+        stores = cols.stores.values
+        covered = {code: (self.spans[LABOR].get(store), self.spans[WASTE].get(store))
+                   for code, store in enumerate(stores)
+                   if store in self.spans[LABOR] or store in self.spans[WASTE]}
+        first: Dict[Tuple[int, int], int] = {}
+        for i, (code, day) in enumerate(zip(cols.store_codes, cols.dates)):
+            spans = covered.get(code)
+            if spans is None or not day:
+                continue
+            if (code, day) not in first:
+                first[(code, day)] = i
+            labor_span, waste_span = spans
+            if labor_span is not None and labor_span[0] <= day <= labor_span[1]:
+                labor[i] = 0
+            if waste_span is not None and waste_span[0] <= day <= waste_span[1]:
+                waste[i] = 0
+        sales_days: Dict[str, List[int]] = {}
+        for code, day in sorted(first):
+            sales_days.setdefault(stores[code], []).append(day)
+        codes = {store: code for code, store in enumerate(stores)}
+        for (store, day), (lab, wst) in self.allocate(sales_days).items():
+            i = first[(codes[store], day)]
+            labor[i] += lab
+            waste[i] += wst
+        out = copy.copy(cols)
+        out.labor, out.waste = labor, waste
+        return out
+
+    def track(self, records: Iterable[Dict[str, object]],
+              seen: Dict[str, Set[int]]) -> Iterator[Dict[str, object]]:
+        """Stream ``records`` with covered labor/waste zeroed, collecting each store's sales days in ``seen``.
+
+        Once the stream is consumed, ``allocate`` over ``seen`` (sorted) gives
+        the costs to add back per store and day.
+        """
+        for r in records:
+            d = r["date"]
+            if d is None:
+                yield r
+                continue
+            store, day = str(r["store_id"]), d.toordinal()
+            seen.setdefault(store, set()).add(day)
+            for kind, field in enumerate(FIELDS):
+                if self.covers(kind, store, day):
+                    r[field] = 0.0
+            yield r
+
+    def summary(self) -> Dict[str, object]:
+        """Counts for the dashboard: source rows, covered store-days and unmatched dollars."""
+        return {
+            "shifts": self.shifts,
+            "inventory_counts": self.counts,
+            "labor_store_days": sum(len(by_day) for by_day in self.days[LABOR].values()),
+            "waste_store_days": sum(len(by_day) for by_day in self.days[WASTE].values()),
+            "unmatched_labor": self.unmatched[LABOR] / 100,
+            "unmatched_waste": self.unmatched[WASTE] / 100,
+        }
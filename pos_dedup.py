@@ -0,0 +1,318 @@
+"""Duplicate-line detection across overlapping POS exports.
+
+Owners re-upload overlapping date ranges, so the same sale can arrive in
+several files. A line is identified by (store, order key, item, revenue in
+cents, business date); files are processed in order and a line whose key was
+already seen in an earlier file is dropped, so the first file keeps it.
+
+Repeats inside one file are legitimate (two identical coffees on one ticket),
+so the k-th repeat of a key within a file gets its own key. An overlapping
+export that carries the same ticket with the same repeats is then dropped
+line for line, and one with an extra repeat keeps only the extra line.
+
+A key is the 8-byte BLAKE2b digest of the packed fields: the strings' own
+BLAKE2b hashes (``pos_distinct.hash_key``), the cents and the date ordinal. A
+repeat's key is the digest of the first key and its repeat number. Keys do
+not depend on the process or the Python version, so they can be persisted
+(``pos_sqlite`` does). ``LineIndex`` holds
+them compactly: a small set buffer is flushed into sorted ``array("q")`` runs
+(8 bytes per key), merged size-tiered so there are O(log n) runs to bisect.
+With ``spill_dir`` the runs are written to files and memory-mapped, so very
+large histories cost page cache rather than heap.
+
+Files without an order column get synthetic per-file order keys, so their
+lines never match another file's and are never dropped.
+"""
+
+from __future__ import annotations
+
+import heapq
+import mmap
+import os
+import struct
+import tempfile
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from hashlib import blake2b
+from itertools import compress
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence
+
+from pos_columnar import NUMERIC_COLUMNS, ColumnarRows
+from pos_distinct import hash_key
+from pos_metrics import timed
+from pos_parse import cents
+
+BUFFER_KEYS = 1 << 18
+BLOCK_ROWS = 4096
+# (store hash, order hash, item hash, revenue cents, date ordinal) and (key, repeat number).
+_LINE = struct.Struct("<QQQqq")
+_REPEAT = struct.Struct("<qq")
+
+
+class _DiskRun:
+    """A sorted run of keys in a memory-mapped file."""
+
+    __slots__ = ("path", "_fh", "_mm", "keys")
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._fh = open(path, "rb")
+        self._mm = mmap.mmap(self._fh.fileno(), 0, access=mmap.ACCESS_READ)
+        self.keys = memoryview(self._mm).cast("q")
+
+    def close(self) -> None:
+        self.keys.release()
+        self._mm.close()
+        self._fh.close()
+        os.remove(self.path)
+
+
+class LineIndex:
+    """Set of 64-bit line keys: a set buffer plus sorted runs, in memory or spilled to disk.
+
+    Keys flushed to runs are also marked in a bit filter (2-4 bits per key),
+    so a new key, the common case, is rejected without bisecting the runs.
+    """
+
+    def __init__(self, spill_dir: Optional[str] = None, buffer_keys: int = BUFFER_KEYS) -> None:
+        self.spill_dir = spill_dir
+        self.buffer_keys = buffer_keys
+        self._buffer: set = set()
+        self._runs: List[Sequence[int]] = []
+        self._disk: List[_DiskRun] = []
+        self._size = 0
+        self._bits = bytearray()
+        self._mask = -1
+
+    def __len__(self) -> int:
+        return self._size + len(self._buffer)
+
+    def _in_runs(self, key: int) -> bool:
+        b = key & self._mask
+        if not self._bits[b >> 3] >> (b & 7) & 1:
+            return False
+        for run in self._runs:
+            i = bisect_left(run, key)
+            if i < len(run) and run[i] == key:
+                return True
+        return False
+
+    def __contains__(self, key: int) -> bool:
+        return key in self._buffer or (self._size > 0 and self._in_runs(key))
+
+    def add(self, key: int) -> bool:
+        """Record ``key``; returns False if it was already present."""
+        if key in self:
+            return False
+        self._buffer.add(key)
+        if len(self._buffer) >= self.buffer_keys:
+            self.flush()
+        return True
+
+    def add_unique(self, keys: List[int]) -> List[bool]:
+        """``add`` for each of ``keys``, which must be distinct; mostly at C speed."""
+        present = self._buffer.intersection(keys)
+        self._buffer.update(keys)
+        if self._size:
+            in_runs = self._in_runs
+            flushed = {key for key in keys if in_runs(key)}
+            # The buffer and the runs stay disjoint.
+            self._buffer.difference_update(flushed)
+            present |= flushed
+        if len(self._buffer) >= self.buffer_keys:
+            self.flush()
+        if not present:
+            return [True] * len(keys)
+        return [key not in present for key in keys]
+
+    def add_sorted(self, keys: Sequence[int]) -> None:
+        """Add a run of sorted keys none of which is present yet (e.g. reloaded from storage)."""
+        if len(keys):
+            self._push(array("q", keys))
+
+    def flush(self) -> None:
+        """Move the set buffer into a sorted run."""
+        if self._buffer:
+            run = array("q", sorted(self._buffer))
+            self._buffer = set()
+            self._push(run)
+
+    def _push(self, run: Sequence[int]) -> None:
+        self._size += len(run)
+        self._runs.append(self._store(run))
+        if 16 * self._size > 8 * len(self._bits):
+            self._bits = bytearray(max(1 << 12, 1 << (4 * self._size).bit_length()))
+            self._mask = 8 * len(self._bits) - 1
+            for keys in self._runs:
+                self._mark(keys)
+        else:
+            self._mark(self._runs[-1])
+        # Size-tiered: merge while the newest run is at least as large as the one before it.
+        while len(self._runs) > 1 and len(self._runs[-2]) <= len(self._runs[-1]):
+            b, a = self._runs.pop(), self._runs.pop()
+            merged = heapq.merge(a, b) if self.spill_dir else sorted(a + b)
+            self._runs.append(self._store(merged))
+            self._release(a)
+            self._release(b)
+
+    def _mark(self, keys: Iterable[int]) -> None:
+        bits, mask = self._bits, self._mask
+        for key in keys:
+            b = key & mask
+            bits[b >> 3] |= 1 << (b & 7)
+
+    def _store(self, keys: Iterable[int]) -> Sequence[int]:
+        if self.spill_dir is None:
+            return keys if isinstance(keys, array) else array("q", keys)
+        fd, path = tempfile.mkstemp(prefix="lines-", suffix=".run", dir=self.spill_dir)
+        with os.fdopen(fd, "wb") as fh:
+            block = array("q")
+            for key in keys:
+                block.append(key)
+                if len(block) >= BUFFER_KEYS:
+                    block.tofile(fh)
+                    block = array("q")
+            block.tofile(fh)
+        run = _DiskRun(path)
+        self._disk.append(run)
+        return run.keys
+
+    def _release(self, keys: Sequence[int]) -> None:
+        for run in self._disk:
+            if run.keys is keys:
+                self._disk.remove(run)
+                run.close()
+                return
+
+    def close(self) -> None:
+        """Drop every key and delete spilled runs."""
+        self._runs = []
+        for run in self._disk:
+            run.close()
+        self._disk = []
+        self._buffer = set()
+        self._size = 0
+        self._bits = bytearray()
+        self._mask = -1
+
+    def __enter__(self) -> "LineIndex":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class _StringHashes(dict):
+    """str -> ``hash_key`` memo."""
+
+    def __missing__(self, s: str) -> int:
+        h = self[s] = hash_key(s)
+        return h
+
+
+def _digest(data: bytes) -> int:
+    return int.from_bytes(blake2b(data, digest_size=8).digest(), "little", signed=True)
+
+
+def line_key(store: int, order: int, item: int, cents: int, day: int) -> int:
+    """Signed 64-bit key of one line from its ``hash_key`` string hashes, revenue cents and date ordinal."""
+    return _digest(_LINE.pack(store, order, item, cents, day))
+
+
+def repeat_key(key: int, k: int) -> int:
+    """Key of the ``k``-th repeat (k >= 1) of ``key`` within one file."""
+    return _digest(_REPEAT.pack(key, k))
+
+
+def _number_repeats(keys: List[int]) -> List[int]:
+    """Give the k-th repeat of a key (k >= 1) its own key, in place."""
+    if len(set(keys)) == len(keys):
+        return keys
+    repeated = {key for key, n in Counter(keys).items() if n > 1}
+    seen: Dict[int, int] = {}
+    for i, key in enumerate(keys):
+        if key in repeated:
+            k = seen.get(key, 0)
+            seen[key] = k + 1
+            if k:
+                keys[i] = repeat_key(key, k)
+    return keys
+
+
+def chunk_keys(cols: ColumnarRows) -> List[int]:
+    """Line keys of a columnar chunk, in row order, with in-chunk repeats numbered."""
+    stores = [hash_key(v) for v in cols.stores.values]
+    orders = [hash_key(v) for v in cols.orders.values]
+    items = [hash_key(v) for v in cols.items.values]
+    store_hashes = map(stores.__getitem__, cols.store_codes)
+    order_hashes = map(orders.__getitem__, cols.order_codes)
+    item_hashes = map(items.__getitem__, cols.item_codes)
+    return _number_repeats(list(map(line_key, store_hashes, order_hashes, item_hashes, cols.revenue, cols.dates)))
+
+
+class Deduper:
+    """Drops lines already seen in an earlier file; ``dropped`` counts them per source file."""
+
+    def __init__(self, index: Optional[LineIndex] = None) -> None:
+        self.index = LineIndex() if index is None else index
+        self.dropped: Dict[str, int] = {}
+
+    def chunk(self, cols: ColumnarRows, source: str) -> ColumnarRows:
+        """``cols`` without the lines of earlier files (``cols`` itself when nothing is dropped)."""
+        keep = self.index.add_unique(chunk_keys(cols))
+        dropped = len(keep) - sum(keep)
+        if not dropped:
+            return cols
+        self.dropped[source] = self.dropped.get(source, 0) + dropped
+        out = ColumnarRows()
+        for name, typecode in NUMERIC_COLUMNS:
+            setattr(out, name, array(typecode, compress(getattr(cols, name), keep)))
+        out.stores, out.items, out.orders = cols.stores, cols.items, cols.orders
+        out.quarantine = cols.quarantine
+        out.duplicates = {source: dropped}
+        return out
+
+    def records(self, records: Iterable[Dict[str, object]], source: str) -> Iterator[Dict[str, object]]:
+        """Stream one file's normalized records, skipping lines of earlier files.
+
+        Records are checked against the index in blocks of ``BLOCK_ROWS``.
+        """
+        hashes = _StringHashes()
+        seen: set = set()
+        repeats: Dict[int, int] = {}
+        rows: List[Dict[str, object]] = []
+        keys: List[int] = []
+        for r in records:
+            d = r["date"]
+            key = line_key(hashes[str(r["store_id"])], hashes[str(r["order_key"])], hashes[str(r["item_name"])],
+                           cents(r["revenue"]), d.toordinal() if d is not None else 0)
+            if key in seen:
+                k = repeats.get(key, 1)
+                repeats[key] = k + 1
+                key = repeat_key(key, k)
+            else:
+                seen.add(key)
+            rows.append(r)
+            keys.append(key)
+            if len(keys) >= BLOCK_ROWS:
+                yield from self._admit(rows, keys, source)
+                rows, keys = [], []
+        if keys:
+            yield from self._admit(rows, keys, source)
+
+    def _admit(self, rows: List[Dict[str, object]], keys: List[int], source: str) -> Iterable[Dict[str, object]]:
+        keep = self.index.add_unique(keys)
+        dropped = len(keep) - sum(keep)
+        if not dropped:
+            return rows
+        self.dropped[source] = self.dropped.get(source, 0) + dropped
+        return compress(rows, keep)
+
+
+@timed("dedup")
+def dedup_chunks(chunks: Sequence[ColumnarRows], sources: Sequence[str],
+                 index: Optional[LineIndex] = None) -> List[ColumnarRows]:
+    """Per-file chunks, in file order, without lines already present in an earlier chunk."""
+    deduper = Deduper(index)
+    return [deduper.chunk(cols, source) for cols, source in zip(chunks, sources)]
@@ -0,0 +1,233 @@
+"""Per-store, per-item daily demand forecasts for prep planning.
+
+Every (store, item) pair is one series of daily units sold over the data's
+last ``HISTORY_DAYS`` days. The series are laid on a dense calendar,
+with no-sale days as zeros, and fitted together. Each step of a model updates
+every series at once, so a fit costs one pass over the calendar whatever the
+number of series. If NumPy is installed the steps are array operations
+(``pos_numpy.AVAILABLE``; ``POS_ENGINE=python`` forces the stdlib). Both
+paths perform the same float operations in the same order and give identical
+forecasts.
+
+Two lightweight models are fitted per series:
+
+- seasonal naive: the same weekday last week
+- additive Holt-Winters: level, trend and a 7-day weekday season, with fixed
+  smoothing (``ALPHA``, ``BETA``, ``GAMMA``)
+
+Each series uses the model with the lower one-step-ahead error over its last
+``EVAL_DAYS`` days. That mean absolute error is kept as the series'
+``error``. The prep quantity is the forecast plus that error, rounded up, so
+a typical miss does not run the item out. With less than a week of history,
+the forecast is the series' daily mean.
+"""
+
+from __future__ import annotations
+
+import math
+import os
+from collections import Counter
+from datetime import date, timedelta
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import pos_numpy
+from pos_columnar import ColumnarRows
+
+np = pos_numpy.np
+
+SEASON = 7
+HORIZON = 7
+HISTORY_DAYS = 12 * SEASON
+EVAL_DAYS = 4 * SEASON
+ALPHA, BETA, GAMMA = 0.3, 0.05, 0.2
+MODELS = ("daily_mean", "seasonal_naive", "holt_winters")
+MEAN, NAIVE, HOLT_WINTERS = range(3)
+
+
+class ItemForecast(NamedTuple):
+    item: str
+    units: float
+    prep: int
+
+
+class DemandForecast:
+    """Forecast units per (store, item) for the ``HORIZON`` days after the data's last date."""
+
+    def __init__(self, first: Optional[date], history: int, keys: List[Tuple[str, str]],
+                 units: List[Sequence[float]], errors: Sequence[float], models: Sequence[int]) -> None:
+        self.first = first  # first forecast day, None without data
+        self.history = history  # days of history fitted
+        self.keys = keys  # (store, item) per series
+        self.units = units  # per series, HORIZON daily forecasts
+        self.errors = errors
+        self.models = models
+
+    def __bool__(self) -> bool:
+        return bool(self.keys)
+
+    def days(self) -> List[date]:
+        return [self.first + timedelta(days=h) for h in range(HORIZON)] if self.first is not None else []
+
+    def model_counts(self) -> Dict[str, int]:
+        return {MODELS[k]: n for k, n in sorted(Counter(self.models).items())}
+
+    def items(self, day: date, store_id: Optional[str] = None) -> List[ItemForecast]:
+        """Forecast and prep units per item on ``day``, for one store or summed over stores, largest first."""
+        if self.first is None:
+            return []
+        h = (day - self.first).days
+        if not 0 <= h < HORIZON:
+            return []
+        units: Dict[str, float] = {}
+        prep: Dict[str, int] = {}
+        for (store, item), series, error in zip(self.keys, self.units, self.errors):
+            if store_id is not None and store != store_id:
+                continue
+            units[item] = units.get(item, 0.0) + series[h]
+            # Round away float residue before ceil so 2.0000000001 preps 2.
+            prep[item] = prep.get(item, 0) + math.ceil(round(series[h] + error, 6))
+        out = [ItemForecast(item, round(u, 1), prep[item]) for item, u in units.items() if prep[item] > 0]
+        out.sort(key=lambda f: (-f.units, f.item))
+        return out
+
+
+def _use_numpy() -> bool:
+    return pos_numpy.AVAILABLE and os.getenv("POS_ENGINE", "auto") != "python"
+
+
+def _window(cols: ColumnarRows, history_days: int) -> Tuple[int, int]:
+    last = max(cols.dates, default=0)
+    if not last:
+        return 0, 0
+    first = min((d for d in cols.dates if d), default=last)
+    return max(first, last - history_days + 1), last
+
+
+def _series_python(cols: ColumnarRows, lo: int, hi: int):
+    """(keys, day columns): ``columns[t][s]`` is series ``s``'s units on day ``lo + t``."""
+    ids: Dict[Tuple[int, int], int] = {}
+    cells = []
+    for store, item, day, qty in zip(cols.store_codes, cols.item_codes, cols.dates, cols.quantity):
+        if day < lo:
+            continue
+        s = ids.get((store, item))
+        if s is None:
+            s = ids[(store, item)] = len(ids)
+        cells.append((day - lo, s, qty))
+    columns = [[0.0] * len(ids) for _ in range(hi - lo + 1)]
+    for t, s, qty in cells:
+        columns[t][s] += qty
+    return list(ids), columns
+
+
+def _fit_python(columns: List[List[float]]):
+    T = len(columns)
+    S = len(columns[0])
+    if T < SEASON:
+        total = list(columns[0])
+        for col in columns[1:]:
+            total = [a + b for a, b in zip(total, col)]
+        mean = [v / T for v in total]
+        err = [0.0] * S
+        for col in columns:
+            err = [e + abs(v - m) for e, v, m in zip(err, col, mean)]
+        return [[m] * HORIZON for m in mean], [e / T for e in err], [MEAN] * S
+    level = list(columns[0])
+    for t in range(1, SEASON):
+        level = [a + b for a, b in zip(level, columns[t])]
+    level = [v / SEASON for v in level]
+    trend = [0.0] * S
+    season = [[y - l for y, l in zip(columns[k], level)] for k in range(SEASON)]
+    lo = max(SEASON, T - EVAL_DAYS)
+    err_hw = [0.0] * S
+    err_sn = [0.0] * S
+    for t in range(SEASON, T):
+        y, k = columns[t], t % SEASON
+        s_k = season[k]
+        if t >= lo:
+            err_hw = [e + abs(v - (l + b + s)) for e, v, l, b, s in zip(err_hw, y, level, trend, s_k)]
+            err_sn = [e + abs(v - w) for e, v, w in zip(err_sn, y, columns[t - SEASON])]
+        new_level = [ALPHA * (v - s) + (1 - ALPHA) * (l + b) for v, s, l, b in zip(y, s_k, level, trend)]
+        trend = [BETA * (n - l) + (1 - BETA) * b for n, l, b in zip(new_level, level, trend)]
+        season[k] = [GAMMA * (v - n) + (1 - GAMMA) * s for v, n, s in zip(y, new_level, s_k)]
+        level = new_level
+    n_eval = max(1, T - lo)
+    use_hw = [h < n for h, n in zip(err_hw, err_sn)]
+    units = []
+    for s in range(S):
+        if use_hw[s]:
+            units.append([max(0.0, level[s] + h * trend[s] + season[(T - 1 + h) % SEASON][s])
+                          for h in range(1, HORIZON + 1)])
+        else:
+            units.append([columns[T - SEASON + (h - 1) % SEASON][s] for h in range(1, HORIZON + 1)])
+    errors = [(h if hw else n) / n_eval for h, n, hw in zip(err_hw, err_sn, use_hw)]
+    return units, errors, [HOLT_WINTERS if hw else NAIVE for hw in use_hw]
+
+
+def _series_numpy(cols: ColumnarRows, lo: int, hi: int):
+    dates = np.frombuffer(cols.dates, dtype=np.intc)
+    keep = dates >= lo
+    stores = np.frombuffer(cols.store_codes, dtype=np.intc)[keep].astype(np.int64)
+    items = np.frombuffer(cols.item_codes, dtype=np.intc)[keep].astype(np.int64)
+    pairs = stores * (len(cols.items) + 1) + items
+    codes, s = np.unique(pairs, return_inverse=True)
+    matrix = np.zeros((hi - lo + 1, len(codes)))
+    # add.at sums in line order, like the stdlib loop.
+    np.add.at(matrix, ((dates[keep] - lo).astype(np.intp), s), np.frombuffer(cols.quantity, dtype=np.float64)[keep])
+    keys = [(int(c) // (len(cols.items) + 1), int(c) % (len(cols.items) + 1)) for c in codes]
+    return keys, matrix
+
+
+def _fit_numpy(matrix):
+    T, S = matrix.shape
+    if T < SEASON:
+        total = matrix[0].copy()
+        for t in range(1, T):
+            total = total + matrix[t]
+        mean = total / T
+        err = np.zeros(S)
+        for t in range(T):
+            err = err + np.abs(matrix[t] - mean)
+        return [[m] * HORIZON for m in mean.tolist()], (err / T).tolist(), [MEAN] * S
+    level = matrix[0].copy()
+    for t in range(1, SEASON):
+        level = level + matrix[t]
+    level = level / SEASON
+    trend = np.zeros(S)
+    season = [matrix[k] - level for k in range(SEASON)]
+    lo = max(SEASON, T - EVAL_DAYS)
+    err_hw = np.zeros(S)
+    err_sn = np.zeros(S)
+    for t in range(SEASON, T):
+        y, k = matrix[t], t % SEASON
+        s_k = season[k]
+        if t >= lo:
+            err_hw = err_hw + np.abs(y - (level + trend + s_k))
+            err_sn = err_sn + np.abs(y - matrix[t - SEASON])
+        new_level = ALPHA * (y - s_k) + (1 - ALPHA) * (level + trend)
+        trend = BETA * (new_level - level) + (1 - BETA) * trend
+        season[k] = GAMMA * (y - new_level) + (1 - GAMMA) * s_k
+        level = new_level
+    n_eval = max(1, T - lo)
+    use_hw = err_hw < err_sn
+    hw = np.stack([np.maximum(0.0, level + h * trend + season[(T - 1 + h) % SEASON])
+                   for h in range(1, HORIZON + 1)], axis=1)
+    naive = np.stack([matrix[T - SEASON + (h - 1) % SEASON] for h in range(1, HORIZON + 1)], axis=1)
+    units = np.where(use_hw[:, None], hw, naive)
+    errors = np.where(use_hw, err_hw, err_sn) / n_eval
+    return units.tolist(), errors.tolist(), [HOLT_WINTERS if h else NAIVE for h in use_hw.tolist()]
+
+
+def fit(cols: ColumnarRows, history_days: int = HISTORY_DAYS) -> DemandForecast:
+    """Fit every (store, item) series of ``cols`` over its last ``history_days`` days."""
+    lo, hi = _window(cols, history_days)
+    if not hi:
+        return DemandForecast(None, 0, [], [], [], [])
+    if _use_numpy():
+        codes, matrix = _series_numpy(cols, lo, hi)
+        units, errors, models = _fit_numpy(matrix)
+    else:
+        codes, columns = _series_python(cols, lo, hi)
+        units, errors, models = _fit_python(columns)
+    keys = [(cols.stores.values[store], cols.items.values[item]) for store, item in codes]
+    return DemandForecast(date.fromordinal(hi + 1), hi - lo + 1, keys, units, errors, models)
@@ -0,0 +1,241 @@
+"""Store x day x hour-of-day grid for labor-vs-demand questions.
+
+``HourGrid`` buckets timed sales lines (``ColumnarRows.hours``) and staff
+shifts into (store, business date, hour) cells: sales, orders, staffed
+minutes and labor cost. Shifts are spread over the hours by one sweep over
+each store's start/end events in time order, so overlapping shifts are
+handled as a running headcount and cost rate rather than per shift and hour.
+
+Like ``PrefixSums``, every store's cells sit on a dense calendar and are
+accumulated per hour of day, so the 24 hourly totals of any store and date
+window are two lookups per hour, whatever the window length.
+
+An order counts in the hour of its first timed line in its store, like the
+per-store order counts of ``store_metrics_map``. Lines without a
+timestamp or a business date are not in the grid. Shift hours are bucketed
+by the calendar day they fall on, so a shift past midnight lands on the next
+day.
+"""
+
+from __future__ import annotations
+
+from array import array
+from datetime import date
+from itertools import accumulate
+from operator import add
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from pos_columnar import ColumnarRows
+
+HOURS = 24
+MINUTES_PER_DAY = 24 * 60
+# Name -> hours of day; "late" wraps past midnight.
+DAYPARTS: Tuple[Tuple[str, Tuple[int, ...]], ...] = (
+    ("breakfast", tuple(range(6, 11))),
+    ("lunch", tuple(range(11, 14))),
+    ("afternoon", tuple(range(14, 17))),
+    ("dinner", tuple(range(17, 21))),
+    ("late", (21, 22, 23, 0, 1, 2, 3, 4, 5)),
+)
+
+
+class HourCell(NamedTuple):
+    hour: int
+    sales: float
+    orders: int
+    staff_hours: float
+    labor: float
+
+    @property
+    def labor_ratio(self) -> float:
+        return self.labor / self.sales * 100 if self.sales else 0.0
+
+    def active(self) -> bool:
+        return bool(self.sales or self.orders or self.staff_hours)
+
+
+def _cumulate(values: array, n_days: int) -> array:
+    """Running totals per hour of day: ``out[k * 24 + h]`` sums hour ``h`` over the first ``k`` days."""
+    out = array(values.typecode, bytes(values.itemsize * HOURS * (n_days + 1)))
+    for h in range(HOURS):
+        out[h::HOURS] = array(values.typecode, accumulate(values[h::HOURS], initial=0))
+    return out
+
+
+class HourGrid:
+    """Hourly sales, orders and staffing per store, cumulated over a dense calendar."""
+
+    def __init__(self) -> None:
+        self.first: Optional[date] = None
+        self.days = 0
+        self.timed_lines = 0
+        self.shifts = 0
+        # store (None: all stores) -> cumulative (sales cents, orders, staff minutes, labor cents)
+        self._series: Dict[Optional[str], Tuple[array, array, array, array]] = {}
+
+    def __bool__(self) -> bool:
+        return bool(self._series)
+
+    def stores(self) -> Tuple[str, ...]:
+        return tuple(s for s in self._series if s is not None)
+
+    @classmethod
+    def build(cls, cols: ColumnarRows, shifts: Iterable = ()) -> "HourGrid":
+        """Grid of ``cols``' timed lines and of ``shifts`` (``pos_shifts.Shift``-like:
+        ``store_id``, ``start``/``end`` in absolute minutes, ``labor_cents``)."""
+        acc = _Accumulator()
+        acc.add_rows(cols)
+        acc.add_shifts(shifts)
+        return acc.freeze(cls())
+
+    def _window(self, date_from: Optional[date], date_to: Optional[date]) -> Tuple[int, int]:
+        i = 0 if date_from is None else (date_from - self.first).days
+        j = self.days if date_to is None else (date_to - self.first).days + 1
+        return max(0, min(i, self.days)), max(0, min(j, self.days))
+
+    def by_hour(self, store_id: Optional[str] = None, date_from: Optional[date] = None,
+                date_to: Optional[date] = None) -> List[HourCell]:
+        """The 24 hourly totals of one store (or all stores) over an inclusive date window."""
+        series = self._series.get(store_id)
+        if series is None:
+            return [HourCell(h, 0.0, 0, 0.0, 0.0) for h in range(HOURS)]
+        i, j = self._window(date_from, date_to)
+        if j < i:
+            i = j
+        sales, orders, minutes, labor = series
+        lo, hi = i * HOURS, j * HOURS
+        return [
+            HourCell(h, (sales[hi + h] - sales[lo + h]) / 100, orders[hi + h] - orders[lo + h],
+                     (minutes[hi + h] - minutes[lo + h]) / 60, round(labor[hi + h] - labor[lo + h]) / 100)
+            for h in range(HOURS)
+        ]
+
+    def cell(self, store_id: Optional[str], day: date, hour: int) -> HourCell:
+        """One (store, day, hour) cell."""
+        series = self._series.get(store_id)
+        if series is None:
+            return HourCell(hour, 0.0, 0, 0.0, 0.0)
+        i, j = self._window(day, day)
+        if j <= i:
+            return HourCell(hour, 0.0, 0, 0.0, 0.0)
+        lo, hi = i * HOURS + hour, j * HOURS + hour
+        sales, orders, minutes, labor = series
+        return HourCell(hour, (sales[hi] - sales[lo]) / 100, orders[hi] - orders[lo],
+                        (minutes[hi] - minutes[lo]) / 60, round(labor[hi] - labor[lo]) / 100)
+
+
+class _Accumulator:
+    """Cells keyed by (store, date ordinal), 24 slots each, before cumulation."""
+
+    def __init__(self) -> None:
+        self.slots: Dict[Tuple[str, int], int] = {}
+        self.sales = array("q")
+        self.orders = array("q")
+        self.minutes = array("q")
+        self.labor = array("d")
+        self.timed_lines = 0
+        self.shifts = 0
+
+    def slot(self, store: str, day: int) -> int:
+        base = self.slots.get((store, day))
+        if base is None:
+            base = self.slots[(store, day)] = len(self.sales)
+            for values in (self.sales, self.orders, self.minutes, self.labor):
+                values.extend(array(values.typecode, bytes(values.itemsize * HOURS)))
+        return base
+
+    def add_rows(self, cols: ColumnarRows) -> None:
+        hours = cols.hours
+        if max(hours, default=-1) < 0:
+            return
+        stores, dates, store_codes = cols.stores.values, cols.dates, cols.store_codes
+        revenue, order_codes = cols.revenue, cols.order_codes
+        # One seen-table per store: order ids are only unique within a store.
+        seen: Dict[int, bytearray] = {}
+        n_orders = len(cols.orders)
+        slot, sales, orders = self.slot, self.sales, self.orders
+        timed = 0
+        for i, h in enumerate(hours):
+            day = dates[i]
+            if h < 0 or not day:
+                continue
+            store = store_codes[i]
+            c = slot(stores[store], day) + h
+            sales[c] += revenue[i]
+            store_seen = seen.get(store)
+            if store_seen is None:
+                store_seen = seen[store] = bytearray(n_orders)
+            code = order_codes[i]
+            if not store_seen[code]:
+                store_seen[code] = 1
+                orders[c] += 1
+            timed += 1
+        self.timed_lines += timed
+
+    def add_shifts(self, shifts: Iterable) -> None:
+        events: Dict[str, List[Tuple[int, int, float]]] = {}
+        for s in shifts:
+            if s.end <= s.start:
+                continue
+            rate = s.labor_cents / (s.end - s.start)
+            store_events = events.setdefault(s.store_id, [])
+            store_events.append((s.start, 1, rate))
+            store_events.append((s.end, -1, -rate))
+            self.shifts += 1
+        for store, store_events in events.items():
+            store_events.sort()
+            staff, rate, t = 0, 0.0, store_events[0][0]
+            for when, delta, step in store_events:
+                if staff and when > t:
+                    self._spread(store, t, when, staff, rate)
+                t = when
+                staff += delta
+                # Reset at zero headcount so float residue cannot carry into the next shift.
+                rate = rate + step if staff else 0.0
+
+    def _spread(self, store: str, start: int, end: int, staff: int, rate: float) -> None:
+        # ``staff`` people costing ``rate`` cents per minute in total, from ``start`` to ``end``.
+        while start < end:
+            stop = min(end, (start // 60 + 1) * 60)
+            day, minute = divmod(start, MINUTES_PER_DAY)
+            c = self.slot(store, day) + minute // 60
+            self.minutes[c] += staff * (stop - start)
+            self.labor[c] += rate * (stop - start)
+            start = stop
+
+    def freeze(self, grid: HourGrid) -> HourGrid:
+        grid.timed_lines, grid.shifts = self.timed_lines, self.shifts
+        if not self.slots:
+            return grid
+        first = min(day for _, day in self.slots)
+        n = max(day for _, day in self.slots) - first + 1
+        grid.first, grid.days = date.fromordinal(first), n
+        dense: Dict[Optional[str], Tuple[array, ...]] = {}
+        for (store, day), base in self.slots.items():
+            for scope in (store, None):
+                values = dense.get(scope)
+                if values is None:
+                    values = dense[scope] = tuple(array(v.typecode, bytes(v.itemsize * HOURS * n))
+                                                  for v in (self.sales, self.orders, self.minutes, self.labor))
+                at = (day - first) * HOURS
+                for out, src in zip(values, (self.sales, self.orders, self.minutes, self.labor)):
+                    out[at:at + HOURS] = array(src.typecode, map(add, out[at:at + HOURS], src[base:base + HOURS]))
+        grid._series = {scope: tuple(_cumulate(v, n) for v in values) for scope, values in dense.items()}
+        return grid
+
+
+def dayparts(cells: Sequence[HourCell]) -> List[Tuple[str, HourCell]]:
+    """Hourly cells rolled up into ``DAYPARTS``; each part's ``hour`` is its first hour."""
+    out = []
+    for name, hours in DAYPARTS:
+        part = [cells[h] for h in hours]
+        out.append((name, HourCell(hours[0], sum(c.sales for c in part), sum(c.orders for c in part),
+                                   sum(c.staff_hours for c in part), sum(c.labor for c in part))))
+    return out
+
+
+def labor_heavy_hours(cells: Sequence[HourCell], target_ratio: float = 30.0, limit: int = 3) -> List[HourCell]:
+    """Staffed hours whose labor exceeds ``target_ratio`` % of sales, largest excess labor first."""
+    heavy = [c for c in cells if c.staff_hours and c.labor > c.sales * target_ratio / 100]
+    heavy.sort(key=lambda c: c.labor - c.sales * target_ratio / 100, reverse=True)
+    return heavy[:limit]
@@ -0,0 +1,89 @@
+"""Inventory count exports (``<data_dir>/inventory/*.csv``).
+
+Inventory tools export one row per counted SKU and count date. The row may
+carry the quantity wasted since the previous count, the SKU's unit cost, or
+a ready-made waste cost. Columns are matched like POS exports
+(``match_columns``). A row needs a count date; a malformed date drops the row,
+and any bad value is quarantined (``pos_parse``).
+
+Unit costs are often filled in on some counts only. ``InventoryCount`` keeps
+what the row says (``unit_cost`` is None when the cell is empty), and
+``pos_costs`` values each waste quantity at the SKU's unit cost as of that
+count date.
+"""
+
+from __future__ import annotations
+
+import csv
+import glob
+import os
+from typing import Dict, Iterator, List, NamedTuple, Optional
+
+from pos_parse import BadValue, FieldParser, cents, match_columns, to_number
+
+INVENTORY_DIR = "inventory"
+
+INVENTORY_COLUMNS: Dict[str, List[str]] = {
+    "store_id": ["store_id", "location_id", "store", "location"],
+    "sku": ["sku", "item", "product", "ingredient"],
+    "snapshot_date": ["snapshot_date", "count_date", "business_date", "date"],
+    "unit_cost": ["unit_cost", "cost_per_unit", "avg_cost", "unit_price"],
+    "waste_qty": ["waste_qty", "wasted_qty", "waste_quantity", "waste_units"],
+    "waste_cost": ["waste_cost", "waste_value", "waste_amount"],
+}
+
+
+class InventoryCount(NamedTuple):
+    store_id: str
+    sku: str
+    day: int  # date ordinal of the count
+    unit_cost: Optional[float]
+    waste_qty: float
+    waste_cents: Optional[int]  # the export's own waste cost, when it has one
+
+
+def iter_file_counts(path: str, quarantine: Optional[List[BadValue]] = None) -> Iterator[InventoryCount]:
+    parser = FieldParser(os.path.basename(path), quarantine)
+    with open(path, newline="", encoding="utf-8") as fh:
+        reader = csv.reader(fh)
+        header = next(reader, None)
+        if header is None:
+            return
+        columns = match_columns(header, INVENTORY_COLUMNS)
+        index = {field: header.index(col) for field, col in columns.items() if col is not None}
+        for row in reader:
+            if not row:
+                continue
+            raw = {field: row[i] if i < len(row) else None for field, i in index.items()}
+            line = reader.line_num
+            try:
+                day = parser.date(raw.get("snapshot_date"))
+            except ValueError:
+                day = None
+            if day is None:
+                parser.bad(line, columns["snapshot_date"] or "snapshot_date", raw.get("snapshot_date"))
+                continue
+            values: Dict[str, Optional[float]] = {}
+            for field in ("unit_cost", "waste_qty", "waste_cost"):
+                value = raw.get(field)
+                if not value or not value.strip():
+                    values[field] = None
+                    continue
+                try:
+                    values[field] = to_number(value)
+                except ValueError:
+                    parser.bad(line, columns[field], value)
+                    values[field] = None
+            waste_cost = values["waste_cost"]
+            yield InventoryCount(raw.get("store_id") or "default-store", raw.get("sku") or "", day.toordinal(),
+                                 values["unit_cost"], values["waste_qty"] or 0.0,
+                                 None if waste_cost is None else cents(waste_cost))
+
+
+def inventory_files(data_dir: str) -> List[str]:
+    return sorted(glob.glob(os.path.join(data_dir, INVENTORY_DIR, "*.csv")))
+
+
+def load_inventory(data_dir: str, quarantine: Optional[List[BadValue]] = None) -> List[InventoryCount]:
+    """Every count under ``<data_dir>/inventory``; empty when there is no such directory."""
+    return [c for path in inventory_files(data_dir) for c in iter_file_counts(path, quarantine)]
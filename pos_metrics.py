@@ -0,0 +1,260 @@
+"""In-process metrics, timing spans and a sampling profiler (stdlib only).
+
+``METRICS`` holds counters and fixed-bucket histograms and renders them in
+the Prometheus text format for ``GET /metrics``. Updates are a lock and a
+bisect, cheap enough for the chat hot path. ``span``/``timed`` record the
+duration of a code path into ``pos_span_seconds{span=...}``; the pipeline
+uses these spans:
+
+- ``ingest``: a data directory refresh (``IngestCatalog.refresh``, SQLite sync)
+- ``parse``: CSV parse + normalization into columns
+- ``normalize``: the dict-row ``normalize`` path
+- ``snapshot``: building every aggregate of a snapshot
+- ``intent``: resolving a chat message to an intent and filter
+- ``answer``: producing the answer text
+- ``serialize``: JSON encoding and compression of response bodies
+
+Values owned elsewhere (router intent counts, cache counters, tenant
+memory) are exported by ``collector`` callbacks at scrape time, not copied.
+
+``SamplingProfiler`` is opt-in: every Nth request runs under ``cProfile``
+(and optionally ``tracemalloc``), and the stats are written to a directory
+for offline reading with ``pstats``.
+"""
+
+from __future__ import annotations
+
+import cProfile
+import itertools
+import os
+import threading
+import time
+import tracemalloc
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import wraps
+from typing import Callable, Dict, Iterable, Iterator, List, Sequence, Tuple
+
+# Seconds; spans range from microsecond lookups to minute-long ingests.
+DEFAULT_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# (labels, value) samples of one metric family.
+Samples = Iterable[Tuple[Dict[str, str], float]]
+# (name, type, help, samples) families produced by a collector.
+Family = Tuple[str, str, str, Samples]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(pairs: Iterable[Tuple[str, str]]) -> str:
+    body = ",".join(f'{k}="{_escape(str(v))}"' for k, v in pairs)
+    return f"{{{body}}}" if body else ""
+
+
+def _num(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, value in items:
+            lines.append(f"{self.name}{_labels(zip(self.labelnames, labels))} {_num(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts (last is +Inf), sum, count]
+        self._series: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str) -> None:
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def count(self, *labels: str) -> int:
+        series = self._series.get(labels)
+        return series[2] if series else 0
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((labels, (list(s[0]), s[1], s[2])) for labels, s in self._series.items())
+        for labels, (counts, total, count) in items:
+            pairs = list(zip(self.labelnames, labels))
+            running = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                running += n
+                lines.append(f"{self.name}_bucket{_labels(pairs + [('le', _num(float(bound)))])} {running}")
+            lines.append(f"{self.name}_sum{_labels(pairs)} {_num(total)}")
+            lines.append(f"{self.name}_count{_labels(pairs)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self._metrics: Dict[str, object] = {}
+        self._collectors: List[Callable[[], Iterable[Family]]] = []
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, help: str, labelnames: Sequence[str], **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, help, labelnames, **kwargs)
+            elif not isinstance(metric, cls) or metric.labelnames != tuple(labelnames):
+                raise ValueError(f"metric {name} already registered with a different type or labels")
+            return metric
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._get_or_create(Counter, name, help, labelnames)
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, help, labelnames, buckets=buckets)
+
+    def collector(self, fn: Callable[[], Iterable[Family]]) -> Callable[[], Iterable[Family]]:
+        """Register ``fn`` (usable as a decorator); it is called on every render."""
+        with self._lock:
+            self._collectors.append(fn)
+        return fn
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors)
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        for fn in collectors:
+            for name, kind, help, samples in fn():
+                lines += [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+                lines += [f"{name}{_labels(sorted(labels.items()))} {_num(value)}" for labels, value in samples]
+        return "\n".join(lines) + "\n"
+
+
+METRICS = MetricsRegistry()
+SPAN_SECONDS = METRICS.histogram("pos_span_seconds", "Time spent in instrumented code paths.", ("span",))
+
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        SPAN_SECONDS.observe(time.perf_counter() - t0, name)
+
+
+def timed(name: str):
+    """Decorator form of :func:`span`."""
+    def wrap(fn):
+        @wraps(fn)
+        def inner(*args, **kwargs):
+            t0 = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                SPAN_SECONDS.observe(time.perf_counter() - t0, name)
+        return inner
+    return wrap
+
+
+class SamplingProfiler:
+    """Profiles one request in every ``every`` (0 disables) and dumps the stats to ``out_dir``.
+
+    Each sample writes ``<time>-<label>-<n>.prof`` (``pstats`` format) and, with
+    ``memory``, ``<time>-<label>-<n>.mem.txt`` listing the top allocation sites
+    of that request. One request is profiled at a time; samples that land while
+    another is running are skipped.
+    """
+
+    def __init__(self, every: int = 0, out_dir: str = "profiles", memory: bool = False, top: int = 25) -> None:
+        self.every = every
+        self.out_dir = out_dir
+        self.memory = memory
+        self.top = top
+        self.samples = 0
+        self._requests = itertools.count(1)
+        self._busy = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "SamplingProfiler":
+        return cls(int(os.getenv("PROFILE_EVERY", "0")), os.getenv("PROFILE_DIR", "profiles"),
+                   os.getenv("PROFILE_MEMORY", "0") == "1")
+
+    def _path(self, label: str, n: int, suffix: str) -> str:
+        safe = "".join(c if c.isalnum() else "_" for c in label).strip("_") or "root"
+        return os.path.join(self.out_dir, f"{time.strftime('%Y%m%dT%H%M%S')}-{safe}-{n}{suffix}")
+
+    @contextmanager
+    def sample(self, label: str) -> Iterator[None]:
+        if self.every <= 0:
+            yield
+            return
+        n = next(self._requests)
+        if n % self.every or not self._busy.acquire(blocking=False):
+            yield
+            return
+        profile = cProfile.Profile()
+        tracing = self.memory and not tracemalloc.is_tracing()
+        try:
+            if tracing:
+                tracemalloc.start()
+            try:
+                profile.enable()
+            except ValueError:
+                # Another profiler owns the interpreter hook; run unprofiled.
+                profile = None
+            try:
+                yield
+            finally:
+                if profile is not None:
+                    profile.disable()
+                os.makedirs(self.out_dir, exist_ok=True)
+                if profile is not None:
+                    profile.dump_stats(self._path(label, n, ".prof"))
+                if tracing:
+                    stats = tracemalloc.take_snapshot().statistics("lineno")[: self.top]
+                    peak = tracemalloc.get_traced_memory()[1]
+                    with open(self._path(label, n, ".mem.txt"), "w", encoding="utf-8") as fh:
+                        fh.write(f"peak traced bytes: {peak}\n")
+                        fh.writelines(f"{stat}\n" for stat in stats)
+                self.samples += 1
+        finally:
+            if tracing:
+                tracemalloc.stop()
+            self._busy.release()
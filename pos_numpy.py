@@ -0,0 +1,125 @@
+"""Optional NumPy aggregation engine for ``ColumnarRows``.
+
+Mirrors ``pos_columnar.totals``/``totals_by`` with grouped reductions over the
+coded columns (``bincount``/``unique``) instead of per-row Python loops. The
+results are identical to the stdlib kernels: money columns are integer cents,
+whose sums are exact in int64 (and in ``bincount``'s float64 weights below
+2**53 cents), and top-item ties resolve to the item seen first within the
+group. When NumPy is not installed ``AVAILABLE`` is False and
+callers fall back to ``pos_columnar``.
+"""
+
+from __future__ import annotations
+
+from array import array
+from typing import Dict, Optional
+
+from pos_columnar import ColumnarRows, GroupTotals
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - exercised only without numpy
+    np = None
+
+AVAILABLE = np is not None
+
+
+def _view(col: array, dtype):
+    if not len(col):
+        return np.empty(0, dtype=dtype)
+    return np.frombuffer(col, dtype=dtype)
+
+
+def _dollars(cents) -> float:
+    return int(cents.sum()) / 100
+
+
+def _distinct(values):
+    """Sorted distinct values; sort-based, which beats hash-based ``np.unique`` on int codes."""
+    if not len(values):
+        return values
+    s = np.sort(values)
+    return s[np.r_[True, s[1:] != s[:-1]]]
+
+
+def _dense_groups(k):
+    """Map keys to dense group ids ordered by value, plus each group's first row index."""
+    base = int(k.min())
+    idx = (k - base).astype(np.intp)
+    span = int(idx.max()) + 1
+    first = np.full(span, len(k), dtype=np.intp)
+    np.minimum.at(first, idx, np.arange(len(k), dtype=np.intp))
+    present = first < len(k)
+    remap = np.cumsum(present) - 1
+    return np.flatnonzero(present) + base, first[present], remap[idx]
+
+
+def totals(cols: ColumnarRows) -> GroupTotals:
+    rev = _view(cols.revenue, np.int64)
+    items = _view(cols.item_codes, np.intc)
+    top_item, top_sales = "n/a", 0.0
+    if len(items):
+        n_items = len(cols.items)
+        sales = np.bincount(items, weights=rev, minlength=n_items)
+        sales[np.bincount(items, minlength=n_items) == 0] = -np.inf
+        code = int(np.argmax(sales))
+        top_item, top_sales = cols.items.values[code], int(sales[code]) / 100
+    return GroupTotals(
+        revenue=_dollars(rev),
+        labor=_dollars(_view(cols.labor, np.int64)),
+        waste=_dollars(_view(cols.waste, np.int64)),
+        orders=int(_distinct(_view(cols.order_codes, np.intc)).size),
+        top_item=top_item,
+        top_sales=top_sales,
+    )
+
+
+def totals_by(cols: ColumnarRows, keys: array, track_items: bool = True,
+              skip: Optional[int] = None) -> Dict[int, GroupTotals]:
+    k = _view(keys, np.intc)
+    rev = _view(cols.revenue, np.int64)
+    lab = _view(cols.labor, np.int64)
+    wst = _view(cols.waste, np.int64)
+    orders = _view(cols.order_codes, np.intc).astype(np.int64)
+    items = _view(cols.item_codes, np.intc).astype(np.int64)
+    if skip is not None:
+        keep = k != skip
+        k, rev, lab, wst, orders, items = k[keep], rev[keep], lab[keep], wst[keep], orders[keep], items[keep]
+    if not len(k):
+        return {}
+
+    uniq, first_seen, group = _dense_groups(k)
+    n_groups = len(uniq)
+    rev_sum = np.bincount(group, weights=rev, minlength=n_groups)
+    lab_sum = np.bincount(group, weights=lab, minlength=n_groups)
+    wst_sum = np.bincount(group, weights=wst, minlength=n_groups)
+
+    n_orders = max(len(cols.orders), 1)
+    order_pairs = _distinct(group.astype(np.int64) * n_orders + orders)
+    order_counts = np.bincount(order_pairs // n_orders, minlength=n_groups)
+
+    top_names = ["n/a"] * n_groups
+    top_sales = [0.0] * n_groups
+    if track_items:
+        n_items = max(len(cols.items), 1)
+        pairs, pair_first, pair_idx = np.unique(
+            group.astype(np.int64) * n_items + items, return_index=True, return_inverse=True
+        )
+        pair_sales = np.bincount(pair_idx, weights=rev, minlength=len(pairs))
+        pair_group = pairs // n_items
+        # Per group: highest sales first, then the item seen earliest.
+        order = np.lexsort((pair_first, -pair_sales, pair_group))
+        sorted_groups = pair_group[order]
+        starts = order[np.flatnonzero(np.r_[True, sorted_groups[1:] != sorted_groups[:-1]])]
+        for pos in starts.tolist():
+            g = int(pair_group[pos])
+            top_names[g] = cols.items.values[int(pairs[pos] % n_items)]
+            top_sales[g] = int(pair_sales[pos]) / 100
+
+    out: Dict[int, GroupTotals] = {}
+    for g in np.argsort(first_seen, kind="stable").tolist():
+        out[int(uniq[g])] = GroupTotals(
+            int(rev_sum[g]) / 100, int(lab_sum[g]) / 100, int(wst_sum[g]) / 100,
+            int(order_counts[g]), top_names[g], top_sales[g],
+        )
+    return out
@@ -0,0 +1,175 @@
+"""Parsing kernel for raw CSV field values.
+
+An export has a handful of distinct business dates and mostly plain decimal
+amounts, so the per-row work is kept to the cheap cases:
+
+- dates are memoized per file: each distinct ``YYYY-MM-DD`` prefix is parsed
+  once, then looked up;
+- amounts go straight to ``float()`` (the C fast path for ``"12.50"``) and only
+  a value that fails is cleaned up (surrounding spaces, currency symbol,
+  thousands separators, accounting parentheses). Records keep dollars; the
+  columnar store, the aggregators and the cost sources round them to integer
+  cents with ``cents`` (``to_cents`` for raw cells), so money sums are exact;
+- order timestamps are reduced to the hour of day (``parse_time``), read
+  from a time column or from the time part of the date column;
+- a value that still does not parse is not silently zeroed: the field falls
+  back to its default and a ``BadValue`` (file, line, column, raw value) is
+  added to the file's quarantine list.
+
+Empty cells are missing values, not malformed ones, and are not quarantined.
+"""
+
+from __future__ import annotations
+
+import csv
+from datetime import date
+from typing import Dict, Iterable, List, Mapping, NamedTuple, Optional, Sequence, TextIO
+
+CURRENCY_SYMBOLS = "$€£¥"
+
+
+class BadValue(NamedTuple):
+    """A raw value that could not be parsed and was replaced by the field default."""
+
+    source: str
+    line: int  # line in the source file; the header is line 1
+    column: str  # header of the source column
+    value: str
+
+
+def match_column(cols: Sequence[str], candidates: Sequence[str]) -> Optional[str]:
+    """First header matching a candidate name exactly (case-insensitive), else by substring."""
+    lower_map = {c.lower().strip(): c for c in cols}
+    for key in candidates:
+        if key in lower_map:
+            return lower_map[key]
+    for c in cols:
+        cl = c.lower().strip()
+        for key in candidates:
+            if key in cl:
+                return c
+    return None
+
+
+def match_columns(header: Sequence[str], candidates: Mapping[str, Sequence[str]]) -> Dict[str, Optional[str]]:
+    """Field -> matching header column (or None) for every field in ``candidates``."""
+    return {field: match_column(header, names) for field, names in candidates.items()}
+
+
+def _clean(v: str):
+    """(negative, digits) for '$1,234.50', '(12.00)', '-$5', ' 7 '."""
+    s = v.strip()
+    negative = False
+    if s[:1] == "(" and s[-1:] == ")":
+        negative, s = True, s[1:-1].strip()
+    if s[:1] == "-":
+        negative, s = not negative, s[1:].lstrip()
+    return negative, s.lstrip(CURRENCY_SYMBOLS).replace(",", "").strip()
+
+
+def to_number(v: Optional[str]) -> float:
+    """Decimal string -> float; 0.0 for an empty cell, ValueError if malformed."""
+    try:
+        x = float(v)
+    except (TypeError, ValueError):
+        if v is None or not v.strip():
+            return 0.0
+        negative, s = _clean(v)
+        x = float(s)
+        if negative:
+            x = -x
+    if x - x != 0.0:
+        # nan and +/-inf parse as floats but are not amounts.
+        raise ValueError(f"not a number: {v!r}")
+    return x
+
+
+def cents(amount: float) -> int:
+    """Dollar amount -> integer cents, the one rounding every money sum goes through."""
+    return round(float(amount) * 100)
+
+
+def to_cents(v: Optional[str]) -> int:
+    """Amount -> integer cents; 0 for an empty cell, ValueError if malformed."""
+    return cents(to_number(v))
+
+
+def parse_date(v: Optional[str]) -> Optional[date]:
+    """ISO business date (anything after the first 10 characters is ignored)."""
+    if not v:
+        return None
+    return date.fromisoformat(v[:10])
+
+
+def parse_time(v: Optional[str]) -> Optional[int]:
+    """Minutes after midnight from an ISO timestamp or a clock time ("17:30", "5:30 PM").
+
+    None when the value has no time part; ValueError if malformed. UTC offsets
+    are ignored: POS exports write store-local wall-clock times.
+    """
+    if not v:
+        return None
+    s = v.strip()
+    if len(s) >= 10 and s[4:5] == "-" and s[7:8] == "-":
+        s = s[11:].strip()
+        if not s:
+            return None
+    upper = s.upper()
+    meridiem = upper[-2:] if upper.endswith(("AM", "PM")) else ""
+    if meridiem:
+        s = s[:-2].rstrip()
+    hh, _, rest = s.partition(":")
+    h, m = int(hh), int(rest[:2]) if rest else 0
+    if meridiem:
+        if not 1 <= h <= 12:
+            raise ValueError(f"not a time: {v!r}")
+        h = h % 12 + (12 if meridiem == "PM" else 0)
+    if not (0 <= h < 24 and 0 <= m < 60):
+        raise ValueError(f"not a time: {v!r}")
+    return h * 60 + m
+
+
+class FieldParser:
+    """Per-file parse state: the date memo and the quarantine list."""
+
+    def __init__(self, source: str = "", quarantine: Optional[List[BadValue]] = None) -> None:
+        self.source = source
+        self.quarantine: List[BadValue] = [] if quarantine is None else quarantine
+        self._dates: Dict[Optional[str], Optional[date]] = {None: None, "": None}
+
+    def bad(self, line: int, column: str, value: object) -> None:
+        self.quarantine.append(BadValue(self.source, line, column, "" if value is None else str(value)))
+
+    def date(self, v: Optional[str]) -> Optional[date]:
+        """Memoized ``parse_date``; raises ValueError if malformed."""
+        dates = self._dates
+        try:
+            return dates[v]
+        except KeyError:
+            pass
+        # Timestamps are looked up by their date prefix and not remembered whole.
+        key = v[:10]
+        try:
+            return dates[key]
+        except KeyError:
+            d = dates[key] = parse_date(key)
+            return d
+
+
+def by_source(entries: Iterable[BadValue]) -> Dict[str, List[BadValue]]:
+    """Quarantine entries grouped per source file, in first-seen order."""
+    out: Dict[str, List[BadValue]] = {}
+    for e in entries:
+        out.setdefault(e.source, []).append(e)
+    return out
+
+
+def write_report(entries: Iterable[BadValue], fh: TextIO) -> int:
+    """Write quarantine entries as CSV (source, line, column, value); returns the count."""
+    writer = csv.writer(fh)
+    writer.writerow(BadValue._fields)
+    n = 0
+    for e in entries:
+        writer.writerow(e)
+        n += 1
+    return n
@@ -0,0 +1,187 @@
+"""Daily pre-aggregates partitioned by business date and store.
+
+``PartitionIndex`` folds ``ColumnarRows`` once into one cell per
+(date, store): revenue/labor/waste sums in cents, distinct-order counts and per-item
+sales. Orders are counted with ``pos_distinct.DistinctCounter``: a cell keeps
+the number of orders seen only in that cell and, for the few tickets that span
+cells (e.g. past midnight or across a store transfer), their sorted codes, so
+merged windows stay exact without a set of order codes per cell. A windowed query bisects the sorted date list and merges only the cells
+inside the window, so its cost grows with the window (days x stores), not with
+the history. Rows without a date land in a separate undated partition that is
+only included when no date bound is given.
+
+``pos_sqlite.SqliteStore`` answers the same ``totals``/``store_totals``/
+``daily_totals``/``date_bounds`` queries from its rollup tables.
+"""
+
+from __future__ import annotations
+
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import date
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from pos_columnar import ColumnarRows, GroupTotals
+from pos_distinct import DistinctCounter, union_count
+
+
+class _Cell:
+    """Aggregates for one (date, store) partition."""
+
+    __slots__ = ("first", "revenue", "labor", "waste", "orders", "shared", "items")
+
+    def __init__(self, first: int) -> None:
+        self.first = first
+        # Cents, like the columns they are summed from.
+        self.revenue = 0
+        self.labor = 0
+        self.waste = 0
+        # Orders seen in this cell only, and sorted codes of orders also seen in other cells.
+        self.orders = 0
+        self.shared: Optional[array] = None
+        # item code -> [sales in cents, first row index]; the row index breaks top-item ties.
+        self.items: Dict[int, List[int]] = {}
+
+
+def _merge(cells: Iterator[_Cell], item_names: List[str], track_items: bool = True) -> GroupTotals:
+    revenue = labor = waste = 0
+    orders = 0
+    shared: List[array] = []
+    items: Dict[int, List[int]] = {}
+    for cell in cells:
+        revenue += cell.revenue
+        labor += cell.labor
+        waste += cell.waste
+        orders += cell.orders
+        if cell.shared is not None:
+            shared.append(cell.shared)
+        if track_items:
+            for code, (sales, first) in cell.items.items():
+                acc = items.get(code)
+                if acc is None:
+                    items[code] = [sales, first]
+                else:
+                    acc[0] += sales
+                    if first < acc[1]:
+                        acc[1] = first
+    n_orders = union_count(orders, shared) if len(shared) > 1 else orders + sum(map(len, shared))
+    if not items:
+        return GroupTotals(revenue / 100, labor / 100, waste / 100, n_orders, "n/a", 0.0)
+    code, (sales, _) = min(items.items(), key=lambda kv: (-kv[1][0], kv[1][1]))
+    return GroupTotals(revenue / 100, labor / 100, waste / 100, n_orders, item_names[code], sales / 100)
+
+
+class PartitionIndex:
+    """Window/store lookups over per-(date, store) cells of one dataset."""
+
+    def __init__(self, cols: ColumnarRows) -> None:
+        self.store_names: List[str] = list(cols.stores.values)
+        self.item_names: List[str] = list(cols.items.values)
+        self._store_codes = {name: code for code, name in enumerate(self.store_names)}
+        # ordinal -> store code -> cell; ordinal 0 holds undated rows.
+        by_day: Dict[int, Dict[int, _Cell]] = {}
+        cells: List[_Cell] = []
+        # Cell number of every row, for the distinct-order pass.
+        row_cells = array("i")
+        for i, (day, store, rev, lab, wst, item) in enumerate(zip(
+            cols.dates, cols.store_codes, cols.revenue, cols.labor, cols.waste, cols.item_codes
+        )):
+            stores = by_day.get(day)
+            if stores is None:
+                stores = by_day[day] = {}
+            cell = stores.get(store)
+            if cell is None:
+                cell = stores[store] = _Cell(i)
+                # Holds the cell number until the order pass below.
+                cell.orders = len(cells)
+                cells.append(cell)
+            row_cells.append(cell.orders)
+            cell.revenue += rev
+            cell.labor += lab
+            cell.waste += wst
+            acc = cell.items.get(item)
+            if acc is None:
+                cell.items[item] = [rev, i]
+            else:
+                acc[0] += rev
+        counter = DistinctCounter(len(cols.orders))
+        counter.extend(zip(row_cells, cols.order_codes))
+        exclusive = counter.exclusive_counts()
+        shared = counter.shared_codes()
+        for n, cell in enumerate(cells):
+            cell.orders = exclusive.get(n, 0)
+            cell.shared = shared.get(n)
+        self._undated = by_day.pop(0, {})
+        self.days: List[int] = sorted(by_day)
+        self._cells = [by_day[d] for d in self.days]
+
+    def date_bounds(self) -> Optional[Tuple[date, date]]:
+        if not self.days:
+            return None
+        return date.fromordinal(self.days[0]), date.fromordinal(self.days[-1])
+
+    def _window(self, date_from: Optional[date], date_to: Optional[date]) -> Tuple[int, int]:
+        lo = bisect_left(self.days, date_from.toordinal()) if date_from else 0
+        hi = bisect_right(self.days, date_to.toordinal()) if date_to else len(self.days)
+        return lo, hi
+
+    def _iter_cells(self, store_id: Optional[str], date_from: Optional[date],
+                    date_to: Optional[date]) -> Iterator[_Cell]:
+        parts = self._cells[slice(*self._window(date_from, date_to))]
+        if date_from is None and date_to is None:
+            parts = parts + [self._undated]
+        if store_id is None:
+            for stores in parts:
+                yield from stores.values()
+            return
+        code = self._store_codes.get(store_id)
+        if code is None:
+            return
+        for stores in parts:
+            cell = stores.get(code)
+            if cell is not None:
+                yield cell
+
+    def totals(self, store_id: Optional[str] = None, date_from: Optional[date] = None,
+               date_to: Optional[date] = None) -> GroupTotals:
+        return _merge(self._iter_cells(store_id, date_from, date_to), self.item_names)
+
+    def store_totals(self, date_from: Optional[date] = None,
+                     date_to: Optional[date] = None) -> Dict[str, GroupTotals]:
+        """Per-store totals for stores with rows in the window, in first-seen order within it."""
+        parts = self._cells[slice(*self._window(date_from, date_to))]
+        if date_from is None and date_to is None:
+            parts = parts + [self._undated]
+        by_store: Dict[int, List[_Cell]] = {}
+        for stores in parts:
+            for code, cell in stores.items():
+                by_store.setdefault(code, []).append(cell)
+        ordered = sorted(by_store, key=lambda code: min(cell.first for cell in by_store[code]))
+        return {self.store_names[code]: _merge(iter(by_store[code]), self.item_names) for code in ordered}
+
+    def daily_totals(self, store_id: Optional[str] = None, date_from: Optional[date] = None,
+                     date_to: Optional[date] = None) -> Dict[date, GroupTotals]:
+        """Per-day totals (no top item) inside the window."""
+        lo, hi = self._window(date_from, date_to)
+        code = self._store_codes.get(store_id) if store_id is not None else None
+        out: Dict[date, GroupTotals] = {}
+        for day, stores in zip(self.days[lo:hi], self._cells[lo:hi]):
+            if store_id is None:
+                cells = list(stores.values())
+            else:
+                cells = [stores[code]] if code in stores else []
+            if cells:
+                out[date.fromordinal(day)] = _merge(iter(cells), self.item_names, track_items=False)
+        return out
+
+    def daily_by_store(self) -> Dict[str, Dict[date, GroupTotals]]:
+        """Per-store daily totals (no top item) in one pass over the cells."""
+        out: Dict[str, Dict[date, GroupTotals]] = {name: {} for name in self.store_names}
+        for day, stores in zip(self.days, self._cells):
+            d = date.fromordinal(day)
+            for code, cell in stores.items():
+                out[self.store_names[code]][d] = GroupTotals(
+                    cell.revenue / 100, cell.labor / 100, cell.waste / 100, cell.orders + len(cell.shared or ()),
+                    "n/a", 0.0,
+                )
+        return out
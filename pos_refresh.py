@@ -0,0 +1,230 @@
+"""Incremental ingest of a POS data directory.
+
+``IngestCatalog`` keeps one parsed ``ColumnarRows`` chunk per CSV together
+with the file's fingerprint (mtime, size, content hash). ``refresh`` re-parses
+only files that are new or whose content changed, drops deleted files, and
+``rows`` stitches the chunks back together in sorted file order so the merged
+data aggregates exactly like a cold load, dropping lines that repeat an
+earlier file (``pos_dedup``). Chunks are cached raw: which copy of a line
+survives depends on the other files, so dedup reruns over the whole set. With a ``ColumnCache``, first-seen
+files are mapped from the on-disk cache instead of parsed. Shift exports
+under ``shifts/`` and inventory counts under ``inventory/`` are fingerprinted
+too and re-read when any of their files changes (``SideExports``); they feed
+the snapshot's hourly grid (``pos_hourly``) and its labor and waste
+(``pos_costs``). ``DataRefresher``
+polls a catalog in a daemon thread and hands each new snapshot to a publish
+callback, which swaps it into server state with a single reference assignment.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import threading
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+import mvp_pos_insight_bot as bot
+from pos_cache import ColumnCache
+from pos_columnar import ColumnarRows
+from pos_costs import LABOR, WASTE
+from pos_dedup import LineIndex, dedup_chunks
+from pos_metrics import timed
+from pos_parse import BadValue
+from pos_inventory import inventory_files, iter_file_counts
+from pos_shifts import iter_file_shifts, shift_files
+
+log = logging.getLogger(__name__)
+
+
+class FileFingerprint(NamedTuple):
+    mtime_ns: int
+    size: int
+    sha256: str
+
+
+def _sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def fingerprint(path: str, previous: Optional[FileFingerprint] = None) -> FileFingerprint:
+    """Fingerprint ``path``; the content hash is reused while mtime and size are unchanged."""
+    st = os.stat(path)
+    if previous is not None and previous.mtime_ns == st.st_mtime_ns and previous.size == st.st_size:
+        return previous
+    return FileFingerprint(st.st_mtime_ns, st.st_size, _sha256(path))
+
+
+class SideExports:
+    """One kind of non-POS export (shifts, inventory counts), re-read whole when any file changes.
+
+    These exports are small next to the sales lines, so there is no per-file
+    chunking: ``refresh`` compares fingerprints and, on a change, reads every
+    file again with ``read(path, quarantine)``.
+    """
+
+    def __init__(self, label: str, list_files: Callable[[str], List[str]],
+                 read: Callable[[str, List[BadValue]], Iterator]) -> None:
+        self.label = label
+        self.list_files = list_files
+        self.read = read
+        self.files: Dict[str, FileFingerprint] = {}
+        self.items: List[object] = []
+        self.quarantine: List[BadValue] = []
+
+    def refresh(self, data_dir: str) -> bool:
+        files = {path: fingerprint(path, self.files.get(path)) for path in self.list_files(data_dir)}
+        if files == self.files:
+            return False
+        bad: List[BadValue] = []
+        self.items = [item for path in files for item in self.read(path, bad)]
+        self.files, self.quarantine = files, bad
+        if bad:
+            log.warning("%s: %d malformed value(s) quarantined (first: %s line %d, %s=%r)", self.label, len(bad),
+                        bad[0].source, bad[0].line, bad[0].column, bad[0].value)
+        return True
+
+
+class IngestCatalog:
+    """Per-file parsed chunks for one data directory."""
+
+    def __init__(self, data_dir: str, cache: Optional[ColumnCache] = None, workers: int = 1,
+                 dedup: bool = True, spill_dir: Optional[str] = None) -> None:
+        self.data_dir = data_dir
+        self.cache = cache
+        self.workers = workers
+        self.dedup = dedup
+        self.spill_dir = spill_dir
+        self.files: Dict[str, Tuple[FileFingerprint, ColumnarRows]] = {}
+        self.parsed_files = 0
+        self.duplicates: Dict[str, int] = {}
+        self.shifts = SideExports("shifts", shift_files, iter_file_shifts)
+        self.inventory = SideExports("inventory", inventory_files, iter_file_counts)
+
+    def _parse(self, pending: Dict[str, FileFingerprint]) -> Dict[str, ColumnarRows]:
+        paths = list(pending)
+        chunks = dict(zip(paths, bot.parse_files(paths, self.workers)))
+        self.parsed_files += len(paths)
+        for path, chunk in chunks.items():
+            if chunk.quarantine:
+                log.warning("%s: %d malformed value(s) quarantined (first: line %d, %s=%r)", path,
+                            len(chunk.quarantine), chunk.quarantine[0].line, chunk.quarantine[0].column,
+                            chunk.quarantine[0].value)
+        if self.cache is not None:
+            for path, fp in pending.items():
+                self.cache.store(path, fp.mtime_ns, fp.size, fp.sha256, chunks[path])
+        return chunks
+
+    def _from_cache(self, path: str) -> Optional[Tuple[FileFingerprint, ColumnarRows]]:
+        if self.cache is None:
+            return None
+        st = os.stat(path)
+        hit = self.cache.load(path, st.st_mtime_ns, st.st_size)
+        if hit is None:
+            return None
+        return FileFingerprint(st.st_mtime_ns, st.st_size, hit.sha256), hit.rows
+
+    @timed("ingest")
+    def refresh(self) -> bool:
+        """Fold new/changed files into the catalog; returns True if the data changed."""
+        changed = False
+        paths = bot.csv_files(self.data_dir)
+        current: Dict[str, Tuple[FileFingerprint, ColumnarRows]] = {}
+        pending: Dict[str, FileFingerprint] = {}
+        for path in paths:
+            prev = self.files.get(path)
+            if prev is None:
+                cached = self._from_cache(path)
+                if cached is not None:
+                    current[path] = cached
+                    changed = True
+                    continue
+            fp = fingerprint(path, prev[0] if prev else None)
+            if prev is not None and prev[0].sha256 == fp.sha256:
+                if fp is not prev[0] and self.cache is not None:
+                    # Touched but identical: re-key the cache so the next cold start still hits.
+                    self.cache.store(path, fp.mtime_ns, fp.size, fp.sha256, prev[1])
+                current[path] = (fp, prev[1])
+                continue
+            pending[path] = fp
+            changed = True
+        if pending:
+            for path, chunk in self._parse(pending).items():
+                current[path] = (pending[path], chunk)
+        if current.keys() != self.files.keys():
+            changed = True
+        # Rebuild in sorted file order so concatenation order never depends on parse order.
+        self.files = {path: current[path] for path in paths}
+        # Refresh both side exports; ``or`` would skip the second once the first changed.
+        side_changed = [side.refresh(self.data_dir) for side in (self.shifts, self.inventory)]
+        return any(side_changed) or changed
+
+    def rows(self) -> ColumnarRows:
+        chunks = [chunk for _, chunk in self.files.values()]
+        if self.dedup:
+            with LineIndex(self.spill_dir) as index:
+                chunks = dedup_chunks(chunks, [os.path.basename(p) for p in self.files], index)
+        rows = ColumnarRows.concat(chunks)
+        if rows.duplicates != self.duplicates:
+            for source, n in rows.duplicates.items():
+                log.info("%s: %d duplicate line(s) already in an earlier file dropped", source, n)
+            self.duplicates = rows.duplicates
+        return rows
+
+    def quarantine(self) -> List[BadValue]:
+        """Malformed values of the current files, in file order, then those of the shift and inventory files."""
+        return ([bad for _, chunk in self.files.values() for bad in chunk.quarantine]
+                + self.shifts.quarantine + self.inventory.quarantine)
+
+    def snapshot(self) -> bot.AnalyticsSnapshot:
+        snapshot = bot.build_snapshot(self.rows(), shifts=self.shifts.items, inventory=self.inventory.items)
+        if snapshot.costs is not None:
+            for label, kind in (("shift labor", LABOR), ("inventory waste", WASTE)):
+                if snapshot.costs.unmatched[kind]:
+                    log.warning("%s: $%.2f matched no store with sales on those days", label,
+                                snapshot.costs.unmatched[kind] / 100)
+        return snapshot
+
+
+class DataRefresher:
+    """Polls an ``IngestCatalog`` and publishes a fresh snapshot when files change."""
+
+    def __init__(
+        self,
+        catalog: IngestCatalog,
+        publish: Callable[[bot.AnalyticsSnapshot], None],
+        interval: float = 60.0,
+    ) -> None:
+        self.catalog = catalog
+        self.publish = publish
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def refresh_once(self) -> bool:
+        if not self.catalog.refresh():
+            return False
+        self.publish(self.catalog.snapshot())
+        return True
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.refresh_once()
+            except Exception:
+                # Keep serving the last good snapshot; the next poll retries.
+                log.exception("data refresh failed for %s", self.catalog.data_dir)
+
+    def start(self) -> "DataRefresher":
+        self._thread = threading.Thread(target=self._run, name="pos-data-refresher", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
@@ -0,0 +1,113 @@
+"""Staff shift exports (``<data_dir>/shifts/*.csv``).
+
+Scheduling and payroll tools export one row per shift: store, staff member,
+clock-in and clock-out, and either the shift's labor cost or an hourly rate.
+Columns are matched like POS exports (``match_columns``). Start and end may be
+full timestamps or clock times next to a shift date column; an end before the
+start is an overnight shift. Times are kept as absolute minutes
+(``date ordinal * 1440 + minute of day``) so shifts sort and subtract as ints.
+
+A row without a usable start or end cannot be placed in time: its bad value
+is quarantined (``pos_parse``) and the row is skipped.
+"""
+
+from __future__ import annotations
+
+import csv
+import glob
+import os
+from typing import Dict, Iterator, List, NamedTuple, Optional
+
+from pos_parse import BadValue, FieldParser, cents, match_columns, parse_date, parse_time, to_cents, to_number
+
+SHIFTS_DIR = "shifts"
+MINUTES_PER_DAY = 24 * 60
+
+SHIFT_COLUMNS: Dict[str, List[str]] = {
+    "store_id": ["store_id", "location_id", "store", "location"],
+    "staff_id": ["staff_id", "employee_id", "employee", "staff", "team_member"],
+    "shift_date": ["shift_date", "business_date", "date"],
+    "start": ["start_ts", "clock_in", "start_time", "shift_start", "start"],
+    "end": ["end_ts", "clock_out", "end_time", "shift_end", "end"],
+    "labor_cost": ["labor_cost", "total_pay", "pay", "wages", "cost"],
+    "hourly_rate": ["hourly_rate", "pay_rate", "wage_rate", "rate"],
+}
+
+
+class Shift(NamedTuple):
+    store_id: str
+    staff_id: str
+    start: int  # absolute minutes, see the module docstring
+    end: int
+    labor_cents: int
+
+    @property
+    def hours(self) -> float:
+        return (self.end - self.start) / 60
+
+
+def _minutes(value: Optional[str], day: Optional[int]) -> int:
+    """Absolute minutes of a timestamp, or of a clock time on ``day`` (a date ordinal)."""
+    s = (value or "").strip()
+    if len(s) >= 10 and s[4:5] == "-":
+        day = parse_date(s[:10]).toordinal()
+    minute = parse_time(s)
+    if minute is None or day is None:
+        raise ValueError(f"no shift time: {value!r}")
+    return day * MINUTES_PER_DAY + minute
+
+
+def iter_file_shifts(path: str, quarantine: Optional[List[BadValue]] = None) -> Iterator[Shift]:
+    parser = FieldParser(os.path.basename(path), quarantine)
+    with open(path, newline="", encoding="utf-8") as fh:
+        reader = csv.reader(fh)
+        header = next(reader, None)
+        if header is None:
+            return
+        columns = match_columns(header, SHIFT_COLUMNS)
+        if columns["labor_cost"] == columns["hourly_rate"]:
+            # "pay" also matches "pay_rate"; a rate column is never a cost.
+            columns["labor_cost"] = None
+        index = {field: header.index(col) for field, col in columns.items() if col is not None}
+        for row in reader:
+            if not row:
+                continue
+            raw = {field: row[i] if i < len(row) else None for field, i in index.items()}
+            line = reader.line_num
+            day = None
+            if raw.get("shift_date"):
+                try:
+                    day = parser.date(raw["shift_date"]).toordinal()
+                except ValueError:
+                    parser.bad(line, columns["shift_date"], raw["shift_date"])
+            try:
+                start = _minutes(raw.get("start"), day)
+            except ValueError:
+                parser.bad(line, columns["start"] or "start", raw.get("start"))
+                continue
+            try:
+                end = _minutes(raw.get("end"), start // MINUTES_PER_DAY)
+            except ValueError:
+                parser.bad(line, columns["end"] or "end", raw.get("end"))
+                continue
+            if end < start:
+                end += MINUTES_PER_DAY
+            cost = 0
+            try:
+                if raw.get("labor_cost"):
+                    cost = to_cents(raw["labor_cost"])
+                elif raw.get("hourly_rate"):
+                    cost = cents(to_number(raw["hourly_rate"]) * (end - start) / 60)
+            except ValueError:
+                field = "labor_cost" if raw.get("labor_cost") else "hourly_rate"
+                parser.bad(line, columns[field], raw[field])
+            yield Shift(raw.get("store_id") or "default-store", raw.get("staff_id") or "", start, end, cost)
+
+
+def shift_files(data_dir: str) -> List[str]:
+    return sorted(glob.glob(os.path.join(data_dir, SHIFTS_DIR, "*.csv")))
+
+
+def load_shifts(data_dir: str, quarantine: Optional[List[BadValue]] = None) -> List[Shift]:
+    """Every shift under ``<data_dir>/shifts``; empty when there is no such directory."""
+    return [s for path in shift_files(data_dir) for s in iter_file_shifts(path, quarantine)]
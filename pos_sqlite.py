@@ -0,0 +1,450 @@
+"""SQLite analytics backend implementing ``sql/schema.sql``.
+
+Normalized rows are written to ``stores``, ``orders`` and ``order_items``;
+``daily_financials`` is kept as a materialized per-store, per-day rollup that
+each ingest batch updates with upserts, so KPI queries read one small indexed
+table instead of scanning line items; ``daily_item_sales`` does the same for
+per-item sales so top-item lookups never join line items. Results follow the
+in-memory functions with two documented differences: orders are identified per
+store (a ticket id reused at two stores counts twice), and an order is dated by
+its first line.
+
+Labor and waste live only on ``daily_financials`` because the schema has no
+line-level columns for them.
+
+Like the in-memory loaders, ``ingest_dir`` drops lines that repeat an earlier
+file (``pos_dedup``). The line keys are kept in ``line_keys`` so files added
+later are checked against everything already stored.
+
+``stores.id`` is a primary key across tenants, so store ids are stored with a
+``<tenant>:`` prefix, like order ids, and ``stores.name`` keeps the POS store
+id. Queries take and return the unprefixed id.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import sqlite3
+import threading
+from array import array
+from datetime import date
+from itertools import compress
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import mvp_pos_insight_bot as bot
+from pos_columnar import GroupTotals
+from pos_dedup import Deduper, LineIndex
+from pos_metrics import timed
+from pos_parse import cents
+
+SCHEMA_PATH = Path(__file__).resolve().parent / "sql" / "schema.sql"
+BATCH_ROWS = 50_000
+
+# Not in schema.sql: the per-item rollup, a line-item join index and file bookkeeping.
+_EXTRA_DDL = """
+CREATE INDEX IF NOT EXISTS idx_order_items_tenant_order ON order_items(tenant_id, order_id);
+CREATE TABLE IF NOT EXISTS daily_item_sales (
+  tenant_id TEXT NOT NULL,
+  store_id TEXT NOT NULL,
+  business_date DATE NOT NULL,
+  item_name TEXT NOT NULL,
+  line_net_sales REAL NOT NULL DEFAULT 0,
+  first_line INTEGER NOT NULL,
+  PRIMARY KEY (tenant_id, store_id, business_date, item_name)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS ingested_files (
+  tenant_id TEXT NOT NULL,
+  source TEXT NOT NULL,
+  sha256 TEXT NOT NULL,
+  PRIMARY KEY (tenant_id, source)
+);
+CREATE TABLE IF NOT EXISTS line_keys (
+  tenant_id TEXT NOT NULL,
+  line_key INTEGER NOT NULL,
+  PRIMARY KEY (tenant_id, line_key)
+) WITHOUT ROWID;
+"""
+
+_UNDATED = ""
+
+
+def _dollars(value) -> float:
+    """A REAL money sum rounded to whole cents, matching the cent-exact columnar totals."""
+    return cents(value) / 100
+
+
+def _file_sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+class _StoredLineIndex(LineIndex):
+    """``LineIndex`` that remembers the keys added since the last ``take_new``."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.new: List[int] = []
+
+    def add(self, key: int) -> bool:
+        if not super().add(key):
+            return False
+        self.new.append(key)
+        return True
+
+    def add_unique(self, keys: List[int]) -> List[bool]:
+        keep = super().add_unique(keys)
+        self.new.extend(compress(keys, keep))
+        return keep
+
+    def take_new(self) -> List[int]:
+        new, self.new = self.new, []
+        return new
+
+
+class SqliteStore:
+    """Tenant-scoped KPI store over a SQLite database file (or ``:memory:``)."""
+
+    def __init__(self, path: str = ":memory:", tenant_id: str = "default", data_dir: Optional[str] = None,
+                 dedup: bool = True) -> None:
+        self.path = path
+        self.tenant_id = tenant_id
+        self.data_dir = data_dir
+        self.dedup = dedup
+        # Loaded from ``line_keys`` on the first ingest that needs it.
+        self._deduper: Optional[Deduper] = None
+        self._lock = threading.RLock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        if path != ":memory:":
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+        self._ensure_schema()
+        self._store_prefix = f"{tenant_id}:"
+        (self._next_line,) = self.conn.execute(
+            "SELECT COUNT(*) FROM order_items WHERE tenant_id = ?", (tenant_id,)
+        ).fetchone()
+
+    def _ensure_schema(self) -> None:
+        exists = self.conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'orders'"
+        ).fetchone()
+        with self.conn:
+            if not exists:
+                self.conn.executescript(SCHEMA_PATH.read_text(encoding="utf-8"))
+            self.conn.executescript(_EXTRA_DDL)
+
+    def _store_key(self, store_id: str) -> str:
+        return self._store_prefix + store_id
+
+    def _store_name(self, key: str) -> str:
+        return key[len(self._store_prefix):]
+
+    def close(self) -> None:
+        self.conn.close()
+
+    # -- ingest ---------------------------------------------------------------
+
+    def ingest(self, records: Iterable[Dict[str, object]]) -> int:
+        """Append normalized records, updating the daily rollup incrementally."""
+        count = 0
+        batch: List[Dict[str, object]] = []
+        with self._lock:
+            for r in records:
+                batch.append(r)
+                if len(batch) >= BATCH_ROWS:
+                    count += self._flush(batch)
+                    batch = []
+            if batch:
+                count += self._flush(batch)
+        return count
+
+    def _flush(self, batch: List[Dict[str, object]]) -> int:
+        t = self.tenant_id
+        stores: Dict[str, None] = {}
+        orders: Dict[str, List[object]] = {}
+        items: List[Tuple[object, ...]] = []
+        daily: Dict[Tuple[str, str], List[float]] = {}
+        item_sales: Dict[Tuple[str, str, str], List[float]] = {}
+        for r in batch:
+            store = self._store_key(str(r["store_id"]))
+            d = r["date"]
+            day = d.isoformat() if d is not None else _UNDATED
+            order_id = f"{store}:{r['order_key']}"
+            revenue = float(r["revenue"])
+            stores[store] = None
+            o = orders.get(order_id)
+            if o is None:
+                orders[order_id] = [store, day, revenue]
+            else:
+                o[2] += revenue
+            item = str(r["item_name"])
+            items.append((f"{t}:{self._next_line}", t, order_id, item, float(r["quantity"]), revenue))
+            per_item = item_sales.get((store, day, item))
+            if per_item is None:
+                item_sales[(store, day, item)] = [revenue, self._next_line]
+            else:
+                per_item[0] += revenue
+            self._next_line += 1
+            acc = daily.get((store, day))
+            if acc is None:
+                acc = daily[(store, day)] = [0.0, 0.0, 0.0]
+            acc[0] += revenue
+            acc[1] += float(r["labor_cost"])
+            acc[2] += float(r["waste_cost"])
+
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO stores (id, tenant_id, name) VALUES (?, ?, ?)",
+                [(s, t, self._store_name(s)) for s in stores],
+            )
+            self.conn.executemany(
+                """INSERT INTO orders (id, tenant_id, store_id, business_date, gross_sales, net_sales)
+                   VALUES (?, ?, ?, ?, ?, ?)
+                   ON CONFLICT(id) DO UPDATE SET
+                     gross_sales = gross_sales + excluded.gross_sales,
+                     net_sales = net_sales + excluded.net_sales""",
+                [(oid, t, store, day, net, net) for oid, (store, day, net) in orders.items()],
+            )
+            self.conn.executemany(
+                """INSERT INTO order_items (id, tenant_id, order_id, item_name, quantity, line_net_sales)
+                   VALUES (?, ?, ?, ?, ?, ?)""",
+                items,
+            )
+            self.conn.executemany(
+                """INSERT INTO daily_financials
+                     (id, tenant_id, store_id, business_date, net_sales, labor_cost, waste_cost, gross_profit)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                   ON CONFLICT(tenant_id, store_id, business_date) DO UPDATE SET
+                     net_sales = net_sales + excluded.net_sales,
+                     labor_cost = labor_cost + excluded.labor_cost,
+                     waste_cost = waste_cost + excluded.waste_cost,
+                     gross_profit = gross_profit + excluded.gross_profit""",
+                [
+                    (f"{store}:{day}", t, store, day, net, labor, waste, net - labor - waste)
+                    for (store, day), (net, labor, waste) in daily.items()
+                ],
+            )
+            self.conn.executemany(
+                """INSERT INTO daily_item_sales
+                     (tenant_id, store_id, business_date, item_name, line_net_sales, first_line)
+                   VALUES (?, ?, ?, ?, ?, ?)
+                   ON CONFLICT(tenant_id, store_id, business_date, item_name) DO UPDATE SET
+                     line_net_sales = line_net_sales + excluded.line_net_sales,
+                     first_line = MIN(first_line, excluded.first_line)""",
+                [(t, store, day, item, sales, first) for (store, day, item), (sales, first) in item_sales.items()],
+            )
+        return len(batch)
+
+    def clear(self) -> None:
+        t = (self.tenant_id,)
+        with self._lock, self.conn:
+            for table in ("order_items", "orders", "daily_financials", "daily_item_sales", "stores", "ingested_files",
+                          "line_keys"):
+                self.conn.execute(f"DELETE FROM {table} WHERE tenant_id = ?", t)
+            self._next_line = 0
+            self._deduper = None
+
+    @property
+    def duplicates(self) -> Dict[str, int]:
+        """Lines dropped per file as repeats of an earlier file, since this store was opened."""
+        return self._deduper.dropped if self._deduper is not None else {}
+
+    def _line_deduper(self) -> Deduper:
+        if self._deduper is None:
+            index = _StoredLineIndex()
+            index.add_sorted(array("q", (key for (key,) in self.conn.execute(
+                "SELECT line_key FROM line_keys WHERE tenant_id = ? ORDER BY line_key", (self.tenant_id,)
+            ))))
+            self._deduper = Deduper(index)
+        return self._deduper
+
+    @timed("ingest")
+    def ingest_dir(self, data_dir: str) -> bool:
+        """Ingest new CSVs; a changed or removed file triggers a full tenant rebuild.
+
+        Returns True when the stored data changed.
+        """
+        files = {path: _file_sha256(path) for path in bot.csv_files(data_dir)}
+        with self._lock:
+            known = dict(self.conn.execute(
+                "SELECT source, sha256 FROM ingested_files WHERE tenant_id = ?", (self.tenant_id,)
+            ).fetchall())
+            if any(files.get(src) != sha for src, sha in known.items()):
+                self.clear()
+                known = {}
+            new = [path for path in files if path not in known]
+            for path in new:
+                records = bot.iter_file_records(path)
+                deduper = self._line_deduper() if self.dedup else None
+                if deduper is not None:
+                    records = deduper.records(records, os.path.basename(path))
+                self.ingest(records)
+                with self.conn:
+                    self.conn.execute(
+                        "INSERT INTO ingested_files (tenant_id, source, sha256) VALUES (?, ?, ?)",
+                        (self.tenant_id, path, files[path]),
+                    )
+                    if deduper is not None:
+                        self.conn.executemany(
+                            "INSERT INTO line_keys (tenant_id, line_key) VALUES (?, ?)",
+                            [(self.tenant_id, key) for key in deduper.index.take_new()],
+                        )
+        return bool(new)
+
+    # -- duck-typed catalog interface used by pos_refresh.DataRefresher --------
+
+    def refresh(self) -> bool:
+        if self.data_dir is None:
+            return False
+        return self.ingest_dir(self.data_dir)
+
+    @timed("snapshot")
+    def snapshot(self) -> bot.AnalyticsSnapshot:
+        return bot.make_snapshot((), self.metrics(), self.store_metrics_map(), self.daily_totals(), index=self)
+
+    # -- queries --------------------------------------------------------------
+
+    def _where(self, alias: str, store_id: Optional[str], date_from: Optional[date],
+               date_to: Optional[date]) -> Tuple[str, List[object]]:
+        clauses = [f"{alias}.tenant_id = ?"]
+        params: List[object] = [self.tenant_id]
+        if store_id is not None:
+            clauses.append(f"{alias}.store_id = ?")
+            params.append(self._store_key(store_id))
+        if date_from is not None or date_to is not None:
+            clauses.append(f"{alias}.business_date BETWEEN ? AND ?")
+            params.append(date_from.isoformat() if date_from else "0001-01-01")
+            params.append(date_to.isoformat() if date_to else "9999-12-31")
+        return " AND ".join(clauses), params
+
+    def _query(self, sql: str, params: List[object]) -> List[Tuple]:
+        with self._lock:
+            return self.conn.execute(sql, params).fetchall()
+
+    def _top_items(self, where: str, params: List[object]) -> Dict[str, Tuple[str, float]]:
+        rows = self._query(
+            f"""SELECT store_id, item_name, sales FROM (
+                  SELECT store_id, item_name, sales,
+                         ROW_NUMBER() OVER (PARTITION BY store_id ORDER BY sales DESC, first_line) AS rn
+                  FROM (
+                    SELECT i.store_id, i.item_name, TOTAL(i.line_net_sales) AS sales,
+                           MIN(i.first_line) AS first_line
+                    FROM daily_item_sales i
+                    WHERE {where}
+                    GROUP BY i.store_id, i.item_name
+                  )
+                ) WHERE rn = 1""",
+            params,
+        )
+        return {self._store_name(store): (item, _dollars(sales)) for store, item, sales in rows}
+
+    def totals(self, store_id: Optional[str] = None, date_from: Optional[date] = None,
+               date_to: Optional[date] = None) -> GroupTotals:
+        where, params = self._where("f", store_id, date_from, date_to)
+        revenue, labor, waste = self._query(
+            f"SELECT TOTAL(net_sales), TOTAL(labor_cost), TOTAL(waste_cost) FROM daily_financials f WHERE {where}",
+            params,
+        )[0]
+        owhere, oparams = self._where("o", store_id, date_from, date_to)
+        (orders,) = self._query(f"SELECT COUNT(*) FROM orders o WHERE {owhere}", oparams)[0]
+        iwhere, iparams = self._where("i", store_id, date_from, date_to)
+        top = self._query(
+            f"""SELECT i.item_name, TOTAL(i.line_net_sales) AS sales, MIN(i.first_line) AS first_line
+                FROM daily_item_sales i WHERE {iwhere}
+                GROUP BY i.item_name ORDER BY sales DESC, first_line LIMIT 1""",
+            iparams,
+        )
+        top_item, top_sales = (top[0][0], _dollars(top[0][1])) if top else ("n/a", 0.0)
+        return GroupTotals(_dollars(revenue), _dollars(labor), _dollars(waste), int(orders), top_item, top_sales)
+
+    def metrics(self, store_id: Optional[str] = None, date_from: Optional[date] = None,
+                date_to: Optional[date] = None) -> Dict[str, object]:
+        return bot.metrics_from_totals(self.totals(store_id, date_from, date_to))
+
+    def store_totals(self, date_from: Optional[date] = None,
+                     date_to: Optional[date] = None) -> Dict[str, GroupTotals]:
+        where, params = self._where("f", None, date_from, date_to)
+        sums = self._query(
+            f"""SELECT s.name, TOTAL(f.net_sales), TOTAL(f.labor_cost), TOTAL(f.waste_cost)
+                FROM daily_financials f JOIN stores s ON s.id = f.store_id AND s.tenant_id = f.tenant_id
+                WHERE {where} GROUP BY f.store_id ORDER BY MIN(s.rowid)""",
+            params,
+        )
+        owhere, oparams = self._where("o", None, date_from, date_to)
+        orders = {self._store_name(store): n for store, n in self._query(
+            f"SELECT o.store_id, COUNT(*) FROM orders o WHERE {owhere} GROUP BY o.store_id", oparams
+        )}
+        top = self._top_items(*self._where("i", None, date_from, date_to))
+        out: Dict[str, GroupTotals] = {}
+        for store, revenue, labor, waste in sums:
+            item, sales = top.get(store, ("n/a", 0.0))
+            out[store] = GroupTotals(_dollars(revenue), _dollars(labor), _dollars(waste), int(orders.get(store, 0)), item, sales)
+        return out
+
+    def store_metrics_map(self, date_from: Optional[date] = None,
+                          date_to: Optional[date] = None) -> Dict[str, Dict[str, object]]:
+        return {store: bot.metrics_from_totals(t) for store, t in self.store_totals(date_from, date_to).items()}
+
+    def date_bounds(self) -> Optional[Tuple[date, date]]:
+        lo, hi = self._query(
+            "SELECT MIN(business_date), MAX(business_date) FROM daily_financials "
+            "WHERE tenant_id = ? AND business_date != ''",
+            [self.tenant_id],
+        )[0]
+        if lo is None:
+            return None
+        return date.fromisoformat(lo), date.fromisoformat(hi)
+
+    def daily_totals(self, store_id: Optional[str] = None, date_from: Optional[date] = None,
+                     date_to: Optional[date] = None) -> Dict[date, GroupTotals]:
+        where, params = self._where("f", store_id, date_from, date_to)
+        sums = self._query(
+            f"""SELECT business_date, TOTAL(net_sales), TOTAL(labor_cost), TOTAL(waste_cost)
+                FROM daily_financials f WHERE {where} AND business_date != ''
+                GROUP BY business_date ORDER BY business_date""",
+            params,
+        )
+        owhere, oparams = self._where("o", store_id, date_from, date_to)
+        orders = dict(self._query(
+            f"SELECT business_date, COUNT(*) FROM orders o WHERE {owhere} GROUP BY business_date", oparams
+        ))
+        return {
+            date.fromisoformat(day): GroupTotals(_dollars(rev), _dollars(labor), _dollars(waste), int(orders.get(day, 0)), "n/a", 0.0)
+            for day, rev, labor, waste in sums
+        }
+
+    def daily_by_store(self) -> Dict[str, Dict[date, GroupTotals]]:
+        sums = self._query(
+            """SELECT store_id, business_date, net_sales, labor_cost, waste_cost
+               FROM daily_financials WHERE tenant_id = ? AND business_date != ''""",
+            [self.tenant_id],
+        )
+        orders = {
+            (store, day): count for store, day, count in self._query(
+                "SELECT store_id, business_date, COUNT(*) FROM orders WHERE tenant_id = ? GROUP BY store_id, business_date",
+                [self.tenant_id],
+            )
+        }
+        out: Dict[str, Dict[date, GroupTotals]] = {}
+        for store, day, rev, labor, waste in sums:
+            out.setdefault(self._store_name(store), {})[date.fromisoformat(day)] = GroupTotals(
+                _dollars(rev), _dollars(labor), _dollars(waste), int(orders.get((store, day), 0)), "n/a", 0.0
+            )
+        return out
+
+    def daily_table(self, store_id: Optional[str] = None, date_from: Optional[date] = None,
+                    date_to: Optional[date] = None) -> str:
+        return bot.format_daily(self.daily_totals(store_id, date_from, date_to))
+
+
+def open_store(path: str, data_dir: str, tenant_id: str = "default") -> SqliteStore:
+    """Open (creating if needed) a store at ``path`` and sync it with ``data_dir``."""
+    if path != ":memory:":
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    store = SqliteStore(path, tenant_id=tenant_id, data_dir=data_dir)
+    store.refresh()
+    return store
@@ -0,0 +1,388 @@
+#!/usr/bin/env python3
+"""Nightly SMS briefs for every tenant and store, sent through a pooled sender.
+
+``account_briefs`` turns one account's snapshot into an all-stores brief
+plus one brief per store (``store_metrics``), addressed from the account's
+``sms_to`` / ``store_sms_to`` config. ``send_all`` pushes briefs through a
+``Sender`` from a bounded thread pool, with a shared token-bucket
+``RateLimiter`` and retry with exponential backoff for retryable failures
+(HTTP 429/5xx, SMTP 4xx, dropped connections). ``Retry-After`` (capped at
+``max_backoff``) wins over the computed backoff.
+
+Senders are pluggable and keep one connection per worker thread, so a batch
+of thousands of briefs reuses a handful of keep-alive connections:
+
+- ``HttpSender`` POSTs ``{"to", "body", "tenant", "store"}`` JSON to an SMS
+  gateway or webhook URL;
+- ``SmtpSender`` mails each brief to an email-to-SMS gateway address;
+- ``PrintSender`` writes briefs to stdout (dry run).
+
+Run ``python3 sms_batch.py --tenants-root ./tenants --sender http --http-url ...``
+for every tenant, or ``--data-dir`` / ``--config`` for a single account.
+"""
+
+from __future__ import annotations
+
+import argparse
+import http.client
+import json
+import logging
+import os
+import random
+import smtplib
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from email.message import EmailMessage
+from pathlib import Path
+from typing import Callable, Iterable, List, Mapping, NamedTuple, Optional, TextIO, Tuple
+from urllib.parse import urlsplit
+
+import mvp_pos_insight_bot as bot
+from tenant_registry import TenantRegistry
+
+log = logging.getLogger(__name__)
+
+
+class Brief(NamedTuple):
+    tenant: Optional[str]
+    store_id: Optional[str]  # None: all stores
+    to: str
+    text: str
+
+
+def account_briefs(account: Mapping[str, object], snapshot: bot.AnalyticsSnapshot,
+                   tenant: Optional[str] = None) -> List[Brief]:
+    """All-stores brief to ``sms_to`` and one brief per store to its ``store_sms_to`` recipient."""
+    bot_name = str(account["bot_name"])
+    owner_to = account.get("sms_to")
+    store_to = account.get("store_sms_to") or {}
+    briefs: List[Brief] = []
+    if owner_to:
+        briefs.append(Brief(tenant, None, str(owner_to), bot.sms_brief(snapshot.metrics, bot_name, snapshot.trends)))
+    for store_id in snapshot.stores:
+        to = store_to.get(store_id) or owner_to
+        if to:
+            text = bot.sms_brief(snapshot.store_metrics[store_id], f"{bot_name} {store_id}", snapshot.trends, store_id)
+            briefs.append(Brief(tenant, store_id, str(to), text))
+    return briefs
+
+
+class SendError(Exception):
+    def __init__(self, message: str, retryable: bool = True, retry_after: Optional[float] = None) -> None:
+        super().__init__(message)
+        self.retryable = retryable
+        self.retry_after = retry_after
+
+
+class Sender:
+    """Delivers one brief or raises ``SendError``; called from several threads at once."""
+
+    def send(self, brief: Brief) -> None:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+
+class PrintSender(Sender):
+    def __init__(self, out: TextIO = sys.stdout) -> None:
+        self.out = out
+        self._lock = threading.Lock()
+
+    def send(self, brief: Brief) -> None:
+        with self._lock:
+            self.out.write(f"{brief.to}\t{brief.text}\n")
+
+
+class _PerThread(Sender):
+    """One lazily opened connection per worker thread, all closed by ``close``."""
+
+    def __init__(self) -> None:
+        self._local = threading.local()
+        self._conns: List[object] = []
+        self._lock = threading.Lock()
+
+    def _open(self):
+        raise NotImplementedError
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._open()
+            with self._lock:
+                self._conns.append(conn)
+        return conn
+
+    def _drop(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        self._local.conn = None
+        if conn is not None:
+            with self._lock:
+                self._conns.remove(conn)
+            self._close(conn)
+
+    @staticmethod
+    def _close(conn) -> None:
+        conn.close()
+
+    def close(self) -> None:
+        with self._lock:
+            conns, self._conns = self._conns, []
+        for conn in conns:
+            try:
+                self._close(conn)
+            except Exception:
+                pass
+
+
+def _retry_after(value: Optional[str]) -> Optional[float]:
+    try:
+        return max(float(value), 0.0) if value else None
+    except ValueError:
+        return None
+
+
+class HttpSender(_PerThread):
+    """POSTs each brief as JSON over a keep-alive connection per thread."""
+
+    def __init__(self, url: str, token: Optional[str] = None, timeout: float = 10.0) -> None:
+        super().__init__()
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https"):
+            raise ValueError(f"Unsupported SMS gateway URL: {url}")
+        self.scheme = parts.scheme
+        self.netloc = parts.netloc
+        self.path = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+        self.headers = {"Content-Type": "application/json"}
+        if token:
+            self.headers["Authorization"] = f"Bearer {token}"
+        self.timeout = timeout
+
+    def _open(self) -> http.client.HTTPConnection:
+        cls = http.client.HTTPSConnection if self.scheme == "https" else http.client.HTTPConnection
+        return cls(self.netloc, timeout=self.timeout)
+
+    def send(self, brief: Brief) -> None:
+        body = json.dumps({"to": brief.to, "body": brief.text, "tenant": brief.tenant, "store": brief.store_id})
+        conn = self._conn()
+        try:
+            conn.request("POST", self.path, body=body.encode("utf-8"), headers=self.headers)
+            resp = conn.getresponse()
+            resp.read()
+        except (OSError, http.client.HTTPException) as exc:
+            self._drop()
+            raise SendError(f"{type(exc).__name__}: {exc}") from exc
+        if resp.will_close:
+            self._drop()
+        if 200 <= resp.status < 300:
+            return
+        retryable = resp.status == 429 or resp.status >= 500
+        raise SendError(f"HTTP {resp.status}", retryable, _retry_after(resp.getheader("Retry-After")))
+
+
+class SmtpSender(_PerThread):
+    """Mails each brief to an email-to-SMS gateway address over a reused SMTP session per thread."""
+
+    def __init__(self, host: str, port: int = 25, from_addr: str = "briefs@localhost", starttls: bool = False,
+                 username: Optional[str] = None, password: Optional[str] = None, timeout: float = 10.0) -> None:
+        super().__init__()
+        self.host = host
+        self.port = port
+        self.from_addr = from_addr
+        self.starttls = starttls
+        self.username = username
+        self.password = password
+        self.timeout = timeout
+
+    def _open(self) -> smtplib.SMTP:
+        conn = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        if self.starttls:
+            conn.starttls()
+        if self.username:
+            conn.login(self.username, self.password or "")
+        return conn
+
+    @staticmethod
+    def _close(conn) -> None:
+        try:
+            conn.quit()
+        except smtplib.SMTPException:
+            conn.close()
+
+    def send(self, brief: Brief) -> None:
+        msg = EmailMessage()
+        msg["From"] = self.from_addr
+        msg["To"] = brief.to
+        msg.set_content(brief.text)
+        try:
+            self._conn().send_message(msg)
+        except smtplib.SMTPRecipientsRefused as exc:
+            codes = [code for code, _ in exc.recipients.values()]
+            raise SendError(f"recipient refused: {brief.to}", all(400 <= c < 500 for c in codes)) from exc
+        except smtplib.SMTPResponseException as exc:
+            if exc.smtp_code >= 500:
+                raise SendError(f"SMTP {exc.smtp_code}", retryable=False) from exc
+            self._drop()
+            raise SendError(f"SMTP {exc.smtp_code}") from exc
+        except (OSError, smtplib.SMTPException) as exc:
+            self._drop()
+            raise SendError(f"{type(exc).__name__}: {exc}") from exc
+
+
+class RateLimiter:
+    """Token bucket shared by all workers: ``rate`` sends per second, bursts up to ``burst``."""
+
+    def __init__(self, rate: float, burst: Optional[int] = None, clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep) -> None:
+        self.rate = rate
+        self.burst = burst or max(1, int(rate))
+        self._tokens = float(self.burst)
+        self._clock = clock
+        self._sleep = sleep
+        self._last = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        while True:
+            with self._lock:
+                now = self._clock()
+                self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                # Tolerance: refills are float sums and must not stall a hair short of a token.
+                if self._tokens >= 1 - 1e-9:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            self._sleep(wait)
+
+
+class SendResult(NamedTuple):
+    brief: Brief
+    attempts: int
+    error: Optional[str] = None
+
+
+class BatchReport(NamedTuple):
+    results: Tuple[SendResult, ...]
+    elapsed: float
+
+    @property
+    def sent(self) -> int:
+        return sum(1 for r in self.results if r.error is None)
+
+    @property
+    def failed(self) -> Tuple[SendResult, ...]:
+        return tuple(r for r in self.results if r.error is not None)
+
+
+def _send_one(sender: Sender, brief: Brief, limiter: Optional[RateLimiter], retries: int, backoff: float,
+              max_backoff: float, sleep: Callable[[float], None]) -> SendResult:
+    attempt = 0
+    while True:
+        attempt += 1
+        if limiter is not None:
+            limiter.acquire()
+        try:
+            sender.send(brief)
+            return SendResult(brief, attempt)
+        except SendError as exc:
+            if not exc.retryable or attempt > retries:
+                return SendResult(brief, attempt, str(exc))
+            if exc.retry_after is not None:
+                delay = min(exc.retry_after, max_backoff)
+            else:
+                # Full jitter, so workers that failed together do not retry together.
+                delay = random.uniform(0, min(max_backoff, backoff * 2 ** (attempt - 1)))
+            sleep(delay)
+
+
+def send_all(briefs: Iterable[Brief], sender: Sender, concurrency: int = 8, rate: Optional[float] = None,
+             retries: int = 3, backoff: float = 0.5, max_backoff: float = 30.0,
+             sleep: Callable[[float], None] = time.sleep) -> BatchReport:
+    """Send every brief with at most ``concurrency`` in flight; results are in input order."""
+    started = time.perf_counter()
+    limiter = RateLimiter(rate, sleep=sleep) if rate else None
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="sms-send") as pool:
+        futures = [pool.submit(_send_one, sender, brief, limiter, retries, backoff, max_backoff, sleep)
+                   for brief in briefs]
+        results = tuple(f.result() for f in futures)
+    return BatchReport(results, time.perf_counter() - started)
+
+
+def tenant_briefs(registry: TenantRegistry, failed: Optional[List[str]] = None) -> List[Brief]:
+    """Briefs for every tenant under the registry root, loading tenants within its memory budget.
+
+    A tenant that fails to load or summarize is logged, appended to ``failed``
+    and skipped; the other tenants still get their briefs.
+    """
+    briefs: List[Brief] = []
+    for tenant_id in registry.tenant_ids():
+        try:
+            state = registry.get(tenant_id)
+            briefs.extend(account_briefs(state.account, state.snapshot, tenant_id))
+        except FileNotFoundError:
+            log.warning("tenant %s has no data; no briefs", tenant_id)
+        except Exception:
+            log.exception("tenant %s failed; no briefs", tenant_id)
+            if failed is not None:
+                failed.append(tenant_id)
+    return briefs
+
+
+def make_sender(args: argparse.Namespace) -> Sender:
+    if args.sender == "http":
+        if not args.http_url:
+            raise SystemExit("--http-url is required with --sender http")
+        return HttpSender(args.http_url, os.getenv("SMS_HTTP_TOKEN"))
+    if args.sender == "smtp":
+        if not args.smtp_host:
+            raise SystemExit("--smtp-host is required with --sender smtp")
+        return SmtpSender(args.smtp_host, args.smtp_port, args.smtp_from, args.smtp_starttls,
+                          os.getenv("SMTP_USERNAME"), os.getenv("SMTP_PASSWORD"))
+    return PrintSender()
+
+
+def main() -> None:
+    p = argparse.ArgumentParser()
+    source = p.add_mutually_exclusive_group(required=True)
+    source.add_argument("--tenants-root", help="Send briefs for every tenant directory under this root")
+    source.add_argument("--data-dir", help="Send briefs for one account")
+    p.add_argument("--config", default="./data/sample_account.json", help="Account config for --data-dir")
+    p.add_argument("--sender", choices=("print", "http", "smtp"), default="print")
+    p.add_argument("--http-url", help="SMS gateway endpoint (bearer token from SMS_HTTP_TOKEN)")
+    p.add_argument("--smtp-host")
+    p.add_argument("--smtp-port", type=int, default=25)
+    p.add_argument("--smtp-from", default="briefs@localhost")
+    p.add_argument("--smtp-starttls", action="store_true", help="Credentials from SMTP_USERNAME/SMTP_PASSWORD")
+    p.add_argument("--concurrency", type=int, default=8, help="Briefs in flight at once")
+    p.add_argument("--rate", type=float, help="Max sends per second across all workers")
+    p.add_argument("--retries", type=int, default=3)
+    args = p.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    failed_tenants: List[str] = []
+    if args.tenants_root:
+        briefs = tenant_briefs(TenantRegistry(args.tenants_root), failed_tenants)
+    else:
+        account = bot.load_account_config(args.config if Path(args.config).exists() else None)
+        briefs = account_briefs(account, bot.build_snapshot(bot.load_columns(args.data_dir)))
+
+    sender = make_sender(args)
+    try:
+        report = send_all(briefs, sender, args.concurrency, args.rate, args.retries)
+    finally:
+        sender.close()
+    for result in report.failed:
+        log.error("brief to %s (%s/%s) failed after %d attempts: %s", result.brief.to, result.brief.tenant,
+                  result.brief.store_id or "all", result.attempts, result.error)
+    print(f"Sent {report.sent}/{len(report.results)} briefs in {report.elapsed:.2f}s", file=sys.stderr)
+    if failed_tenants:
+        print(f"{len(failed_tenants)} tenant(s) failed: {', '.join(failed_tenants)}", file=sys.stderr)
+    if report.failed or failed_tenants:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,277 @@
+"""Many tenants in one server process.
+
+Each tenant is a directory under a shared root holding its POS exports
+(``*.csv``) and an optional ``account.json`` in ``load_account_config``
+format::
+
+    tenants/
+      acme/account.json
+      acme/2026-02.csv
+      bobs-burgers/...
+
+``TenantRegistry`` loads a tenant the first time a request names it, keeps
+recently used tenants in memory and evicts the least recently used ones
+when their estimated footprint exceeds ``memory_budget``. An evicted tenant
+is simply loaded again (from the column cache, when enabled) on its next
+request. Loaded tenants are re-checked for new or changed files at most
+every ``refresh_interval`` seconds, on the request that finds them stale,
+so idle tenants cost no polling.
+
+Isolation: a tenant id must match ``TENANT_ID_RE`` and resolve to a real
+directory directly under the root (symlinks out of the root are refused).
+Every tenant has its own catalog, snapshot and account config, and an
+unknown tenant is a 404, never a fallback to some default dataset.
+
+``tenant_dispatch`` resolves the tenant from the ``X-Tenant-Id`` header or a
+``/t/<tenant>/`` path prefix and hands the request to ``web_app.dispatch``.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Mapping, NamedTuple, Optional, Tuple
+
+import mvp_pos_insight_bot as bot
+import web_app
+from pos_cache import ColumnCache
+from pos_columnar import NUMERIC_COLUMNS, STRING_TABLES, ColumnarRows
+from pos_refresh import IngestCatalog
+
+log = logging.getLogger(__name__)
+
+TENANT_ID_RE = re.compile(r"[a-z0-9][a-z0-9_-]{0,63}\Z")
+TENANT_HEADER = "x-tenant-id"
+TENANT_PREFIX = "/t/"
+ACCOUNT_FILE = "account.json"
+# Snapshot aggregates (partition index cells with their distinct-order counts,
+# daily rollups, prefix sums) per row, measured with tracemalloc on a 240k-row
+# ``pos_bench`` dataset (~19 bytes) and rounded up for cross-cell tickets.
+SNAPSHOT_BYTES_PER_ROW = 24
+# Dict slot + list slot + code int per interned string, on top of the str itself.
+_STRING_ENTRY_BYTES = 100
+# Load/refresh locks, shared by tenant id hash so their number stays fixed.
+LOAD_LOCK_STRIPES = 64
+
+
+class UnknownTenant(LookupError):
+    pass
+
+
+def _columns_nbytes(cols: ColumnarRows) -> int:
+    n = sum(getattr(cols, name).itemsize * len(getattr(cols, name)) for name, _ in NUMERIC_COLUMNS)
+    for name in STRING_TABLES:
+        values = getattr(cols, name).values
+        n += sum(map(sys.getsizeof, values)) + _STRING_ENTRY_BYTES * len(values)
+    return n
+
+
+def estimate_nbytes(state: web_app.AppState) -> int:
+    """Approximate memory held by a tenant: parsed chunks, merged rows and snapshot aggregates.
+
+    Columns mapped from the column cache are counted too, although the OS can
+    reclaim those pages; the estimate errs towards evicting early.
+    """
+    rows = state.snapshot.rows
+    chunks = [chunk for _, chunk in state.catalog.files.values()] if isinstance(state.catalog, IngestCatalog) else []
+    seen = set()
+    total = 0
+    for cols in [rows, *chunks]:
+        if isinstance(cols, ColumnarRows) and id(cols) not in seen:
+            seen.add(id(cols))
+            total += _columns_nbytes(cols)
+    return total + SNAPSHOT_BYTES_PER_ROW * len(rows)
+
+
+class _Loaded(NamedTuple):
+    state: web_app.AppState
+    nbytes: int
+    checked_at: float
+
+
+class TenantRegistry:
+    """Lazily loaded, memory-bounded ``AppState`` per tenant."""
+
+    def __init__(self, root: str, memory_budget: int = 512 * 1024 * 1024, refresh_interval: float = 0,
+                 cache_root: Optional[str] = None, use_cache: bool = True, workers: int = 1,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        self.root = os.path.realpath(root)
+        self.memory_budget = memory_budget
+        self.refresh_interval = refresh_interval
+        self.cache_root = cache_root
+        self.use_cache = use_cache
+        self.workers = workers
+        self._clock = clock
+        self._loaded: "OrderedDict[str, _Loaded]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._load_locks = tuple(threading.Lock() for _ in range(LOAD_LOCK_STRIPES))
+        self.loads = 0
+        self.evictions = 0
+
+    def tenant_dir(self, tenant_id: str) -> str:
+        """The tenant's data directory; raises ``UnknownTenant`` for invalid or missing ids."""
+        if not TENANT_ID_RE.match(tenant_id):
+            raise UnknownTenant(tenant_id)
+        path = os.path.realpath(os.path.join(self.root, tenant_id))
+        if os.path.dirname(path) != self.root or not os.path.isdir(path):
+            raise UnknownTenant(tenant_id)
+        return path
+
+    def tenant_ids(self) -> Tuple[str, ...]:
+        """Every valid tenant directory under the root, sorted."""
+        ids = []
+        for name in sorted(os.listdir(self.root)):
+            try:
+                self.tenant_dir(name)
+            except UnknownTenant:
+                continue
+            ids.append(name)
+        return tuple(ids)
+
+    def _cache_dir(self, tenant_id: str, data_dir: str) -> Optional[str]:
+        if not self.use_cache:
+            return None
+        if self.cache_root:
+            return os.path.join(self.cache_root, tenant_id)
+        return os.path.join(data_dir, ".pos_cache")
+
+    def _load(self, tenant_id: str) -> web_app.AppState:
+        data_dir = self.tenant_dir(tenant_id)
+        config = os.path.join(data_dir, ACCOUNT_FILE)
+        account = bot.load_account_config(config if os.path.isfile(config) else None)
+        cache_dir = self._cache_dir(tenant_id, data_dir)
+        catalog = IngestCatalog(data_dir, ColumnCache(cache_dir) if cache_dir else None, self.workers)
+        catalog.refresh()
+        return web_app.AppState(account, catalog.snapshot(), catalog, tenant_id)
+
+    def _refresh(self, tenant_id: str, state: web_app.AppState) -> web_app.AppState:
+        try:
+            if state.catalog.refresh():
+                return state._replace(snapshot=state.catalog.snapshot())
+        except Exception:
+            # Keep serving the last good snapshot; the next stale request retries.
+            log.exception("data refresh failed for tenant %s", tenant_id)
+        return state
+
+    def _store(self, tenant_id: str, state: web_app.AppState) -> None:
+        entry = _Loaded(state, estimate_nbytes(state), self._clock())
+        with self._lock:
+            self._loaded[tenant_id] = entry
+            self._loaded.move_to_end(tenant_id)
+            total = sum(e.nbytes for e in self._loaded.values())
+            # The tenant being served always stays, even if it alone exceeds the budget.
+            while total > self.memory_budget and len(self._loaded) > 1:
+                evicted, old = self._loaded.popitem(last=False)
+                total -= old.nbytes
+                self.evictions += 1
+                log.info("evicted tenant %s (%d bytes)", evicted, old.nbytes)
+
+    def _load_lock(self, tenant_id: str) -> threading.Lock:
+        # Tenants sharing a stripe load one after the other; a loaded one keeps serving meanwhile.
+        return self._load_locks[hash(tenant_id) % LOAD_LOCK_STRIPES]
+
+    def peek(self, tenant_id: str) -> Optional[web_app.AppState]:
+        """The tenant's state if it is loaded and fresh, without loading or refreshing it."""
+        with self._lock:
+            entry = self._loaded.get(tenant_id)
+            if entry is None or self._stale(entry):
+                return None
+            self._loaded.move_to_end(tenant_id)
+            return entry.state
+
+    def _stale(self, entry: _Loaded) -> bool:
+        return self.refresh_interval > 0 and self._clock() - entry.checked_at >= self.refresh_interval
+
+    def get(self, tenant_id: str) -> web_app.AppState:
+        """The tenant's current state, loading or refreshing it first if needed."""
+        state = self.peek(tenant_id)
+        if state is not None:
+            return state
+        self.tenant_dir(tenant_id)  # validate before creating per-tenant state
+        lock = self._load_lock(tenant_id)
+        with self._lock:
+            entry = self._loaded.get(tenant_id)
+        if entry is not None and not lock.acquire(blocking=False):
+            # Another request is refreshing this tenant; serve what is loaded meanwhile.
+            return entry.state
+        if entry is None:
+            lock.acquire()
+        try:
+            with self._lock:
+                entry = self._loaded.get(tenant_id)
+            if entry is None:
+                state = self._load(tenant_id)
+                self.loads += 1
+            elif self._stale(entry):
+                state = self._refresh(tenant_id, entry.state)
+            else:
+                state = entry.state
+            self._store(tenant_id, state)
+            return state
+        finally:
+            lock.release()
+
+    def evict(self, tenant_id: str) -> None:
+        with self._lock:
+            self._loaded.pop(tenant_id, None)
+
+    def loaded(self) -> Tuple[str, ...]:
+        """Loaded tenant ids, least recently used first."""
+        with self._lock:
+            return tuple(self._loaded)
+
+    def collect(self):
+        """Metric families for ``pos_metrics.METRICS.collector``."""
+        stats = self.stats()
+        yield "pos_tenants_loaded", "gauge", "Tenants held in memory.", [({}, stats["loaded"])]
+        yield "pos_tenant_bytes", "gauge", "Estimated memory of loaded tenants.", [({}, stats["bytes"])]
+        yield "pos_tenant_loads_total", "counter", "Tenant loads, including reloads after eviction.", \
+            [({}, stats["loads"])]
+        yield "pos_tenant_evictions_total", "counter", "Tenants evicted over the memory budget.", \
+            [({}, stats["evictions"])]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "loaded": len(self._loaded),
+                "bytes": sum(e.nbytes for e in self._loaded.values()),
+                "memory_budget": self.memory_budget,
+                "loads": self.loads,
+                "evictions": self.evictions,
+            }
+
+
+def split_tenant(path: str, headers: Mapping[str, str]) -> Tuple[Optional[str], str]:
+    """(tenant id, path within the tenant) from a ``/t/<tenant>`` prefix or the tenant header."""
+    if path.startswith(TENANT_PREFIX):
+        tenant_id, sep, rest = path[len(TENANT_PREFIX):].partition("/")
+        return tenant_id, sep + rest
+    return headers.get(TENANT_HEADER) or None, path
+
+
+def tenant_dispatch(registry: TenantRegistry, method: str, path: str, query: str = "", body: bytes = b"",
+                    headers: Optional[Mapping[str, str]] = None) -> web_app.Response:
+    """``web_app.dispatch`` against the tenant named by the request."""
+    headers = headers or {}
+    if method == "GET" and path == "/healthz":
+        return web_app.json_response(web_app.health_payload())
+    if method == "GET" and path == "/metrics":
+        return web_app.metrics_response()
+    tenant_id, route = split_tenant(path, headers)
+    if tenant_id is None:
+        return web_app.json_response({"error": "Tenant required"}, 404)
+    if not route:
+        # The page fetches relative api/ URLs, so it must be served from a directory path.
+        return web_app.Response(308, [("Location", path + "/"), ("Content-Length", "0")], b"")
+    try:
+        state = registry.get(tenant_id)
+    except UnknownTenant:
+        return web_app.json_response({"error": "Unknown tenant"}, 404)
+    except FileNotFoundError:
+        return web_app.json_response({"error": "No data for tenant"}, 404)
+    return web_app.dispatch(state, method, route, query, body, headers)
@@ -0,0 +1,90 @@
+import json
+import threading
+import unittest
+from unittest import mock
+
+import mvp_pos_insight_bot as bot
+import web_app
+from answer_cache import AnswerCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class AnswerCacheTests(unittest.TestCase):
+    def test_lru_eviction_and_counters(self):
+        cache = AnswerCache(maxsize=2)
+        cache.put("a", "1")
+        cache.put("b", "2")
+        self.assertEqual(cache.get("a"), "1")
+        cache.put("c", "3")
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.stats(), {
+            "size": 2, "maxsize": 2, "hits": 1, "misses": 1, "evictions": 1, "expirations": 0,
+        })
+
+    def test_entries_expire_after_ttl(self):
+        clock = FakeClock()
+        cache = AnswerCache(ttl=10, clock=clock)
+        cache.put("a", "1")
+        clock.now = 9.9
+        self.assertEqual(cache.get("a"), "1")
+        clock.now = 10.0
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.stats()["expirations"], 1)
+        self.assertEqual(len(cache), 0)
+
+    def test_concurrent_access(self):
+        cache = AnswerCache(maxsize=50)
+
+        def work(n):
+            for i in range(500):
+                if cache.get((n, i % 60)) is None:
+                    cache.put((n, i % 60), str(i))
+
+        threads = [threading.Thread(target=work, args=(n,)) for n in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        stats = cache.stats()
+        self.assertLessEqual(stats["size"], 50)
+        self.assertEqual(stats["hits"] + stats["misses"], 2000)
+
+
+class ChatCacheTests(unittest.TestCase):
+    def setUp(self):
+        self.state = web_app.load_state("data", "./data/sample_account.json")
+        web_app.ANSWER_CACHE.clear()
+
+    def _chat(self, state, q):
+        return json.loads(web_app.dispatch(state, "POST", "/api/chat", body=json.dumps({"q": q}).encode()).body)
+
+    def test_repeat_questions_skip_respond(self):
+        first = self._chat(self.state, "show store tea-001 status")
+        with mock.patch.object(bot, "answer", side_effect=AssertionError("recomputed")):
+            # Same intent and store, different wording: still a hit.
+            self.assertEqual(self._chat(self.state, "status for store tea-001"), first)
+
+    def test_new_snapshot_invalidates(self):
+        self._chat(self.state, "sms")
+        refreshed = self.state._replace(snapshot=bot.build_snapshot(self.state.snapshot.rows))
+        misses = web_app.ANSWER_CACHE.misses
+        self._chat(refreshed, "sms")
+        self.assertEqual(web_app.ANSWER_CACHE.misses, misses + 1)
+
+    def test_stats_endpoint(self):
+        self._chat(self.state, "labor")
+        self._chat(self.state, "labor")
+        stats = json.loads(web_app.dispatch(self.state, "GET", "/api/stats").body)
+        self.assertGreaterEqual(stats["answer_cache"]["hits"], 1)
+        self.assertIn("labor", stats["intents"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,108 @@
+import asyncio
+import http.client
+import json
+import socket
+import threading
+import time
+import unittest
+from unittest import mock
+
+import async_server
+import mvp_pos_insight_bot as bot
+import web_app
+
+
+class AsyncServerTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        state = web_app.load_state("data", "./data/sample_account.json")
+        cls.app = async_server.AsyncApp(state, max_concurrency=2, keepalive_timeout=5)
+        cls.loop = asyncio.new_event_loop()
+        cls.server = cls.loop.run_until_complete(cls.app.start("127.0.0.1", 0))
+        cls.port = cls.server.sockets[0].getsockname()[1]
+        cls.thread = threading.Thread(target=cls.loop.run_forever, daemon=True)
+        cls.thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.loop.call_soon_threadsafe(cls.server.close)
+        cls.loop.call_soon_threadsafe(cls.loop.stop)
+        cls.thread.join(timeout=1)
+        cls.app.close()
+
+    def _conn(self):
+        conn = http.client.HTTPConnection("127.0.0.1", self.port, timeout=5)
+        self.addCleanup(conn.close)
+        return conn
+
+    def test_routes_match_dispatch(self):
+        conn = self._conn()
+        for path in ("/healthz", "/api/dashboard", "/api/dashboard?store=tea-001", "/"):
+            conn.request("GET", path)
+            resp = conn.getresponse()
+            body = resp.read()
+            route, _, query = path.partition("?")
+            expected = web_app.dispatch(self.app.state, "GET", route, query)
+            self.assertEqual((resp.status, body), (expected.status, expected.body), path)
+
+    def test_keep_alive_reuses_one_socket(self):
+        conn = self._conn()
+        conn.request("POST", "/api/chat", body=json.dumps({"q": "status"}), headers={"Content-Type": "application/json"})
+        first = conn.getresponse()
+        self.assertIn("Revenue", json.loads(first.read())["answer"])
+        self.assertEqual(first.getheader("Connection"), "keep-alive")
+        sock = conn.sock
+        conn.request("POST", "/api/chat", body=json.dumps({"q": ""}))
+        second = conn.getresponse()
+        self.assertEqual(second.status, 400)
+        second.read()
+        self.assertIs(conn.sock, sock)
+
+    def test_connection_close_and_errors(self):
+        conn = self._conn()
+        conn.request("GET", "/missing", headers={"Connection": "close"})
+        resp = conn.getresponse()
+        self.assertEqual(resp.status, 404)
+        self.assertEqual(resp.getheader("Connection"), "close")
+        with socket.create_connection(("127.0.0.1", self.port), timeout=5) as raw:
+            raw.sendall(b"garbage\r\n\r\n")
+            self.assertTrue(raw.recv(1024).startswith(b"HTTP/1.1 400"))
+
+    def test_dashboard_cache_miss_leaves_the_loop(self):
+        snapshot = bot.build_snapshot(bot.load_columns("data"))
+        state = self.app.state._replace(snapshot=snapshot)
+        self.assertFalse(self.app._inline(state, "GET", "/api/dashboard"))
+        self.assertTrue(self.app._inline(state, "GET", "/healthz"))
+        web_app.dashboard_body(snapshot)
+        self.assertTrue(self.app._inline(state, "GET", "/api/dashboard"))
+
+    def test_route_errors_answer_500(self):
+        conn = self._conn()
+        with mock.patch("web_app.dispatch", side_effect=RuntimeError("boom")), \
+                self.assertLogs("async_server", "ERROR"):
+            for path in ("/healthz", "/api/chat"):
+                conn.request("GET", path)
+                resp = conn.getresponse()
+                self.assertEqual((resp.status, json.loads(resp.read())), (500, {"error": "Internal Server Error"}))
+        conn.request("GET", "/healthz")
+        self.assertEqual(conn.getresponse().status, 200)
+
+    def test_idle_clients_do_not_need_threads(self):
+        threads_before = threading.active_count()
+        idle = [socket.create_connection(("127.0.0.1", self.port), timeout=5) for _ in range(200)]
+        try:
+            deadline = time.time() + 2
+            while self.app.open_connections < 200 and time.time() < deadline:
+                time.sleep(0.01)
+            self.assertGreaterEqual(self.app.open_connections, 200)
+            self.assertLessEqual(threading.active_count(), threads_before + 2)
+            conn = self._conn()
+            conn.request("GET", "/api/dashboard")
+            self.assertEqual(conn.getresponse().status, 200)
+        finally:
+            for s in idle:
+                s.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
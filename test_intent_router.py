@@ -0,0 +1,75 @@
+import json
+import os
+import tempfile
+import unittest
+
+import mvp_pos_insight_bot as bot
+import web_app
+from intent_router import IntentRouter, KeywordMatcher, normalize_text
+
+
+class KeywordMatcherTests(unittest.TestCase):
+    def test_finds_overlapping_patterns_in_one_pass(self):
+        matcher = KeywordMatcher([("he", 1), ("she", 2), ("hers", 3), ("his", 4), ("top item", 5)])
+        self.assertEqual(matcher.find("she hers his"), [(0, 3, 2), (4, 8, 3), (9, 12, 4)])
+        self.assertEqual([p for _, _, p in matcher.find(normalize_text("Top   ITEM?"))], [5])
+
+    def test_matches_only_whole_words(self):
+        matcher = KeywordMatcher([("table", "t"), ("tea-001", "a"), ("tea-0011", "b")])
+        self.assertEqual(matcher.find("vegetable tables"), [])
+        self.assertEqual([p for _, _, p in matcher.find("store tea-0011 status")], ["b"])
+        self.assertEqual([p for _, _, p in matcher.find("(tea-001) table.")], ["a", "t"])
+
+
+class IntentRoutingTests(unittest.TestCase):
+    def setUp(self):
+        self.rows = bot.normalize(bot.load_rows("data"))
+        self.snapshot = bot.build_snapshot(self.rows)
+
+    def _intent(self, q, **kwargs):
+        return bot.resolve_query(q, self.rows, self.snapshot, **kwargs).intent
+
+    def test_priorities_follow_the_old_chain(self):
+        cases = {
+            "what is my status today?": "status",
+            "how did this week compare to last week?": "week_over_week",
+            "labor and waste": "labor",
+            "what was my top item": "top_item",
+            "stores": "stores",
+            "show store tea-001": "scoped_summary",
+            "hello": "help",
+            "vegetable prices": "help",
+        }
+        for q, intent in cases.items():
+            self.assertEqual(self._intent(q), intent, q)
+
+    def test_store_aliases_from_config(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as fh:
+            json.dump({"bot_name": "Miso", "store_aliases": {"Downtown": "tea-001"}}, fh)
+        self.addCleanup(os.remove, fh.name)
+        aliases = bot.load_account_config(fh.name)["store_aliases"]
+        resolved = bot.resolve_query("downtown labor", self.rows, self.snapshot, aliases=aliases)
+        self.assertEqual(resolved, bot.ResolvedQuery("labor", bot.QueryFilter("tea-001")))
+        # Bare ids still need a hint word ("store", "at", "for").
+        self.assertIsNone(bot.resolve_query("tea-001 labor", self.rows, self.snapshot).flt.store_id)
+
+    def test_registry_accepts_new_intents(self):
+        router = IntentRouter()
+        router.register("greet", ("hello",), 5, lambda ask: "hi")
+        before = router.version
+        router.intent("bye", ("bye",), 1)(lambda ask: "bye")
+        self.assertGreater(router.version, before)
+        self.assertEqual(router.pick(["greet", "bye"]).name, "bye")
+        self.assertIsNone(router.pick(["unknown"]))
+
+    def test_fired_intents_are_counted_and_reported(self):
+        before = bot.ROUTER.stats().get("waste", 0)
+        bot.respond("waste", self.snapshot.metrics, self.rows, "Miso", snapshot=self.snapshot)
+        self.assertEqual(bot.ROUTER.stats()["waste"], before + 1)
+        state = web_app.load_state("data", "./data/sample_account.json")
+        response = web_app.dispatch(state, "POST", "/api/chat", body=b'{"q": "show store tea-001 status"}')
+        self.assertEqual(json.loads(response.body)["intent"], "status")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -82,6 +82,20 @@ class BotFunctionCoverageTests(unittest.TestCase):
         self.assertIn("Miso:", bot.respond("sms", self.metrics, self.rows, "Miso"))
         self.assertIn("Ask me:", bot.respond("unrecognized", self.metrics, self.rows, "Miso"))
 
+    def test_streaming_ingest_matches_list_path(self):
+        acc = bot.KpiAccumulator().consume(bot.iter_records("data"))
+        self.assertEqual(acc.metrics(), self.metrics)
+        self.assertEqual(acc.store_metrics(), bot.store_metrics_map(self.rows))
+        self.assertEqual(acc.daily_table(), bot.daily_table(self.rows))
+        self.assertEqual(acc.row_count, len(self.rows))
+
+    def test_iter_rows_is_lazy_but_validates_dir(self):
+        with tempfile.TemporaryDirectory() as td:
+            with self.assertRaises(FileNotFoundError):
+                bot.iter_rows(td)
+        it = bot.iter_normalized(bot.iter_rows("data"))
+        self.assertEqual(next(it), self.rows[0])
+
     def test_web_build_state(self):
         account, rows, metrics = web_app.build_state("data", "./data/sample_account.json")
         self.assertIn("bot_name", account)
@@ -0,0 +1,47 @@
+import shutil
+import tempfile
+import unittest
+
+import mvp_pos_insight_bot as bot
+import pos_bench
+
+
+class PosBenchTests(unittest.TestCase):
+    def setUp(self):
+        self.td = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.td)
+
+    def test_generated_layouts_normalize(self):
+        n = pos_bench.generate_dataset(self.td, stores=5, days=3, lines=7)
+        self.assertEqual(n, 5 * 3 * 7)
+        rows = bot.load_columns(self.td)
+        self.assertEqual(len(rows), n)
+        self.assertEqual(len(bot.store_metrics_map(rows)), 5)
+        by_layout = {}
+        for raw, rec in zip(bot.load_rows(self.td), bot.normalize(bot.load_rows(self.td))):
+            by_layout.setdefault(raw[bot.SOURCE_FILE_KEY], []).append(rec)
+        self.assertEqual(len(by_layout), 3)
+        for recs in by_layout.values():
+            self.assertTrue(all(r["revenue"] > 0 and r["date"] is not None for r in recs))
+            self.assertGreater(sum(r["labor_cost"] for r in recs), 0)
+        # Same seed, same bytes.
+        again = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, again)
+        pos_bench.generate_dataset(again, stores=5, days=3, lines=7)
+        self.assertEqual(bot.metrics(bot.load_columns(again)), bot.metrics(rows))
+
+    def test_run_and_compare(self):
+        pos_bench.generate_dataset(self.td, stores=3, days=2, lines=5)
+        result = pos_bench.run_benchmarks(self.td, repeat=1, chat_requests=12)
+        self.assertEqual(result["params"]["rows"], 30)
+        self.assertIn("build_snapshot", result["stages"])
+        self.assertEqual(result["chat"]["http"]["n"], 12)
+        lines, regressions = pos_bench.compare(result, result)
+        self.assertEqual(regressions, [])
+        slower = dict(result, stages=dict(result["stages"], metrics=dict(result["stages"]["metrics"])))
+        slower["stages"]["metrics"]["seconds"] = result["stages"]["metrics"]["seconds"] * 2 + 1
+        self.assertEqual(pos_bench.compare(result, slower)[1], ["metrics.seconds"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import mvp_pos_insight_bot as bot
+from pos_cache import ColumnCache
+from pos_columnar import ColumnarRows
+from pos_refresh import IngestCatalog
+
+
+class ColumnCacheTests(unittest.TestCase):
+    def setUp(self):
+        self.td = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.td)
+        for name in ("clover_export_sample.csv", "square_export_sample.csv", "toast_export_sample.csv"):
+            shutil.copy(os.path.join("data/pos_samples", name), self.td)
+        self.cache_dir = os.path.join(self.td, ".pos_cache")
+
+    def _catalog(self):
+        catalog = IngestCatalog(self.td, ColumnCache(self.cache_dir))
+        catalog.refresh()
+        return catalog
+
+    def test_warm_start_skips_parsing(self):
+        cold = self._catalog()
+        self.assertEqual(cold.parsed_files, 3)
+        warm = self._catalog()
+        self.assertEqual(warm.parsed_files, 0)
+        self.assertEqual(warm.cache.hits, 3)
+        self.assertEqual(list(warm.rows()), list(cold.rows()))
+        self.assertEqual(dict(warm.snapshot().metrics), dict(cold.snapshot().metrics))
+
+    def test_cached_columns_are_read_only_views(self):
+        self._catalog()
+        chunk = next(iter(self._catalog().files.values()))[1]
+        self.assertIsInstance(chunk.revenue, memoryview)
+        self.assertTrue(chunk.revenue.readonly)
+        self.assertEqual(bot.metrics(chunk), bot.metrics(list(chunk)))
+
+    def test_changed_file_invalidates_entry(self):
+        self._catalog()
+        path = os.path.join(self.td, "toast_export_sample.csv")
+        with open(path, "a", encoding="utf-8") as fh:
+            fh.write("2026-02-14,la-downtown,3200,Burger,14.00,3.50,0.40\n")
+        catalog = self._catalog()
+        self.assertEqual(catalog.parsed_files, 1)
+        self.assertEqual(len(os.listdir(self.cache_dir)), 3)
+        self.assertEqual(list(catalog.rows()), bot.normalize(bot.load_rows(self.td)))
+
+    def test_corrupt_cache_file_is_a_miss(self):
+        self._catalog()
+        for name in os.listdir(self.cache_dir):
+            with open(os.path.join(self.cache_dir, name), "r+b") as fh:
+                fh.write(b"garbage!")
+        self.assertEqual(self._catalog().parsed_files, 3)
+
+    def test_truncated_cache_file_is_a_miss(self):
+        cold = self._catalog()
+        names = sorted(os.listdir(self.cache_dir))
+        # Inside the length field, inside the JSON header, inside the columns.
+        for name, keep in zip(names, (12, 40, -8)):
+            path = os.path.join(self.cache_dir, name)
+            with open(path, "r+b") as fh:
+                fh.truncate(keep if keep > 0 else os.path.getsize(path) + keep)
+        warm = self._catalog()
+        self.assertEqual(warm.parsed_files, 3)
+        self.assertEqual(list(warm.rows()), list(cold.rows()))
+
+    def test_empty_chunk_round_trip(self):
+        cache = ColumnCache(self.cache_dir)
+        cache.store("x.csv", 1, 0, "sha", ColumnarRows())
+        hit = cache.load("x.csv", 1, 0)
+        self.assertEqual(hit.sha256, "sha")
+        self.assertEqual(len(hit.rows), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,40 @@
+import unittest
+
+import mvp_pos_insight_bot as bot
+from pos_columnar import ColumnarRows
+
+
+class ColumnarRowsTests(unittest.TestCase):
+    def setUp(self):
+        self.rows = bot.normalize(bot.load_rows("data/pos_samples")) + bot.normalize(bot.load_rows("data"))
+        self.cols = ColumnarRows.from_records(self.rows)
+
+    def test_round_trips_records(self):
+        self.assertEqual(len(self.cols), len(self.rows))
+        self.assertEqual(list(self.cols), self.rows)
+
+    def test_aggregates_match_dict_path(self):
+        self.assertEqual(bot.metrics(self.cols), bot.metrics(self.rows))
+        self.assertEqual(bot.store_metrics_map(self.cols), bot.store_metrics_map(self.rows))
+        self.assertEqual(list(bot.store_metrics_map(self.cols)), list(bot.store_metrics_map(self.rows)))
+        self.assertEqual(bot.daily_table(self.cols), bot.daily_table(self.rows))
+
+    def test_empty_columns(self):
+        empty = ColumnarRows()
+        self.assertFalse(empty)
+        self.assertEqual(bot.metrics(empty), bot.metrics([]))
+        self.assertEqual(bot.store_metrics_map(empty), {})
+        self.assertEqual(bot.daily_table(empty), bot.daily_table([]))
+
+    def test_strings_are_interned(self):
+        self.assertEqual(len(self.cols.stores), len(bot.store_metrics_map(self.rows)))
+        self.assertEqual(self.cols.nbytes(), len(self.rows) * 49)
+
+    def test_respond_over_columns(self):
+        m = bot.metrics(self.cols)
+        self.assertIn("store la-burbank", bot.respond("show store la-burbank status", m, self.cols, "Miso"))
+        self.assertIn("date", bot.respond("table", m, self.cols, "Miso"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,127 @@
+import io
+import os
+import shutil
+import tempfile
+import unittest
+from contextlib import redirect_stderr, redirect_stdout
+from datetime import date
+from unittest import mock
+
+import mvp_pos_insight_bot as bot
+import web_app
+from pos_costs import CostLedger, merge_asof, waste_cents
+from pos_inventory import load_inventory
+from pos_refresh import IngestCatalog
+from pos_shifts import load_shifts
+
+SALES_CSV = (
+    "date,store_id,order_id,item,revenue,labor_cost,waste_cost\n"
+    "2026-03-01,s1,1,Tea,100.00,50,5\n"
+    "2026-03-02,s1,2,Tea,100.00,50,5\n"
+    "2026-03-02,s1,3,Tea,100.00,50,5\n"
+    "2026-03-04,s1,4,Tea,100.00,50,5\n"
+    "2026-03-02,s2,5,Tea,80.00,20,2\n"
+)
+# s1 is closed on 03-03; s9 has no sales at all.
+SHIFTS_CSV = (
+    "store_id,staff_id,shift_date,clock_in,clock_out,labor_cost\n"
+    "s1,ann,2026-03-02,09:00,17:00,120\n"
+    "s1,bob,2026-03-03,08:00,12:00,40\n"
+    "s1,cat,2026-03-04,22:00,02:00,60\n"
+    "s9,dan,2026-03-02,09:00,10:00,15\n"
+)
+COUNTS_CSV = (
+    "store_id,sku,count_date,unit_cost,waste_qty\n"
+    "s1,milk,2026-03-01,,2\n"
+    "s1,milk,2026-03-02,1.50,4\n"
+    "s1,milk,2026-03-03,2.00,0\n"
+    "s1,milk,2026-03-04,,1\n"
+    "s1,cups,2026-03-02,,3\n"
+    "s1,milk,03/05/2026,,1\n"
+)
+
+
+class CostLedgerTests(unittest.TestCase):
+    def setUp(self):
+        self.td = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.td)
+        for name, body in (("sales.csv", SALES_CSV), ("shifts/week.csv", SHIFTS_CSV),
+                           ("inventory/counts.csv", COUNTS_CSV)):
+            self._write(name, body)
+        self.bad = []
+        self.shifts = load_shifts(self.td, self.bad)
+        self.counts = load_inventory(self.td, self.bad)
+
+    def _write(self, name, body):
+        path = os.path.join(self.td, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as fh:
+            fh.write(body)
+
+    def test_merge_asof(self):
+        self.assertEqual(list(merge_asof([2, 5, 9], [1, 2, 4, 5, 10])), [0, 0, 0, 1, 2])
+
+    def test_waste_valued_at_unit_cost_as_of_count(self):
+        self.assertEqual([(b.line, b.column) for b in self.bad], [(7, "count_date")])
+        d = date(2026, 3, 1).toordinal()
+        # The first count takes the first later cost; cups never have one.
+        self.assertEqual(sorted(waste_cents(self.counts)),
+                         [("s1", d, 300), ("s1", d + 1, 600), ("s1", d + 2, 0), ("s1", d + 3, 200)])
+
+    def test_snapshot_takes_costs_from_sources(self):
+        snapshot = bot.build_snapshot(bot.load_columns(self.td), shifts=self.shifts, inventory=self.counts)
+        m = snapshot.metrics
+        self.assertEqual((m["revenue"], m["labor"], m["waste"]), (480.0, 290.0, 13.0))
+        self.assertEqual(snapshot.store_metrics["s1"]["labor"], 270.0)
+        self.assertEqual(snapshot.store_metrics["s2"]["labor"], 20.0)
+        # 03-01 is before s1's first shift and keeps the POS labor; 03-03's costs move to 03-02.
+        self.assertEqual(snapshot.daily[date(2026, 3, 1)].labor, 50.0)
+        self.assertEqual(snapshot.daily[date(2026, 3, 2)].labor, 180.0)
+        self.assertEqual(snapshot.daily[date(2026, 3, 2)].waste, 8.0)
+        window = bot.window_metrics(bot.QueryFilter("s1", date(2026, 3, 4)), snapshot.rows, snapshot)
+        self.assertEqual((window["labor"], window["waste"]), (60.0, 2.0))
+        self.assertEqual(snapshot.costs.unmatched, [1500, 0])
+        self.assertEqual(m, bot.metrics(snapshot.rows))
+        self.assertIsNone(bot.build_snapshot(bot.load_columns(self.td)).costs)
+
+    def _main(self, *args):
+        out, err = io.StringIO(), io.StringIO()
+        with mock.patch("sys.argv", ["bot", "--data-dir", self.td, "--no-chat", *args]), \
+                redirect_stdout(out), redirect_stderr(err):
+            bot.main()
+        return out.getvalue(), err.getvalue()
+
+    def test_streaming_cli_matches_snapshot(self):
+        for flt in ((), ("--store", "s1", "--from", "2026-03-02")):
+            streamed, err = self._main(*flt)
+            self.assertEqual(streamed, self._main("--workers", "2", *flt)[0])
+            self.assertIn("$15.00 of shift labor matched no store", err)
+        self.assertIn("Labor ratio 73.3%", streamed)
+
+    def test_catalog_and_dashboard(self):
+        catalog = IngestCatalog(self.td)
+        with self.assertLogs("pos_refresh", "WARNING"):
+            catalog.refresh()
+            snapshot = catalog.snapshot()
+        self.assertEqual(snapshot.metrics["waste"], 13.0)
+        self.assertEqual([b.column for b in catalog.quarantine()], ["count_date"])
+        payload = web_app.dashboard_payload(None, None, snapshot=snapshot)
+        self.assertEqual(payload["cost_sources"], {
+            "shifts": 4, "inventory_counts": 5, "labor_store_days": 4, "waste_store_days": 4,
+            "unmatched_labor": 15.0, "unmatched_waste": 0.0,
+        })
+        self.assertFalse(catalog.refresh())
+        self._write("inventory/counts.csv", COUNTS_CSV + "s2,milk,2026-03-02,1.50,2\n")
+        self.assertTrue(catalog.refresh())
+        self.assertEqual(catalog.snapshot().store_metrics["s2"]["waste"], 3.0)
+
+    def test_ledger_without_sources_is_a_no_op(self):
+        cols = bot.load_columns(self.td)
+        ledger = CostLedger()
+        self.assertFalse(ledger)
+        self.assertEqual(list(ledger.apply(cols)), list(cols))
+        self.assertEqual(ledger.allocate({"s1": [1]}), {})
+
+
+if __name__ == "__main__":
+    unittest.main()
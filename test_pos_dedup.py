@@ -0,0 +1,122 @@
+import os
+import random
+import shutil
+import tempfile
+import unittest
+from datetime import date
+
+import mvp_pos_insight_bot as bot
+import web_app
+from pos_dedup import Deduper, LineIndex, chunk_keys, line_key, repeat_key
+from pos_distinct import hash_key
+from pos_refresh import IngestCatalog
+from pos_sqlite import SqliteStore
+
+HEADER = "date,store_id,order_id,item,revenue,labor_cost,waste_cost\n"
+JAN = (
+    "2026-01-01,s1,1,Tea,3.00,1,0\n"
+    "2026-01-01,s1,1,Tea,3.00,1,0\n"
+    "2026-01-01,s1,2,Cake,5.00,1,0\n"
+    "2026-01-02,s2,3,Tea,3.00,1,0\n"
+)
+# Re-export overlapping JAN: order 1 now has a third Tea, order 2 is repeated as is.
+OVERLAP = (
+    "2026-01-01,s1,1,Tea,3.00,1,0\n"
+    "2026-01-01,s1,1,Tea,3.00,1,0\n"
+    "2026-01-01,s1,1,Tea,3.00,1,0\n"
+    "2026-01-01,s1,2,Cake,5.00,1,0\n"
+    "2026-01-03,s2,4,Tea,3.00,1,0\n"
+)
+
+
+class LineIndexTests(unittest.TestCase):
+    def _check(self, index):
+        rng = random.Random(3)
+        keys = [rng.getrandbits(64) - (1 << 63) for _ in range(3000)]
+        self.assertEqual([index.add(k) for k in keys[:2000]], [True] * 2000)
+        self.assertEqual(index.add_unique(keys[1000:]), [False] * 1000 + [True] * 1000)
+        self.assertEqual(len(index), 3000)
+        self.assertTrue(all(k in index for k in keys))
+        self.assertFalse(any(k + 1 in index for k in keys[:50]))
+
+    def test_in_memory_runs(self):
+        index = LineIndex(buffer_keys=64)
+        self._check(index)
+        self.assertLess(len(index._runs), 12)
+
+    def test_spill_to_disk(self):
+        spill = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, spill)
+        with LineIndex(spill, buffer_keys=64) as index:
+            self._check(index)
+            self.assertTrue(os.listdir(spill))
+        self.assertEqual(os.listdir(spill), [])
+        self.assertEqual(len(index), 0)
+
+
+class DedupPipelineTests(unittest.TestCase):
+    def setUp(self):
+        self.td = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.td)
+        self._write("a_jan.csv", JAN)
+        self._write("b_overlap.csv", OVERLAP)
+
+    def _write(self, name, body, header=HEADER):
+        with open(os.path.join(self.td, name), "w", encoding="utf-8") as fh:
+            fh.write(header + body)
+
+    def test_overlapping_files_count_once(self):
+        cols = bot.load_columns(self.td)
+        self.assertEqual(len(cols), 6)
+        self.assertEqual(cols.duplicates, {"b_overlap.csv": 3})
+        m = bot.metrics(cols)
+        self.assertEqual(m["revenue"], 20.0)
+        self.assertEqual(m["orders"], 4)
+        self.assertEqual(len(bot.load_columns(self.td, dedup=False)), 9)
+
+    def test_streaming_matches_columnar(self):
+        deduper = Deduper()
+        streamed = list(bot.iter_records(self.td, deduper=deduper))
+        self.assertEqual(streamed, list(bot.load_columns(self.td)))
+        self.assertEqual(deduper.dropped, {"b_overlap.csv": 3})
+        self.assertEqual(bot.KpiAccumulator().consume(streamed).metrics()["revenue"], 20.0)
+
+    def test_keys_are_fixed_digests(self):
+        # Persisted in SQLite, so they must not change with the process or the Python version.
+        key = line_key(hash_key("s1"), hash_key("1"), hash_key("Tea"), 300, date(2026, 1, 1).toordinal())
+        self.assertEqual((key, repeat_key(key, 1)), (2250410062960892159, -5132969714728679296))
+        cols = bot.parse_file_columns(os.path.join(self.td, "a_jan.csv"))
+        self.assertEqual(chunk_keys(cols)[:2], [key, repeat_key(key, 1)])
+
+    def test_files_without_order_ids_are_kept(self):
+        body = "2026-01-01,s1,Tea,3.00\n"
+        self._write("c.csv", body, "date,store_id,item,revenue\n")
+        self._write("d.csv", body, "date,store_id,item,revenue\n")
+        self.assertEqual(len(bot.load_columns(self.td)), 8)
+
+    def test_catalog_and_dashboard(self):
+        catalog = IngestCatalog(self.td)
+        catalog.refresh()
+        with self.assertLogs("pos_refresh", "INFO"):
+            snapshot = catalog.snapshot()
+        self.assertEqual(list(snapshot.rows), list(bot.load_columns(self.td)))
+        self.assertEqual(catalog.duplicates, {"b_overlap.csv": 3})
+        payload = web_app.dashboard_payload(None, None, snapshot=snapshot)
+        self.assertEqual(payload["duplicate_lines"], 3)
+
+    def test_sqlite_keeps_keys_across_restarts(self):
+        os.rename(os.path.join(self.td, "b_overlap.csv"), os.path.join(self.td, "b_overlap.tmp"))
+        db = os.path.join(self.td, "kpi.sqlite")
+        store = SqliteStore(db, data_dir=self.td)
+        store.refresh()
+        store.close()
+        os.rename(os.path.join(self.td, "b_overlap.tmp"), os.path.join(self.td, "b_overlap.csv"))
+        reopened = SqliteStore(db, data_dir=self.td)
+        self.addCleanup(reopened.close)
+        self.assertTrue(reopened.refresh())
+        self.assertEqual(reopened.duplicates, {"b_overlap.csv": 3})
+        self.assertEqual(reopened.metrics()["revenue"], 20.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+import random
+import unittest
+
+import mvp_pos_insight_bot as bot
+from pos_distinct import DistinctCounter, HyperLogLog, distinct_count, hash_key, union_count
+from test_pos_partition import _synthetic_rows
+
+
+class DistinctCounterTests(unittest.TestCase):
+    def test_matches_sets(self):
+        rng = random.Random(7)
+        pairs = [(rng.randrange(6), rng.randrange(300)) for _ in range(2000)]
+        # Mostly single-group codes, as with real tickets.
+        pairs += [(code % 6, code) for code in range(300, 1300) for _ in range(3)]
+        counter = DistinctCounter()
+        counter.extend(pairs)
+        sets = {}
+        for group, code in pairs:
+            sets.setdefault(group, set()).add(code)
+        self.assertEqual(counter.counts(), {g: len(s) for g, s in sets.items()})
+
+        exclusive = counter.exclusive_counts()
+        shared = counter.shared_codes()
+        for groups in ([0], [1, 2], [0, 3, 4, 5], list(range(6))):
+            expected = len(set().union(*(sets[g] for g in groups)))
+            actual = union_count(sum(exclusive.get(g, 0) for g in groups), (shared.get(g) for g in groups))
+            self.assertEqual(actual, expected, groups)
+        self.assertEqual(list(shared[0]), sorted(shared[0]))
+
+    def test_add_grows(self):
+        counter = DistinctCounter()
+        counter.add(1, 5000)
+        counter.add(1, 5000)
+        counter.add(2, 3)
+        self.assertEqual(counter.counts(), {1: 1, 2: 1})
+
+    def test_distinct_count(self):
+        self.assertEqual(distinct_count([3, 1, 3, 0], 5), 3)
+
+
+class HyperLogLogTests(unittest.TestCase):
+    def test_estimate_and_merge(self):
+        a, b, union = HyperLogLog(), HyperLogLog(), HyperLogLog()
+        for i in range(30000):
+            key = f"order-{i}"
+            (a if i < 20000 else b).add(key)
+            union.add(key)
+        b.add("order-5")
+        self.assertLess(abs(len(a) - 20000) / 20000, 0.05)
+        self.assertEqual(a.merge(b).registers, union.registers)
+        self.assertLess(abs(len(a) - 30000) / 30000, 0.05)
+
+    def test_small_counts_are_near_exact(self):
+        sketch = HyperLogLog()
+        for i in range(100):
+            sketch.add(str(i))
+            sketch.add(str(i))
+        self.assertLessEqual(abs(len(sketch) - 100), 2)
+
+    def test_stable_hash_and_precision_checks(self):
+        self.assertEqual(hash_key("1001"), hash_key("1001"))
+        with self.assertRaises(ValueError):
+            HyperLogLog(3)
+        with self.assertRaises(ValueError):
+            HyperLogLog(10).merge(HyperLogLog(11))
+
+
+class KpiAccumulatorDistinctTests(unittest.TestCase):
+    def setUp(self):
+        self.rows = _synthetic_rows()
+
+    def test_exact_mode_matches_row_metrics(self):
+        acc = bot.KpiAccumulator().consume(self.rows)
+        self.assertEqual(acc.metrics()["orders"], bot.metrics(self.rows)["orders"])
+        expected = bot.store_metrics_map(self.rows)
+        self.assertEqual({s: m["orders"] for s, m in acc.store_metrics().items()},
+                         {s: m["orders"] for s, m in expected.items()})
+        self.assertEqual({d: t.orders for d, t in acc.daily_totals().items()},
+                         {d: t.orders for d, t in bot.daily_totals(self.rows).items()})
+
+    def test_hll_partials_merge(self):
+        half = len(self.rows) // 2
+        left = bot.KpiAccumulator("hll").consume(self.rows[:half])
+        right = bot.KpiAccumulator("hll").consume(self.rows[half:])
+        merged = left.merge(right).metrics()
+        expected = bot.metrics(self.rows)
+        self.assertAlmostEqual(merged["revenue"], expected["revenue"])
+        self.assertLess(abs(merged["orders"] - expected["orders"]), 0.05 * expected["orders"])
+        self.assertEqual(merged["top_item"], expected["top_item"])
+        with self.assertRaises(ValueError):
+            bot.KpiAccumulator().merge(right)
+        with self.assertRaises(ValueError):
+            bot.KpiAccumulator("bitmap")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -29,6 +29,22 @@ class PosExportE2ETests(unittest.TestCase):
         response = bot.respond("show store la-burbank status", metrics, normalized, "Miso")
         self.assertIn("store la-burbank", response)
 
+    def test_mixed_vendor_exports_use_per_file_schema(self):
+        normalized = bot.normalize(bot.load_rows("data/pos_samples"))
+        per_file = [self._run_export(name)[1]["revenue"] for name in (
+            "clover_export_sample.csv", "square_export_sample.csv", "toast_export_sample.csv")]
+        self.assertAlmostEqual(bot.metrics(normalized)["revenue"], sum(per_file))
+        self.assertNotIn("default-store", bot.store_metrics_map(normalized))
+        self.assertEqual(list(bot.iter_records("data/pos_samples")), normalized)
+
+    def test_schema_compiled_once_per_header(self):
+        header = ("business_date", "location_id", "ticket_id", "menu_item", "net_sales", "labor", "spoilage")
+        schema = bot.compile_schema(header)
+        self.assertIs(bot.compile_schema(header), schema)
+        self.assertEqual(schema.columns["revenue"], "net_sales")
+        self.assertEqual(schema.columns["store_id"], "location_id")
+        self.assertIsNone(schema.columns["quantity"])
+
 
 if __name__ == "__main__":
     unittest.main()
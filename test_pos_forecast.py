@@ -0,0 +1,100 @@
+import json
+import math
+import os
+import unittest
+from datetime import date, timedelta
+from unittest import mock
+
+import mvp_pos_insight_bot as bot
+import pos_forecast
+import pos_numpy
+import web_app
+from pos_columnar import ColumnarRows
+from pos_forecast import HOLT_WINTERS, NAIVE, ItemForecast
+
+# Mon..Sun units of a steady weekly item.
+PATTERN = (10, 10, 10, 10, 20, 30, 5)
+START = date(2026, 3, 2)  # a Monday
+
+
+def _records(days=28):
+    out = []
+    for t in range(days):
+        d = START + timedelta(days=t)
+        for store, item, qty in (("s1", "Tea", PATTERN[t % 7]), ("s2", "Tea", PATTERN[t % 7]),
+                                 ("s2", "Cake", 10 + t)):
+            out.append({"date": d, "store_id": store, "revenue": 2.0 * qty, "quantity": float(qty),
+                        "labor_cost": 0.0, "waste_cost": 0.0, "item_name": item, "order_key": f"{store}-{t}"})
+    return out
+
+
+class ForecastTests(unittest.TestCase):
+    def setUp(self):
+        self.cols = ColumnarRows.from_records(_records())
+        self.forecast = pos_forecast.fit(self.cols)
+
+    def test_models_per_series(self):
+        f = self.forecast
+        self.assertEqual((f.first, f.history), (date(2026, 3, 30), 28))
+        models = dict(zip(f.keys, f.models))
+        # A repeating week is caught exactly by last week; a trend needs Holt-Winters.
+        self.assertEqual(models, {("s1", "Tea"): NAIVE, ("s2", "Tea"): NAIVE, ("s2", "Cake"): HOLT_WINTERS})
+        units = dict(zip(f.keys, f.units))
+        self.assertEqual(units[("s1", "Tea")], [float(q) for q in PATTERN])
+        self.assertTrue(31 < units[("s2", "Cake")][0] < 38)
+        self.assertEqual(f.model_counts(), {"seasonal_naive": 2, "holt_winters": 1})
+
+    def test_items_sum_stores_and_add_the_typical_miss(self):
+        f = self.forecast
+        cake = f.units[f.keys.index(("s2", "Cake"))][0]
+        error = f.errors[f.keys.index(("s2", "Cake"))]
+        self.assertEqual(f.items(date(2026, 3, 30)), [
+            ItemForecast("Cake", round(cake, 1), math.ceil(cake + error)),
+            ItemForecast("Tea", 20.0, 20),
+        ])
+        self.assertEqual(f.items(date(2026, 4, 4), "s1"), [ItemForecast("Tea", 30.0, 30)])
+        self.assertEqual(f.items(date(2026, 4, 6)), [])
+
+    def test_short_history_uses_daily_mean(self):
+        f = pos_forecast.fit(bot.load_columns("data"))
+        self.assertEqual(f.model_counts(), {"daily_mean": len(f.keys)})
+        self.assertEqual(f.first, date(2026, 2, 12))
+        self.assertFalse(pos_forecast.fit(ColumnarRows()))
+
+    def test_chat_api_and_top_action(self):
+        snapshot = bot.build_snapshot(self.cols)
+        self.assertIs(bot.window_forecast(snapshot.rows, snapshot), bot.window_forecast(snapshot.rows, snapshot))
+        answer = bot.respond("forecast tomorrow", snapshot.metrics, snapshot.rows, "Nomi", snapshot=snapshot)
+        self.assertIn("Demand forecast for Mon 2026-03-30 (all stores), from 28 day(s) of history", answer)
+        self.assertIn("Tea                      20.0 units", answer)
+        prep = bot.respond("prep list for store s1 2026-04-03", snapshot.metrics, snapshot.rows, "Nomi",
+                           snapshot=snapshot)
+        self.assertIn("Prep list for Fri 2026-04-03 (store s1)", prep)
+        self.assertIn("Tea                      20.0     20", prep)
+
+        state = web_app.AppState({"bot_name": "Nomi"}, snapshot)
+        body = json.loads(web_app.dispatch(state, "GET", "/api/forecast").body)
+        self.assertEqual((body["date"], len(body["days"]), body["history_days"]), ("2026-03-30", 7, 28))
+        self.assertEqual(body["items"][1], {"item": "Tea", "forecast": 20.0, "prep": 20})
+        body = json.loads(web_app.dispatch(state, "GET", "/api/forecast", "store=s1&date=2026-04-05").body)
+        self.assertEqual(body["items"], [{"item": "Tea", "forecast": 5.0, "prep": 5}])
+        self.assertEqual(web_app.dispatch(state, "GET", "/api/forecast", "date=soon").status, 400)
+
+        m = dict(snapshot.metrics, labor_ratio=0.0, waste_ratio=9.0)
+        tomorrow = bot.window_forecast(snapshot.rows, snapshot).items(date(2026, 3, 30))
+        self.assertEqual(bot.top_action(m, prep=tomorrow),
+                         "Waste is high. Prep to tomorrow's forecast: Cake 37, Tea 20 (ask for the prep list).")
+
+    @unittest.skipUnless(pos_numpy.AVAILABLE, "numpy not installed")
+    def test_numpy_identical_to_stdlib(self):
+        for days in (5, 28, 100):
+            cols = ColumnarRows.from_records(_records(days))
+            with mock.patch.dict(os.environ, {"POS_ENGINE": "python"}):
+                expected = pos_forecast.fit(cols)
+            actual = pos_forecast.fit(cols)
+            self.assertEqual(sorted(zip(actual.keys, actual.units, actual.errors, actual.models)),
+                             sorted(zip(expected.keys, expected.units, expected.errors, expected.models)))
+
+
+if __name__ == "__main__":
+    unittest.main()
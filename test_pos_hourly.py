@@ -0,0 +1,138 @@
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import date
+
+import mvp_pos_insight_bot as bot
+import web_app
+from pos_columnar import ColumnarRows
+from pos_hourly import HourCell, HourGrid, dayparts, labor_heavy_hours
+from pos_parse import parse_time
+from pos_refresh import IngestCatalog
+from pos_shifts import load_shifts
+
+TIMED_CSV = (
+    "date,store_id,order_id,item,revenue,order_time\n"
+    "2026-03-02,s1,1,Tea,10.00,09:15\n"
+    "2026-03-02,s1,1,Cake,5.00,09:15\n"
+    "2026-03-02,s1,2,Tea,10.00,09:50\n"
+    "2026-03-02,s1,3,Tea,20.00,12:05\n"
+    "2026-03-03,s1,4,Tea,10.00,9:30 AM\n"
+    "2026-03-02,s2,5,Tea,8.00,13:00\n"
+    "2026-03-02,s1,6,Tea,4.00,soon\n"
+)
+# Timestamps in the date column give the hour too.
+STAMPED_CSV = (
+    "business_date,location_id,ticket_id,menu_item,net_sales\n"
+    "2026-03-03T12:30:00,s2,9,Soup,6.00\n"
+)
+SHIFTS_CSV = (
+    "store_id,staff_id,shift_date,clock_in,clock_out,hourly_rate\n"
+    "s1,ann,2026-03-02,09:00,13:00,15.00\n"
+    "s1,bob,2026-03-02,09:30,10:30,20.00\n"
+    "s1,cat,2026-03-02,23:00,01:00,10.00\n"
+    "s2,dan,2026-03-02,,17:00,10.00\n"
+)
+
+
+class HourGridTests(unittest.TestCase):
+    def setUp(self):
+        self.td = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.td)
+        os.mkdir(os.path.join(self.td, "shifts"))
+        for name, body in (("a.csv", TIMED_CSV), ("b.csv", STAMPED_CSV), ("shifts/week.csv", SHIFTS_CSV)):
+            with open(os.path.join(self.td, name), "w", encoding="utf-8") as fh:
+                fh.write(body)
+        self.cols = bot.load_columns(self.td)
+        self.bad = []
+        self.shifts = load_shifts(self.td, self.bad)
+        self.grid = HourGrid.build(self.cols, self.shifts)
+
+    def test_parse_keeps_hours(self):
+        self.assertEqual(list(self.cols.hours), [9, 9, 9, 12, 9, 13, -1, 12])
+        self.assertEqual([(b.column, b.value) for b in self.cols.quarantine], [("order_time", "soon")])
+        self.assertEqual(parse_time("2026-03-02 17:45:00"), 17 * 60 + 45)
+        self.assertEqual(parse_time("12:05 AM"), 5)
+        self.assertIsNone(parse_time("2026-03-02"))
+
+    def test_shifts(self):
+        self.assertEqual([(s.staff_id, s.hours, s.labor_cents) for s in self.shifts],
+                         [("ann", 4.0, 6000), ("bob", 1.0, 2000), ("cat", 2.0, 2000)])
+        self.assertEqual([(b.line, b.column) for b in self.bad], [(5, "clock_in")])
+
+    def test_cells_sweep_overlapping_shifts(self):
+        nine = self.grid.cell("s1", date(2026, 3, 2), 9)
+        self.assertEqual(nine, HourCell(9, 25.0, 2, 1.5, 25.0))
+        self.assertEqual(self.grid.cell("s1", date(2026, 3, 2), 10), HourCell(10, 0.0, 0, 1.5, 25.0))
+        # The overnight shift is split across midnight.
+        self.assertEqual(self.grid.cell("s1", date(2026, 3, 2), 23).staff_hours, 1.0)
+        self.assertEqual(self.grid.cell("s1", date(2026, 3, 3), 0).labor, 10.0)
+        self.assertEqual(self.grid.cell("s9", date(2026, 3, 3), 0), HourCell(0, 0.0, 0, 0.0, 0.0))
+
+    def test_windows_and_rollups(self):
+        every = self.grid.by_hour()
+        self.assertEqual((every[9].sales, every[9].orders, every[12].sales), (35.0, 3, 26.0))
+        day = self.grid.by_hour("s1", date(2026, 3, 3), date(2026, 3, 3))
+        self.assertEqual((day[9].sales, day[0].staff_hours, day[12].sales), (10.0, 1.0, 0.0))
+        self.assertEqual(sum(c.sales for c in self.grid.by_hour(date_from=date(2026, 4, 1))), 0.0)
+        # Every line but the one with a malformed time.
+        self.assertEqual(sum(c.sales for c in every), 69.0)
+        parts = dict(dayparts(every))
+        self.assertEqual(parts["breakfast"].sales, 35.0)
+        self.assertEqual(parts["late"].staff_hours, 2.0)
+        self.assertEqual([c.hour for c in labor_heavy_hours(every)], [10, 11, 9])
+
+    def test_chat_dashboard_and_top_action(self):
+        snapshot = bot.build_snapshot(self.cols, shifts=self.shifts)
+        answer = bot.respond("labor by hour", snapshot.metrics, snapshot.rows, "Nomi", snapshot=snapshot)
+        self.assertIn("09:00     35.00       3      1.5", answer)
+        self.assertIn("Labor-heavy hours: 10:00, 11:00, 09:00", answer)
+        self.assertIn("store s2", bot.respond("store s2 sales per hour", snapshot.metrics, snapshot.rows, "Nomi",
+                                              snapshot=snapshot))
+        payload = web_app.dashboard_payload(None, None, snapshot=snapshot)
+        self.assertEqual(payload["hourly"][0], {"hour": 0, "sales": 0.0, "orders": 0, "staff_hours": 1.0,
+                                                "labor": 10.0})
+        m = dict(snapshot.metrics, labor_ratio=40.0)
+        self.assertEqual(bot.top_action(m, snapshot.hourly.by_hour()),
+                         "Labor ratio is high. Review shift overlap at 10:00 ($25 labor vs $0 sales), "
+                         "11:00 ($15 labor vs $0 sales), 09:00 ($25 labor vs $35 sales).")
+        self.assertIn("overtime", bot.top_action(m))
+
+    def test_order_ids_shared_across_stores(self):
+        cols = ColumnarRows.from_records([
+            {"date": date(2026, 1, 5), "store_id": store, "revenue": 10.0, "quantity": 1.0, "labor_cost": 0.0,
+             "waste_cost": 0.0, "item_name": "Tea", "order_key": "1", "hour": 9}
+            for store in ("S1", "S2")
+        ])
+        grid = HourGrid.build(cols)
+        by_store = bot.store_metrics_map(cols)
+        for store in ("S1", "S2"):
+            self.assertEqual(grid.cell(store, date(2026, 1, 5), 9).orders, by_store[store]["orders"])
+            self.assertEqual(grid.cell(store, date(2026, 1, 5), 9).orders, 1)
+
+    def test_empty_grid(self):
+        grid = HourGrid.build(ColumnarRows())
+        self.assertEqual(grid.cell(None, date(2026, 1, 5), 9), HourCell(9, 0.0, 0, 0.0, 0.0))
+        self.assertEqual(grid.by_hour(None)[9], HourCell(9, 0.0, 0, 0.0, 0.0))
+
+    def test_without_times(self):
+        snapshot = bot.build_snapshot(bot.load_columns("data"))
+        self.assertIsNone(snapshot.hourly)
+        self.assertIn("No timed sales", bot.respond("sales by hour", snapshot.metrics, snapshot.rows, "Nomi",
+                                                    snapshot=snapshot))
+
+    def test_catalog_picks_up_shift_changes(self):
+        catalog = IngestCatalog(self.td)
+        with self.assertLogs("pos_refresh", "WARNING"):
+            catalog.refresh()
+        self.assertEqual(catalog.snapshot().hourly.cell("s1", date(2026, 3, 2), 9).staff_hours, 1.5)
+        self.assertFalse(catalog.refresh())
+        with open(os.path.join(self.td, "shifts", "extra.csv"), "w", encoding="utf-8") as fh:
+            fh.write("store_id,staff_id,start_ts,end_ts,labor_cost\ns1,eve,2026-03-02T09:00,2026-03-02T10:00,18\n")
+        self.assertTrue(catalog.refresh())
+        self.assertEqual(catalog.snapshot().hourly.cell("s1", date(2026, 3, 2), 9).staff_hours, 2.5)
+
+
+if __name__ == "__main__":
+    unittest.main()
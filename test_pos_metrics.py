@@ -0,0 +1,96 @@
+import json
+import os
+import pstats
+import shutil
+import tempfile
+import unittest
+
+import web_app
+from pos_metrics import SPAN_SECONDS, MetricsRegistry, SamplingProfiler, span, timed
+
+
+class MetricsRegistryTests(unittest.TestCase):
+    def test_prometheus_text(self):
+        reg = MetricsRegistry()
+        requests = reg.counter("req_total", "Requests.", ("route",))
+        requests.inc('/a"b')
+        requests.inc('/a"b', amount=2)
+        latency = reg.histogram("lat_seconds", "Latency.", ("route",), buckets=(0.1, 1))
+        for v in (0.05, 0.5, 5):
+            latency.observe(v, "/x")
+        reg.collector(lambda: [("up", "gauge", "Up.", [({}, 1)])])
+        text = reg.render()
+        self.assertIn('# TYPE req_total counter\nreq_total{route="/a\\"b"} 3\n', text)
+        self.assertIn('lat_seconds_bucket{route="/x",le="0.1"} 1\n', text)
+        self.assertIn('lat_seconds_bucket{route="/x",le="1.0"} 2\n', text)
+        self.assertIn('lat_seconds_bucket{route="/x",le="+Inf"} 3\n', text)
+        self.assertIn('lat_seconds_sum{route="/x"} 5.55\n', text)
+        self.assertIn('lat_seconds_count{route="/x"} 3\n', text)
+        self.assertTrue(text.endswith("up 1\n"))
+        self.assertIs(reg.counter("req_total", "Requests.", ("route",)), requests)
+        with self.assertRaises(ValueError):
+            reg.histogram("req_total", "Requests.")
+
+    def test_spans(self):
+        before = SPAN_SECONDS.count("test-span")
+
+        @timed("test-span")
+        def work():
+            return 42
+
+        self.assertEqual(work(), 42)
+        with self.assertRaises(KeyError):
+            with span("test-span"):
+                raise KeyError
+        self.assertEqual(SPAN_SECONDS.count("test-span"), before + 2)
+
+
+class MetricsEndpointTests(unittest.TestCase):
+    def test_metrics_route(self):
+        state = web_app.load_state("data", "./data/sample_account.json")
+        web_app.dispatch(state, "POST", "/api/chat", body=json.dumps({"q": "labor"}).encode())
+        web_app.dispatch(state, "GET", "/nope")
+        response = web_app.dispatch(state, "GET", "/metrics")
+        self.assertEqual(response.status, 200)
+        self.assertIn(("Content-Type", "text/plain; version=0.0.4; charset=utf-8"), response.headers)
+        text = response.body.decode()
+        for needle in (
+            'pos_http_requests_total{method="POST",route="/api/chat",status="200"}',
+            'pos_http_requests_total{method="GET",route="other",status="404"}',
+            'pos_http_request_seconds_count{route="/api/chat"}',
+            'pos_span_seconds_count{span="intent"}',
+            'pos_span_seconds_count{span="answer"}',
+            'pos_span_seconds_count{span="ingest"}',
+            'pos_span_seconds_count{span="snapshot"}',
+            'pos_chat_intent_total{intent="labor"}',
+            "pos_answer_cache_misses_total",
+        ):
+            self.assertIn(needle, text)
+        self.assertRegex(text, r'pos_chat_seconds_count\{intent="labor",cache="(hit|miss)"\} \d+')
+
+
+class SamplingProfilerTests(unittest.TestCase):
+    def test_profiles_every_nth_request(self):
+        out = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, out)
+        profiler = SamplingProfiler(every=2, out_dir=out, memory=True)
+        for _ in range(4):
+            with profiler.sample("/api/chat"):
+                sum(range(1000))
+        self.assertEqual(profiler.samples, 2)
+        files = sorted(os.listdir(out))
+        profs = [f for f in files if f.endswith(".prof")]
+        self.assertEqual(len(profs), 2)
+        self.assertEqual(len([f for f in files if f.endswith(".mem.txt")]), 2)
+        self.assertTrue(all("-api_chat-" in f for f in files))
+        pstats.Stats(os.path.join(out, profs[0]))
+
+    def test_disabled_by_default(self):
+        profiler = SamplingProfiler()
+        with profiler.sample("/"):
+            pass
+        self.assertEqual(profiler.samples, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
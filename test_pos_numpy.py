@@ -0,0 +1,65 @@
+import random
+import unittest
+from datetime import date
+
+import mvp_pos_insight_bot as bot
+import pos_columnar
+import pos_numpy
+from pos_columnar import ColumnarRows
+
+
+def _synthetic_rows(n: int, seed: int = 7):
+    rnd = random.Random(seed)
+    rows = []
+    for i in range(n):
+        rows.append({
+            "date": None if i % 97 == 0 else date(2026, 1, 1 + rnd.randrange(28)),
+            "store_id": f"store-{rnd.randrange(6)}",
+            "revenue": round(rnd.uniform(-2, 30), 2),
+            "quantity": 1.0,
+            "labor_cost": round(rnd.uniform(0, 8), 2),
+            "waste_cost": round(rnd.uniform(0, 1), 2),
+            "item_name": rnd.choice(["Tea", "Boba", "Coffee", "Toast", "Bowl"]),
+            "order_key": str(rnd.randrange(n // 3)),
+        })
+    return rows
+
+
+@unittest.skipUnless(pos_numpy.AVAILABLE, "numpy not installed")
+class NumpyEngineTests(unittest.TestCase):
+    def setUp(self):
+        self.cols = ColumnarRows.from_records(_synthetic_rows(3000))
+
+    def test_totals_identical_to_stdlib(self):
+        self.assertEqual(pos_numpy.totals(self.cols), pos_columnar.totals(self.cols))
+
+    def test_grouped_totals_identical_to_stdlib(self):
+        for keys, kwargs in ((self.cols.store_codes, {}), (self.cols.dates, {"track_items": False, "skip": 0})):
+            expected = pos_columnar.totals_by(self.cols, keys, **kwargs)
+            actual = pos_numpy.totals_by(self.cols, keys, **kwargs)
+            self.assertEqual(actual, expected)
+            self.assertEqual(list(actual), list(expected))
+
+    def test_top_item_tie_prefers_first_seen_in_group(self):
+        rows = _synthetic_rows(3)
+        for r, (store, item) in zip(rows, [("s0", "Tea"), ("s1", "Boba"), ("s1", "Tea")]):
+            r.update(store_id=store, item_name=item, revenue=5.0)
+        cols = ColumnarRows.from_records(rows)
+        grouped = pos_numpy.totals_by(cols, cols.store_codes)
+        self.assertEqual(grouped[cols.stores.codes["s1"]].top_item, "Boba")
+        self.assertEqual(grouped, pos_columnar.totals_by(cols, cols.store_codes))
+
+    def test_bot_functions_use_engine(self):
+        rows = list(self.cols)
+        self.assertEqual(bot.metrics(self.cols), bot.metrics(rows))
+        self.assertEqual(bot.store_metrics_map(self.cols), bot.store_metrics_map(rows))
+        self.assertEqual(bot.daily_table(self.cols), bot.daily_table(rows))
+
+    def test_empty_columns(self):
+        empty = ColumnarRows()
+        self.assertEqual(pos_numpy.totals(empty), pos_columnar.totals(empty))
+        self.assertEqual(pos_numpy.totals_by(empty, empty.store_codes), {})
+
+
+if __name__ == "__main__":
+    unittest.main()
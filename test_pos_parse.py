@@ -0,0 +1,103 @@
+import io
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import date
+
+import mvp_pos_insight_bot as bot
+import web_app
+from pos_cache import ColumnCache
+from pos_parse import BadValue, FieldParser, by_source, cents, to_cents, to_number, write_report
+from pos_refresh import IngestCatalog
+
+BAD_CSV = (
+    "date,store_id,order_id,item,revenue,labor_cost,waste_cost\n"
+    '2026-01-01,s1,1,"Tea\nwith note",0.10,"$1,200.50",\n'
+    "2026-01-01,s1,2,Tea,abc,(2.00),0.10\n"
+    "not-a-date,s1,3,Tea,0.10,1,nan\n"
+)
+
+
+class FieldParsingTests(unittest.TestCase):
+    def test_to_number(self):
+        for raw, expected in (("12.50", 12.5), (" 7 ", 7.0), ("$1,234.50", 1234.5), ("(12.00)", -12.0),
+                              ("-$5", -5.0), ("", 0.0), ("  ", 0.0), (None, 0.0)):
+            self.assertEqual(to_number(raw), expected, raw)
+        for raw in ("abc", "nan", "inf", "1.2.3", "12,50 EUR"):
+            with self.assertRaises(ValueError, msg=raw):
+                to_number(raw)
+
+    def test_cents_are_exact(self):
+        self.assertEqual(to_cents("0.29"), 29)
+        self.assertEqual(to_cents("-$1,000.01"), -100001)
+        self.assertEqual(sum(to_cents("0.10") for _ in range(10)), 100)
+        self.assertEqual((cents(0.29), cents(-12.345), cents(7)), (29, -1234, 700))
+
+    def test_dates_are_memoized_per_day(self):
+        parser = FieldParser("x.csv")
+        first = parser.date("2026-01-01")
+        self.assertIs(parser.date("2026-01-01"), first)
+        self.assertEqual(parser.date("2026-01-01T09:30:00"), date(2026, 1, 1))
+        self.assertIsNone(parser.date(""))
+        self.assertNotIn("2026-01-01T09:30:00", parser._dates)
+        with self.assertRaises(ValueError):
+            parser.date("01/02/2026")
+
+
+class QuarantineTests(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+        self.path = os.path.join(self.dir, "bad.csv")
+        with open(self.path, "w", encoding="utf-8") as fh:
+            fh.write(BAD_CSV)
+
+    def test_records_keep_defaults_and_report_lines(self):
+        bad = []
+        records = list(bot.iter_file_records(self.path, bad))
+        self.assertEqual([r["revenue"] for r in records], [0.1, 0.0, 0.1])
+        self.assertEqual(records[0]["labor_cost"], 1200.5)
+        self.assertEqual(records[1]["labor_cost"], -2.0)
+        self.assertIsNone(records[2]["date"])
+        # The quoted newline in row 1 shifts every later row down one line.
+        self.assertEqual(bad, [
+            BadValue("bad.csv", 4, "revenue", "abc"),
+            BadValue("bad.csv", 5, "date", "not-a-date"),
+            BadValue("bad.csv", 5, "waste_cost", "nan"),
+        ])
+
+    def test_dict_path_reports_too(self):
+        bad = []
+        list(bot.iter_normalized(bot.load_rows(self.dir), bad))
+        self.assertEqual([(b.source, b.column, b.value) for b in bad],
+                         [("bad.csv", "revenue", "abc"), ("bad.csv", "date", "not-a-date"),
+                          ("bad.csv", "waste_cost", "nan")])
+
+    def test_chunks_carry_quarantine_through_cache(self):
+        cols = bot.parse_file_columns(self.path)
+        self.assertEqual(len(cols.quarantine), 3)
+        self.assertEqual(list(cols.revenue), [10, 0, 10])
+        self.assertEqual(bot.metrics(cols)["revenue"], 0.2)
+
+        cache = ColumnCache(os.path.join(self.dir, "cache"))
+        with self.assertLogs("pos_refresh", "WARNING"):
+            IngestCatalog(self.dir, cache).refresh()
+        warm = IngestCatalog(self.dir, cache)
+        warm.refresh()
+        self.assertEqual(warm.parsed_files, 0)
+        self.assertEqual(warm.quarantine(), cols.quarantine)
+        payload = web_app.dashboard_payload(None, None, snapshot=warm.snapshot())
+        self.assertEqual(payload["quarantined_values"], 3)
+
+    def test_report(self):
+        entries = [BadValue("a.csv", 2, "sales", "x"), BadValue("b.csv", 9, "date", "y"),
+                   BadValue("a.csv", 5, "labor", "")]
+        self.assertEqual(list(by_source(entries)), ["a.csv", "b.csv"])
+        out = io.StringIO()
+        self.assertEqual(write_report(entries, out), 3)
+        self.assertEqual(out.getvalue().splitlines()[:2], ["source,line,column,value", "a.csv,2,sales,x"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,133 @@
+import json
+import unittest
+from datetime import date, timedelta
+
+import mvp_pos_insight_bot as bot
+import web_app
+from pos_columnar import ColumnarRows
+from pos_partition import PartitionIndex
+
+
+def _synthetic_rows():
+    rows = []
+    start = date(2026, 1, 1)
+    for i in range(600):
+        rows.append({
+            "date": start + timedelta(days=i % 30) if i % 50 else None,
+            "store_id": f"s{i % 4}",
+            "revenue": float(i % 17) + 0.25,
+            "quantity": 1.0,
+            "labor_cost": float(i % 5),
+            "waste_cost": 0.5,
+            "item_name": f"item-{i % 7}",
+            "order_key": str(i // 3),
+        })
+    return rows
+
+
+class PartitionIndexTests(unittest.TestCase):
+    def setUp(self):
+        self.rows = _synthetic_rows()
+        self.index = PartitionIndex(ColumnarRows.from_records(self.rows))
+
+    def assertMetricsClose(self, actual, expected):
+        self.assertEqual(set(actual), set(expected))
+        for key, value in expected.items():
+            if isinstance(value, float):
+                self.assertAlmostEqual(actual[key], value, places=6, msg=key)
+            else:
+                self.assertEqual(actual[key], value, key)
+
+    def test_windows_match_filtered_rows(self):
+        for flt in (
+            bot.QueryFilter(),
+            bot.QueryFilter("s1"),
+            bot.QueryFilter(None, date(2026, 1, 5), date(2026, 1, 11)),
+            bot.QueryFilter("s2", date(2026, 1, 28), None),
+            bot.QueryFilter(None, None, date(2026, 1, 3)),
+            bot.QueryFilter("s3", date(2026, 1, 7), date(2026, 1, 7)),
+        ):
+            expected = bot.metrics([r for r in self.rows if flt.matches(r)])
+            self.assertMetricsClose(bot.metrics_from_totals(self.index.totals(*flt)), expected)
+
+    def test_store_and_daily_windows(self):
+        lo, hi = date(2026, 1, 10), date(2026, 1, 16)
+        window = [r for r in self.rows if r["date"] is not None and lo <= r["date"] <= hi]
+        expected = bot.store_metrics_map(window)
+        actual = {sid: bot.metrics_from_totals(t) for sid, t in self.index.store_totals(lo, hi).items()}
+        self.assertEqual(list(actual), list(expected))
+        for sid, sm in expected.items():
+            self.assertMetricsClose(actual[sid], sm)
+        self.assertEqual(list(self.index.daily_totals("s0", lo, hi)), sorted({
+            r["date"] for r in window if r["store_id"] == "s0"
+        }))
+
+    def test_undated_rows_only_in_unbounded_queries(self):
+        undated = sum(r["revenue"] for r in self.rows if r["date"] is None)
+        everything = self.index.totals().revenue
+        dated = self.index.totals(date_from=date(2000, 1, 1)).revenue
+        self.assertAlmostEqual(everything - dated, undated)
+        self.assertEqual(self.index.date_bounds(), (date(2026, 1, 1), date(2026, 1, 30)))
+
+    def test_unknown_store_is_empty(self):
+        self.assertEqual(self.index.totals("nope").orders, 0)
+        self.assertEqual(self.index.daily_totals("nope"), {})
+
+
+class WindowedQueryTests(unittest.TestCase):
+    def setUp(self):
+        self.rows = _synthetic_rows()
+        self.snapshot = bot.build_snapshot(ColumnarRows.from_records(self.rows))
+
+    def test_parse_query_filter(self):
+        latest = date(2026, 1, 30)
+        stores = ["s1", "s11"]
+        self.assertEqual(bot.parse_query_filter("status yesterday", stores, latest),
+                         bot.QueryFilter(None, date(2026, 1, 29), date(2026, 1, 29)))
+        self.assertEqual(bot.parse_query_filter("last 7 days at s11", stores, latest),
+                         bot.QueryFilter("s11", date(2026, 1, 24), latest))
+        self.assertEqual(bot.parse_query_filter("store s1 from 2026-01-02 to 2026-01-05", stores, latest),
+                         bot.QueryFilter("s1", date(2026, 1, 2), date(2026, 1, 5)))
+        self.assertEqual(bot.parse_query_filter("labor since 2026-01-20", stores, latest),
+                         bot.QueryFilter(None, date(2026, 1, 20), None))
+        self.assertFalse(bot.parse_query_filter("what is my status today?", stores, latest).active())
+
+    def test_respond_scopes_answers(self):
+        snap = self.snapshot
+        answer = bot.respond("status last 7 days at s2", snap.metrics, snap.rows, "Miso", snapshot=snap)
+        self.assertIn("store s2, 2026-01-24 to 2026-01-30", answer)
+        expected = bot.metrics([r for r in self.rows
+                                if r["store_id"] == "s2" and r["date"] and r["date"] >= date(2026, 1, 24)])
+        self.assertIn(f"${expected['revenue']:,.2f}", answer)
+        self.assertIn("Scope: all stores, 2026-01-29.", bot.respond("labor yesterday", snap.metrics, snap.rows,
+                                                                     "Miso", snapshot=snap))
+
+    def test_respond_without_snapshot_filters_rows(self):
+        m = bot.metrics(self.rows)
+        with_snap = bot.respond("waste last 3 days", m, self.rows, "Miso", snapshot=self.snapshot)
+        self.assertEqual(bot.respond("waste last 3 days", m, self.rows, "Miso"), with_snap)
+
+    def test_dashboard_filter_params(self):
+        snap = self.snapshot
+        flt = web_app.query_filter("store=s1&from=2026-01-05&to=2026-01-11")
+        payload = web_app.dashboard_payload(snap.rows, snap.metrics, snapshot=snap, flt=flt)
+        self.assertEqual([s["store_id"] for s in payload["stores"]], ["s1"])
+        self.assertEqual(payload["filter"], {"store": "s1", "from": "2026-01-05", "to": "2026-01-11"})
+        self.assertEqual(payload["summary"]["revenue"], payload["stores"][0]["revenue"])
+        with self.assertRaises(ValueError):
+            web_app.query_filter("from=yesterday")
+
+    def test_wsgi_dashboard_rejects_bad_dates(self):
+        from your_application import wsgi
+
+        statuses = []
+        body = b"".join(wsgi.application(
+            {"REQUEST_METHOD": "GET", "PATH_INFO": "/api/dashboard", "QUERY_STRING": "from=2026-13-01"},
+            lambda status, headers: statuses.append(status),
+        ))
+        self.assertEqual(statuses, ["400 Bad Request"])
+        self.assertIn("error", json.loads(body))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+import mvp_pos_insight_bot as bot
+from pos_columnar import NUMERIC_COLUMNS
+from pos_refresh import DataRefresher, IngestCatalog
+
+
+class IngestCatalogTests(unittest.TestCase):
+    def setUp(self):
+        self.td = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.td)
+        shutil.copy("data/pos_samples/square_export_sample.csv", self.td)
+        self.catalog = IngestCatalog(self.td)
+        self.assertTrue(self.catalog.refresh())
+
+    def _add(self, name):
+        shutil.copy(os.path.join("data/pos_samples", name), self.td)
+
+    def test_unchanged_dir_is_not_reparsed(self):
+        self.assertFalse(self.catalog.refresh())
+        self.assertEqual(self.catalog.parsed_files, 1)
+
+    def test_touch_without_content_change_is_not_reparsed(self):
+        path = os.path.join(self.td, "square_export_sample.csv")
+        st = os.stat(path)
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+        self.assertFalse(self.catalog.refresh())
+        self.assertEqual(self.catalog.parsed_files, 1)
+
+    def test_new_and_removed_files(self):
+        self._add("toast_export_sample.csv")
+        self.assertTrue(self.catalog.refresh())
+        self.assertEqual(self.catalog.parsed_files, 2)
+        os.remove(os.path.join(self.td, "square_export_sample.csv"))
+        self.assertTrue(self.catalog.refresh())
+        self.assertEqual(self.catalog.parsed_files, 2)
+        self.assertEqual(list(self.catalog.rows()), bot.normalize(bot.load_rows(self.td)))
+
+    def test_merged_snapshot_matches_cold_load(self):
+        self._add("clover_export_sample.csv")
+        self._add("toast_export_sample.csv")
+        self.catalog.refresh()
+        cold = bot.normalize(bot.load_rows(self.td))
+        snap = self.catalog.snapshot()
+        self.assertEqual(dict(snap.metrics), bot.metrics(cold))
+        self.assertEqual(snap.daily_table, bot.daily_table(cold))
+        self.assertEqual({k: dict(v) for k, v in snap.store_metrics.items()}, bot.store_metrics_map(cold))
+
+    def test_refresher_publishes_only_on_change(self):
+        published = []
+        done = threading.Event()
+
+        def publish(snap):
+            published.append(snap)
+            done.set()
+
+        refresher = DataRefresher(self.catalog, publish, interval=0.01)
+        self.assertFalse(refresher.refresh_once())
+        self._add("toast_export_sample.csv")
+        refresher.start()
+        self.addCleanup(refresher.stop)
+        self.assertTrue(done.wait(2))
+        self.assertIn("la-downtown", published[0].stores)
+
+
+class ParallelIngestTests(unittest.TestCase):
+    def _columns_bytes(self, cols):
+        return [bytes(memoryview(getattr(cols, name)).cast("B")) for name, _ in NUMERIC_COLUMNS]
+
+    def test_workers_match_serial_byte_for_byte(self):
+        serial = bot.load_columns("data/pos_samples")
+        parallel = bot.load_columns("data/pos_samples", workers=3)
+        self.assertEqual(self._columns_bytes(parallel), self._columns_bytes(serial))
+        for table in ("stores", "items", "orders"):
+            self.assertEqual(getattr(parallel, table).values, getattr(serial, table).values)
+        self.assertEqual(bot.build_snapshot(parallel).daily_table, bot.build_snapshot(serial).daily_table)
+
+    def test_catalog_with_workers(self):
+        catalog = IngestCatalog("data/pos_samples", workers=2)
+        catalog.refresh()
+        self.assertEqual(catalog.parsed_files, 3)
+        self.assertEqual(list(catalog.rows()), list(bot.load_columns("data/pos_samples")))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,105 @@
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import date
+
+import mvp_pos_insight_bot as bot
+import web_app
+from pos_sqlite import SqliteStore, open_store
+
+
+class SqliteStoreTests(unittest.TestCase):
+    def setUp(self):
+        self.td = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.td)
+        for name in ("clover_export_sample.csv", "square_export_sample.csv", "toast_export_sample.csv"):
+            shutil.copy(os.path.join("data/pos_samples", name), self.td)
+        shutil.copy("data/sample_pos.csv", self.td)
+        self.db = os.path.join(self.td, "db", "kpi.sqlite")
+        self.store = open_store(self.db, self.td)
+        self.addCleanup(self.store.close)
+        self.rows = bot.normalize(bot.load_rows(self.td))
+
+    def assertMetricsClose(self, actual, expected):
+        self.assertEqual(set(actual), set(expected))
+        for key, value in expected.items():
+            if isinstance(value, float):
+                self.assertAlmostEqual(actual[key], value, places=6, msg=key)
+            else:
+                self.assertEqual(actual[key], value, key)
+
+    def test_metrics_match_in_memory(self):
+        self.assertMetricsClose(self.store.metrics(), bot.metrics(self.rows))
+
+    def test_store_metrics_match_in_memory(self):
+        expected = bot.store_metrics_map(self.rows)
+        actual = self.store.store_metrics_map()
+        self.assertEqual(list(actual), list(expected))
+        for store_id, sm in expected.items():
+            self.assertMetricsClose(actual[store_id], sm)
+
+    def test_daily_table_matches_in_memory(self):
+        self.assertEqual(self.store.daily_table(), bot.daily_table(self.rows))
+
+    def test_store_and_date_range_filters(self):
+        m = self.store.metrics(store_id="tea-001", date_from=date(2026, 2, 11), date_to=date(2026, 2, 11))
+        self.assertAlmostEqual(m["revenue"], 9.0)
+        self.assertEqual(m["orders"], 1)
+        self.assertEqual(m["top_item"], "Milk Tea")
+
+    def test_rollup_is_incremental_and_restart_safe(self):
+        with open(os.path.join(self.td, "late.csv"), "w", encoding="utf-8") as fh:
+            fh.write("date,store_id,order_id,item,revenue,labor_cost,waste_cost\n")
+            fh.write("2026-02-11,tea-001,1999,Boba,2.0,0.5,0\n")
+        reopened = SqliteStore(self.db, data_dir=self.td)
+        self.addCleanup(reopened.close)
+        self.assertTrue(reopened.refresh())
+        self.assertFalse(reopened.refresh())
+        rows = bot.normalize(bot.load_rows(self.td))
+        self.assertMetricsClose(reopened.metrics(), bot.metrics(rows))
+
+    def test_changed_file_rebuilds(self):
+        with open(os.path.join(self.td, "sample_pos.csv"), "a", encoding="utf-8") as fh:
+            fh.write("2026-02-12,food-001,1005,Coffee,6.0,1.8,0.1\n")
+        self.assertTrue(self.store.refresh())
+        self.assertMetricsClose(self.store.metrics(), bot.metrics(bot.normalize(bot.load_rows(self.td))))
+
+    def test_store_date_lookups_use_indexes(self):
+        where, params = self.store._where("f", "la-burbank", date(2026, 2, 1), date(2026, 2, 28))
+        plan = " ".join(str(r) for r in self.store.conn.execute(
+            f"EXPLAIN QUERY PLAN SELECT TOTAL(net_sales) FROM daily_financials f WHERE {where}", params))
+        self.assertIn("INDEX", plan)
+        owhere, oparams = self.store._where("o", "la-burbank", date(2026, 2, 1), date(2026, 2, 28))
+        plan = " ".join(str(r) for r in self.store.conn.execute(
+            f"EXPLAIN QUERY PLAN SELECT COUNT(*) FROM orders o WHERE {owhere}", oparams))
+        self.assertIn("idx_orders_tenant_store_date", plan)
+
+    def test_tenants_sharing_a_store_id(self):
+        for tenant, revenue in (("acme", "10.0"), ("bobs", "7.5")):
+            data_dir = os.path.join(self.td, tenant)
+            os.mkdir(data_dir)
+            with open(os.path.join(data_dir, "sales.csv"), "w", encoding="utf-8") as fh:
+                fh.write("date,store_id,order_id,item,revenue,labor_cost,waste_cost\n")
+                fh.write(f"2026-03-02,S1,1,Tea,{revenue},2.0,0\n")
+        acme = open_store(self.db, os.path.join(self.td, "acme"), tenant_id="acme")
+        bobs = open_store(self.db, os.path.join(self.td, "bobs"), tenant_id="bobs")
+        self.addCleanup(acme.close)
+        self.addCleanup(bobs.close)
+        self.assertEqual(bobs.conn.execute("SELECT id, name FROM stores WHERE tenant_id = 'bobs'").fetchall(),
+                         [("bobs:S1", "S1")])
+        for store, revenue in ((acme, 10.0), (bobs, 7.5)):
+            by_store = store.store_metrics_map()
+            self.assertEqual(list(by_store), ["S1"])
+            self.assertEqual((by_store["S1"]["revenue"], by_store["S1"]["orders"]), (revenue, 1))
+            self.assertEqual(store.metrics(store_id="S1")["revenue"], revenue)
+
+    def test_web_state_from_sqlite(self):
+        state = web_app.load_state(self.td, None, sqlite_path=self.db)
+        payload = web_app.dashboard_payload(None, None, snapshot=state.snapshot)
+        self.assertEqual(len(payload["stores"]), len(bot.store_metrics_map(self.rows)))
+        state.catalog.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
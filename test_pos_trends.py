@@ -0,0 +1,97 @@
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import date, timedelta
+
+import mvp_pos_insight_bot as bot
+from pos_columnar import ColumnarRows
+from pos_sqlite import open_store
+from pos_trends import PrefixSums
+
+
+def _rows(days=40):
+    start = date(2026, 1, 1)
+    rows = []
+    for d in range(days):
+        for store in ("a", "b"):
+            for n in range(3):
+                rows.append({
+                    "date": start + timedelta(days=d),
+                    "store_id": store,
+                    "revenue": 10.0 + d + n,
+                    "quantity": 1.0,
+                    "labor_cost": 3.0,
+                    "waste_cost": 0.5,
+                    "item_name": "tea",
+                    "order_key": f"{store}{d}-{n // 2}",
+                })
+    return rows
+
+
+class PrefixSumsTests(unittest.TestCase):
+    def setUp(self):
+        self.rows = _rows()
+        self.snapshot = bot.build_snapshot(ColumnarRows.from_records(self.rows))
+        self.trends = self.snapshot.trends
+
+    def _scan(self, lo, hi, store=None):
+        window = [r for r in self.rows if lo <= r["date"] <= hi and store in (None, r["store_id"])]
+        return bot.metrics(window)
+
+    def test_windows_match_row_scans(self):
+        for lo, hi, store in (
+            (date(2026, 1, 1), date(2026, 2, 9), None),
+            (date(2026, 1, 10), date(2026, 1, 16), "a"),
+            (date(2026, 2, 3), date(2026, 2, 9), "b"),
+            (date(2025, 12, 1), date(2026, 1, 2), None),
+        ):
+            w = self.trends.window(lo, hi, store)
+            expected = self._scan(lo, hi, store)
+            self.assertAlmostEqual(w.revenue, expected["revenue"])
+            self.assertAlmostEqual(w.labor, expected["labor"])
+            self.assertEqual(w.orders, expected["orders"])
+
+    def test_trailing_compares_adjacent_windows(self):
+        current, previous = self.trends.trailing(7, "a")
+        self.assertEqual((current.date_from, current.date_to), (date(2026, 2, 3), date(2026, 2, 9)))
+        self.assertEqual((previous.date_from, previous.date_to), (date(2026, 1, 27), date(2026, 2, 2)))
+        # Row revenue grows 1.0 per day, so the later week is 7 days * 3 rows * 7 higher.
+        self.assertAlmostEqual(current.revenue - previous.revenue, 7 * 3 * 7)
+
+    def test_empty_and_out_of_range(self):
+        empty = PrefixSums({None: {}})
+        self.assertIsNone(empty.last)
+        self.assertEqual(empty.window(date(2026, 1, 1), date(2026, 1, 7)).revenue, 0.0)
+        self.assertEqual(self.trends.window(date(2030, 1, 1), date(2030, 1, 7)).orders, 0)
+        self.assertEqual(self.trends.window(date(2026, 1, 1), date(2026, 1, 7), "nope").orders, 0)
+
+    def test_trend_intents_and_sms(self):
+        snap = self.snapshot
+        report = bot.respond("revenue trend at a", snap.metrics, snap.rows, "Miso", snapshot=snap)
+        self.assertIn("store a", report)
+        self.assertIn("7d 2026-02-03 to 2026-02-09", report)
+        self.assertIn("28d", report)
+        wow = bot.respond("how did this week compare to last week?", snap.metrics, snap.rows, "Miso", snapshot=snap)
+        self.assertIn("7d", wow)
+        self.assertNotIn("28d", wow)
+        self.assertEqual(bot.respond("trend", bot.metrics(self.rows), self.rows, "Miso"),
+                         bot.respond("trend", snap.metrics, snap.rows, "Miso", snapshot=snap))
+        self.assertIn("WoW", bot.respond("sms", snap.metrics, snap.rows, "Miso", snapshot=snap))
+        self.assertNotIn("WoW", bot.sms_brief(snap.metrics, "Miso"))
+
+    def test_sqlite_series_match(self):
+        td = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, td)
+        shutil.copy("data/sample_pos.csv", td)
+        store = open_store(os.path.join(td, "kpi.sqlite"), td)
+        self.addCleanup(store.close)
+        expected = bot.build_snapshot(bot.load_columns(td)).trends
+        actual = store.snapshot().trends
+        self.assertEqual(set(actual.stores()), set(expected.stores()))
+        for sid in (None,) + expected.stores():
+            self.assertEqual(actual.trailing(7, sid), expected.trailing(7, sid))
+
+
+if __name__ == "__main__":
+    unittest.main()
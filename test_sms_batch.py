@@ -0,0 +1,220 @@
+import io
+import json
+import os
+import shutil
+import socketserver
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import mvp_pos_insight_bot as bot
+from sms_batch import (
+    Brief,
+    HttpSender,
+    PrintSender,
+    RateLimiter,
+    SendError,
+    Sender,
+    SmtpSender,
+    account_briefs,
+    send_all,
+    tenant_briefs,
+)
+from tenant_registry import TenantRegistry
+
+
+class HttpSink(ThreadingHTTPServer):
+    """Records posted briefs; answers with queued status codes first, then 200."""
+
+    daemon_threads = True
+
+    def __init__(self):
+        self.received = []
+        self.statuses = []
+        self.connections = set()
+        self.lock = threading.Lock()
+
+        sink = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                with sink.lock:
+                    sink.connections.add(self.client_address)
+                    status = sink.statuses.pop(0) if sink.statuses else 200
+                    if status == 200:
+                        sink.received.append(payload)
+                self.send_response(status)
+                if status == 429:
+                    self.send_header("Retry-After", "0")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+        super().__init__(("127.0.0.1", 0), Handler)
+
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/sms"
+
+
+class SmtpSink(socketserver.ThreadingTCPServer):
+    """Minimal SMTP server: accepts every message and records (recipients, body)."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        self.messages = []
+        self.sessions = 0
+        sink = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def reply(self, line):
+                self.wfile.write(line.encode() + b"\r\n")
+
+            def handle(self):
+                sink.sessions += 1
+                self.reply("220 sink ready")
+                rcpts = []
+                while True:
+                    line = self.rfile.readline().decode().strip()
+                    verb = line[:4].upper()
+                    if not line or verb == "QUIT":
+                        self.reply("221 bye")
+                        return
+                    if verb in ("EHLO", "HELO"):
+                        self.reply("250 sink")
+                    elif verb == "RCPT":
+                        rcpts.append(line.split(":", 1)[1].strip(" <>"))
+                        self.reply("250 ok")
+                    elif verb == "DATA":
+                        self.reply("354 go ahead")
+                        data = []
+                        while (chunk := self.rfile.readline()) != b".\r\n":
+                            data.append(chunk.decode())
+                        sink.messages.append((rcpts, "".join(data)))
+                        rcpts = []
+                        self.reply("250 queued")
+                    else:
+                        self.reply("250 ok")
+
+        super().__init__(("127.0.0.1", 0), Handler)
+
+
+def _serve(test, server):
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    test.addCleanup(server.server_close)
+    test.addCleanup(server.shutdown)
+    return server
+
+
+def _briefs(n):
+    return [Brief("t", f"s{i}", f"+1555{i:07d}", f"brief {i}") for i in range(n)]
+
+
+class AccountBriefsTests(unittest.TestCase):
+    def test_owner_and_store_recipients(self):
+        snapshot = bot.build_snapshot(bot.load_columns("data"))
+        account = dict(bot.load_account_config(None), sms_to="+1555", store_sms_to={"tea-001": "+1666"})
+        briefs = account_briefs(account, snapshot, "acme")
+        self.assertEqual([(b.store_id, b.to) for b in briefs],
+                         [(None, "+1555"), ("food-001", "+1555"), ("tea-001", "+1666")])
+        self.assertEqual(briefs[0].text, bot.sms_brief(snapshot.metrics, bot.DEFAULT_BOT_NAME, snapshot.trends))
+        self.assertIn("tea-001", briefs[2].text)
+        self.assertEqual(account_briefs(bot.load_account_config(None), snapshot), [])
+
+    def test_tenant_briefs(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        for tenant, sms_to in (("acme", "+1555"), ("quiet", None)):
+            os.mkdir(os.path.join(root, tenant))
+            shutil.copy("data/sample_pos.csv", os.path.join(root, tenant))
+            with open(os.path.join(root, tenant, "account.json"), "w", encoding="utf-8") as fh:
+                json.dump({"bot_name": tenant, "sms_to": sms_to}, fh)
+        os.mkdir(os.path.join(root, "empty"))
+        # A malformed account sorts after acme and before quiet; it must not stop the batch.
+        os.mkdir(os.path.join(root, "broken"))
+        shutil.copy("data/sample_pos.csv", os.path.join(root, "broken"))
+        with open(os.path.join(root, "broken", "account.json"), "w", encoding="utf-8") as fh:
+            fh.write("{not json")
+        failed = []
+        with self.assertLogs("sms_batch", "ERROR"):
+            briefs = tenant_briefs(TenantRegistry(root, use_cache=False), failed)
+        self.assertEqual([(b.tenant, b.store_id) for b in briefs],
+                         [("acme", None), ("acme", "food-001"), ("acme", "tea-001")])
+        self.assertEqual(failed, ["broken"])
+
+
+class SendAllTests(unittest.TestCase):
+    def test_http_sender_reuses_connections(self):
+        sink = _serve(self, HttpSink())
+        sender = HttpSender(sink.url())
+        self.addCleanup(sender.close)
+        report = send_all(_briefs(200), sender, concurrency=4)
+        self.assertEqual(report.sent, 200)
+        self.assertEqual(sorted(p["to"] for p in sink.received), sorted(b.to for b in _briefs(200)))
+        self.assertLessEqual(len(sink.connections), 4)
+
+    def test_retries_retryable_and_stops_on_permanent(self):
+        sink = _serve(self, HttpSink())
+        sink.statuses = [503, 429]
+        sender = HttpSender(sink.url())
+        self.addCleanup(sender.close)
+        report = send_all(_briefs(1), sender, concurrency=1, sleep=lambda s: None)
+        self.assertEqual((report.sent, report.results[0].attempts), (1, 3))
+
+        sink.statuses = [400]
+        report = send_all(_briefs(1), sender, concurrency=1, sleep=lambda s: None)
+        self.assertEqual(report.failed[0].error, "HTTP 400")
+        self.assertEqual(report.failed[0].attempts, 1)
+
+    def test_gives_up_after_retries_with_backoff(self):
+        class Down(Sender):
+            def send(self, brief):
+                raise SendError("down")
+
+        delays = []
+        report = send_all(_briefs(1), Down(), retries=3, backoff=1.0, max_backoff=3.0, sleep=delays.append)
+        self.assertEqual(report.failed[0].attempts, 4)
+        self.assertEqual(len(delays), 3)
+        for delay, cap in zip(delays, (1.0, 2.0, 3.0)):
+            self.assertTrue(0 <= delay <= cap)
+
+    def test_smtp_sender(self):
+        sink = _serve(self, SmtpSink())
+        sender = SmtpSender("127.0.0.1", sink.server_address[1])
+        report = send_all(_briefs(20), sender, concurrency=2)
+        sender.close()
+        self.assertEqual(report.sent, 20)
+        self.assertEqual(len(sink.messages), 20)
+        self.assertLessEqual(sink.sessions, 2)
+        self.assertIn("brief 7", "".join(body for rcpts, body in sink.messages if rcpts == ["+15550000007"]))
+
+    def test_print_sender(self):
+        out = io.StringIO()
+        send_all(_briefs(2), PrintSender(out), concurrency=1)
+        self.assertEqual(out.getvalue(), "+15550000000\tbrief 0\n+15550000001\tbrief 1\n")
+
+
+class RateLimiterTests(unittest.TestCase):
+    def test_token_bucket(self):
+        now = [0.0]
+
+        def sleep(seconds):
+            now[0] += seconds
+
+        limiter = RateLimiter(rate=10, burst=2, clock=lambda: now[0], sleep=sleep)
+        for _ in range(12):
+            limiter.acquire()
+        # Two from the burst, then ten more at 10/s.
+        self.assertAlmostEqual(now[0], 1.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
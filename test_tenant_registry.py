@@ -0,0 +1,145 @@
+import asyncio
+import json
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+import async_server
+import web_app
+from tenant_registry import LOAD_LOCK_STRIPES, TenantRegistry, UnknownTenant, tenant_dispatch
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TenantRegistryTests(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        for tenant, csv, bot_name in (
+            ("acme", "data/sample_pos.csv", "Miso"),
+            ("bobs", "data/pos_samples/square_export_sample.csv", "Bob"),
+            ("cafe", "data/pos_samples/toast_export_sample.csv", "Cafe"),
+        ):
+            os.mkdir(os.path.join(self.root, tenant))
+            shutil.copy(csv, os.path.join(self.root, tenant))
+            with open(os.path.join(self.root, tenant, "account.json"), "w", encoding="utf-8") as fh:
+                json.dump({"bot_name": bot_name}, fh)
+        self.clock = FakeClock()
+        self.registry = TenantRegistry(self.root, refresh_interval=60, use_cache=False, clock=self.clock)
+
+    def _chat(self, path, q, headers=None):
+        response = tenant_dispatch(self.registry, "POST", path, body=json.dumps({"q": q}).encode(), headers=headers)
+        return response.status, json.loads(response.body)
+
+    def test_loads_lazily_and_isolates_tenants(self):
+        self.assertEqual(self.registry.loaded(), ())
+        status, acme = self._chat("/t/acme/api/chat", "sms")
+        self.assertEqual(status, 200)
+        self.assertEqual(self.registry.loaded(), ("acme",))
+        _, bobs = self._chat("/api/chat", "sms", {"x-tenant-id": "bobs"})
+        self.assertTrue(acme["answer"].startswith("Miso"))
+        self.assertTrue(bobs["answer"].startswith("Bob"))
+        acme_stores = self.registry.get("acme").snapshot.stores
+        self.assertFalse(set(acme_stores) & set(self.registry.get("bobs").snapshot.stores))
+        self.assertEqual(self.registry.stats()["loads"], 2)
+
+    def test_unknown_and_escaping_tenants_are_404(self):
+        os.symlink(os.path.abspath("data"), os.path.join(self.root, "escape"))
+        for path, headers in (
+            ("/t/nobody/api/dashboard", None),
+            ("/t/escape/api/dashboard", None),
+            ("/t/../api/dashboard", None),
+            ("/api/dashboard", {"x-tenant-id": "../acme"}),
+            ("/api/dashboard", None),
+        ):
+            self.assertEqual(tenant_dispatch(self.registry, "GET", path, headers=headers).status, 404, path)
+        with self.assertRaises(UnknownTenant):
+            self.registry.get("ACME")
+        self.assertEqual(tenant_dispatch(self.registry, "GET", "/healthz").status, 200)
+
+    def test_prefix_without_slash_redirects(self):
+        response = tenant_dispatch(self.registry, "GET", "/t/acme")
+        self.assertEqual(response.status, 308)
+        self.assertIn(("Location", "/t/acme/"), response.headers)
+        self.assertEqual(tenant_dispatch(self.registry, "GET", "/t/acme/").status, 200)
+
+    def test_evicts_least_recently_used_over_budget(self):
+        self.registry.get("acme")
+        self.registry.get("bobs")
+        budget = self.registry.stats()["bytes"]
+        self.registry.memory_budget = budget
+        self.registry.get("acme")  # bobs is now least recently used
+        self.registry.get("cafe")
+        self.assertNotIn("bobs", self.registry.loaded())
+        self.assertEqual(self.registry.loaded()[-1], "cafe")
+        self.assertLessEqual(self.registry.stats()["bytes"], budget)
+        self.assertGreaterEqual(self.registry.evictions, 1)
+        # Evicted tenants reload on demand.
+        self.assertTrue(self._chat("/t/bobs/api/chat", "sms")[1]["answer"].startswith("Bob"))
+
+    def test_single_tenant_over_budget_stays_loaded(self):
+        self.registry.memory_budget = 1
+        self.registry.get("acme")
+        self.registry.get("bobs")
+        self.assertEqual(self.registry.loaded(), ("bobs",))
+
+    def test_stale_tenants_refresh_on_access(self):
+        before = self.registry.get("acme").snapshot
+        shutil.copy("data/pos_samples/clover_export_sample.csv", os.path.join(self.root, "acme"))
+        self.assertIs(self.registry.get("acme").snapshot, before)
+        self.clock.now = 61
+        self.assertIsNone(self.registry.peek("acme"))
+        after = self.registry.get("acme").snapshot
+        self.assertGreater(len(after.rows), len(before.rows))
+        self.assertIs(self.registry.peek("acme").snapshot, after)
+
+    def test_concurrent_first_requests_load_once(self):
+        states = []
+        threads = [threading.Thread(target=lambda: states.append(self.registry.get("acme"))) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(self.registry.loads, 1)
+        self.assertEqual(len({id(s.snapshot) for s in states}), 1)
+
+    def test_load_locks_do_not_grow_with_tenant_ids(self):
+        self.registry.memory_budget = 1
+        for _ in range(3):
+            for tenant in ("acme", "bobs", "cafe"):
+                self.registry.get(tenant)
+        for n in range(200):
+            tenant_dispatch(self.registry, "GET", f"/t/ghost-{n}/api/dashboard")
+        self.assertEqual(len(self.registry._load_locks), LOAD_LOCK_STRIPES)
+        self.assertEqual(self.registry.loaded(), ("cafe",))
+
+    def test_answer_cache_is_per_tenant(self):
+        web_app.ANSWER_CACHE.clear()
+        _, first = self._chat("/t/acme/api/chat", "status")
+        _, other = self._chat("/t/cafe/api/chat", "status")
+        self.assertNotEqual(first, other)
+
+    def test_async_server_routes_by_tenant(self):
+        app = async_server.AsyncApp(None, max_concurrency=2, registry=self.registry)
+        self.addCleanup(app.close)
+
+        async def get(path, headers=None):
+            return await app._dispatch("GET", path, "", b"", headers or {})
+
+        first = asyncio.run(get("/t/acme/api/dashboard"))  # not loaded yet: loads in the pool
+        self.assertEqual(first.status, 200)
+        again = asyncio.run(get("/api/dashboard", {"x-tenant-id": "acme"}))  # loaded: served inline
+        self.assertEqual(again.body, first.body)
+        self.assertEqual(asyncio.run(get("/t/nobody/api/dashboard")).status, 404)
+
+
+if __name__ == "__main__":
+    unittest.main()
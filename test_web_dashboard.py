@@ -1,4 +1,7 @@
+import gzip
+import json
 import unittest
+from unittest import mock
 
 import mvp_pos_insight_bot as bot
 import web_app
@@ -23,5 +26,94 @@ class DashboardTests(unittest.TestCase):
         self.assertIn("revenue", stores[0])
 
 
+class SnapshotTests(unittest.TestCase):
+    def setUp(self):
+        self.snapshot = web_app.load_state("data", "./data/sample_account.json").snapshot
+
+    def test_snapshot_payload_matches_row_payload(self):
+        rows = bot.normalize(bot.load_rows("data"))
+        expected = web_app.dashboard_payload(rows, bot.metrics(rows))
+        actual = web_app.dashboard_payload(None, None, snapshot=self.snapshot)
+        self.assertEqual(actual, expected)
+
+    def test_snapshot_is_immutable(self):
+        with self.assertRaises(TypeError):
+            self.snapshot.metrics["revenue"] = 0
+        with self.assertRaises(AttributeError):
+            self.snapshot.metrics = {}
+
+    def test_respond_never_regroups_rows_with_snapshot(self):
+        snap = self.snapshot
+        with mock.patch.object(bot, "store_metrics_map", side_effect=AssertionError("regrouped")), \
+                mock.patch.object(bot, "daily_table", side_effect=AssertionError("regrouped")):
+            for q in ("status", "labor", "sms", "stores", "table", "show store tea-001 status"):
+                self.assertTrue(bot.respond(q, snap.metrics, snap.rows, "Miso", snapshot=snap))
+
+    def test_wsgi_dashboard_route(self):
+        from your_application import wsgi
+
+        statuses = []
+        body = b"".join(wsgi.application(
+            {"REQUEST_METHOD": "GET", "PATH_INFO": "/api/dashboard"},
+            lambda status, headers: statuses.append(status),
+        ))
+        self.assertEqual(statuses, ["200 OK"])
+        self.assertIn("stores", json.loads(body))
+
+
+class EncodedResponseTests(unittest.TestCase):
+    def setUp(self):
+        self.state = web_app.load_state("data", "./data/sample_account.json")
+
+    def _get(self, path, **headers):
+        return web_app.dispatch(self.state, "GET", path, headers={k.replace("_", "-"): v for k, v in headers.items()})
+
+    def test_dashboard_body_is_encoded_once_per_snapshot(self):
+        first = web_app.dashboard_body(self.state.snapshot)
+        self.assertIs(web_app.dashboard_body(self.state.snapshot), first)
+        self.assertEqual(json.loads(first.variants["identity"]),
+                         web_app.dashboard_payload(None, None, snapshot=self.state.snapshot))
+        rebuilt = bot.build_snapshot(self.state.snapshot.rows)
+        self.assertIsNot(web_app.dashboard_body(rebuilt), first)
+        self.assertEqual(web_app.dashboard_body(rebuilt).etag, first.etag)
+
+    def test_other_snapshots_do_not_evict_cached_bodies(self):
+        first = web_app.dashboard_body(self.state.snapshot)
+        for _ in range(10):
+            web_app.dashboard_body(bot.build_snapshot(self.state.snapshot.rows))
+        self.assertTrue(web_app.snapshot_body_cached(self.state.snapshot, "dashboard"))
+        self.assertIs(web_app.dashboard_body(self.state.snapshot), first)
+
+    def test_gzip_variant_and_strong_etag(self):
+        plain = self._get("/")
+        zipped = self._get("/", accept_encoding="br;q=0, gzip, deflate")
+        headers = dict(zipped.headers)
+        self.assertEqual(headers["Content-Encoding"], "gzip")
+        self.assertEqual(headers["Vary"], "Accept-Encoding")
+        self.assertEqual(gzip.decompress(zipped.body), plain.body)
+        self.assertNotEqual(headers["ETag"], dict(plain.headers)["ETag"])
+        self.assertFalse(headers["ETag"].startswith("W/"))
+        self.assertNotIn("Content-Encoding", dict(self._get("/", accept_encoding="gzip;q=0").headers))
+
+    def test_if_none_match_returns_empty_304(self):
+        for path in ("/", "/api/dashboard"):
+            etag = dict(self._get(path, accept_encoding="gzip").headers)["ETag"]
+            cached = self._get(path, if_none_match=f'"stale", {etag}', accept_encoding="gzip")
+            self.assertEqual((cached.status, cached.body), (304, b""))
+            self.assertEqual(dict(cached.headers)["ETag"], etag)
+            self.assertEqual(self._get(path, if_none_match='"stale"').status, 200)
+
+    def test_wsgi_honours_if_none_match(self):
+        from your_application import wsgi
+
+        etag = dict(self._get("/api/dashboard").headers)["ETag"]
+        statuses = []
+        body = b"".join(wsgi.application(
+            {"REQUEST_METHOD": "GET", "PATH_INFO": "/api/dashboard", "HTTP_IF_NONE_MATCH": etag},
+            lambda status, headers: statuses.append(status),
+        ))
+        self.assertEqual((statuses, body), (["304 Not Modified"], b""))
+
+
 if __name__ == "__main__":
     unittest.main()
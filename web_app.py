@@ -2,12 +2,29 @@
 from __future__ import annotations
 
 import argparse
+import gzip
+import hashlib
 import json
 import os
+import threading
+import time
+from datetime import date
 from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path
+from typing import Callable, Dict, List, Mapping, NamedTuple, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
 
 import mvp_pos_insight_bot as bot
+from answer_cache import AnswerCache
+from pos_cache import ColumnCache
+from pos_metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, METRICS, SamplingProfiler, span, timed
+from pos_refresh import DataRefresher, IngestCatalog
+from pos_sqlite import SqliteStore, open_store
+
+try:
+    import brotli
+except ImportError:  # optional: gzip is always offered
+    brotli = None
 
 
 HTML = """<!doctype html>
@@ -44,7 +61,7 @@ HTML = """<!doctype html>
   <div class='hint'>Trust-building mode: ask AI + verify with dashboard numbers side-by-side.</div>
   <div class='layout'>
     <section class='panel'>
-      <div class='hint'>Try: <code>what is my status today?</code>, <code>stores</code>, <code>show store tea-001 status</code>, <code>table</code>, <code>diagram</code>, <code>sms</code></div>
+      <div class='hint'>Try: <code>what is my status today?</code>, <code>stores</code>, <code>show store tea-001 status</code>, <code>table</code>, <code>diagram</code>, <code>sms</code>, <code>prep list</code></div>
       <div class='hint'>Voice: click 🎤 to speak your question, and click 🔊 to enable bot voice replies.</div>
       <div id='chat' class='chat'></div>
       <div class='row'>
@@ -62,6 +79,11 @@ HTML = """<!doctype html>
         <button style='margin-left:auto' onclick='loadDashboard()'>Refresh</button>
       </div>
       <div class='hint'>Use this panel to verify the exact metrics behind AI answers.</div>
+      <div class='row'>
+        <input id='dfrom' type='date' title='From date'/>
+        <input id='dto' type='date' title='To date'/>
+        <input id='dstore' placeholder='Store id (optional)'/>
+      </div>
       <div id='kpis' class='kpis'></div>
       <table>
         <thead>
@@ -118,7 +140,7 @@ async function send(prefilledQ){
   add(q, 'you');
   qInput.value='';
   setStatus('Thinking...');
-  const r = await fetch('/api/chat', {method:'POST', headers:{'Content-Type':'application/json'}, body: JSON.stringify({q})});
+  const r = await fetch('api/chat', {method:'POST', headers:{'Content-Type':'application/json'}, body: JSON.stringify({q})});
   const data = await r.json();
   add(data.answer, 'bot');
   speak(data.answer);
@@ -149,7 +171,12 @@ function startVoiceInput(){
 }
 
 async function loadDashboard(){
-  const r = await fetch('/api/dashboard');
+  const params = new URLSearchParams();
+  [['from', 'dfrom'], ['to', 'dto'], ['store', 'dstore']].forEach(([key, id]) => {
+    const v = document.getElementById(id).value.trim();
+    if(v) params.set(key, v);
+  });
+  const r = await fetch('api/dashboard' + (params.toString() ? '?' + params.toString() : ''));
   const data = await r.json();
 
   const kpis = document.getElementById('kpis');
@@ -188,15 +215,47 @@ loadDashboard();
 """
 
 
-def build_state(data_dir: str, config: str | None):
+class AppState(NamedTuple):
+    account: dict
+    snapshot: bot.AnalyticsSnapshot
+    # Refreshable data source: an IngestCatalog, or a SqliteStore with --sqlite.
+    catalog: Optional[IngestCatalog | SqliteStore] = None
+    # Set when served from a ``tenant_registry.TenantRegistry``.
+    tenant: Optional[str] = None
+
+
+def default_cache_dir(data_dir: str) -> str:
+    return os.getenv("POS_CACHE_DIR") or os.path.join(data_dir, ".pos_cache")
+
+
+def load_state(data_dir: str, config: str | None, cache_dir: str | None = None, workers: int = 1,
+               sqlite_path: str | None = None) -> AppState:
     account = bot.load_account_config(config)
-    rows = bot.normalize(bot.load_rows(data_dir))
-    metrics = bot.metrics(rows)
-    return account, rows, metrics
+    if sqlite_path:
+        store = open_store(sqlite_path, data_dir)
+        return AppState(account, store.snapshot(), store)
+    catalog = IngestCatalog(data_dir, ColumnCache(cache_dir) if cache_dir else None, workers)
+    catalog.refresh()
+    return AppState(account, catalog.snapshot(), catalog)
 
 
-def dashboard_payload(rows: list[dict[str, object]], metrics: dict[str, object]) -> dict:
-    store_map = bot.store_metrics_map(rows)
+def build_state(data_dir: str, config: str | None):
+    """(account, rows, metrics) view of :func:`load_state` for existing callers."""
+    state = load_state(data_dir, config)
+    return state.account, state.snapshot.rows, state.snapshot.metrics
+
+
+def dashboard_payload(rows, metrics, snapshot: bot.AnalyticsSnapshot | None = None,
+                      flt: bot.QueryFilter | None = None) -> dict:
+    flt = flt or bot.QueryFilter()
+    if flt.active():
+        store_map = bot.window_store_metrics(flt, rows, snapshot)
+        metrics = bot.window_metrics(flt, rows, snapshot)
+    elif snapshot is not None:
+        store_map = snapshot.store_metrics
+        metrics = snapshot.metrics
+    else:
+        store_map = bot.store_metrics_map(rows)
     stores = []
     for store_id, sm in store_map.items():
         stores.append({
@@ -217,59 +276,356 @@ def dashboard_payload(rows: list[dict[str, object]], metrics: dict[str, object])
         "waste_ratio": round(float(metrics.get("waste_ratio", 0.0)), 2),
         "top_item": str(metrics.get("top_item", "n/a")),
     }
-    return {"summary": summary, "stores": stores}
+    payload = {"summary": summary, "stores": stores}
+    source = snapshot.rows if snapshot is not None else rows
+    quarantined = len(getattr(source, "quarantine", ()))
+    if quarantined:
+        # Malformed CSV values that were counted as zero/missing; see pos_parse.
+        payload["quarantined_values"] = quarantined
+    duplicates = sum(getattr(source, "duplicates", {}).values())
+    if duplicates:
+        # Lines of overlapping exports that were dropped; see pos_dedup.
+        payload["duplicate_lines"] = duplicates
+    hours = bot.window_hours(flt, rows, snapshot) if snapshot is not None else None
+    if hours:
+        # Hours with timed sales or staffed shifts; see pos_hourly.
+        payload["hourly"] = [
+            {"hour": c.hour, "sales": round(c.sales, 2), "orders": c.orders,
+             "staff_hours": round(c.staff_hours, 2), "labor": round(c.labor, 2)}
+            for c in hours if c.active()
+        ]
+    if snapshot is not None and snapshot.costs is not None:
+        # Labor/waste taken from shift and inventory exports; see pos_costs.
+        payload["cost_sources"] = snapshot.costs.summary()
+    if flt.active():
+        payload["filter"] = {
+            "store": flt.store_id,
+            "from": flt.date_from.isoformat() if flt.date_from else None,
+            "to": flt.date_to.isoformat() if flt.date_to else None,
+        }
+    return payload
+
+
+def forecast_payload(snapshot: bot.AnalyticsSnapshot, store_id: str | None = None,
+                     day: date | None = None) -> dict:
+    """Forecast and prep units per item for one day (default: the day after the data) and store."""
+    forecast = bot.window_forecast(snapshot.rows, snapshot)
+    day = day or forecast.first
+    items = forecast.items(day, store_id) if day is not None else []
+    return {
+        "date": day.isoformat() if day is not None else None,
+        "store": store_id,
+        "days": [d.isoformat() for d in forecast.days()],
+        "history_days": forecast.history,
+        "models": forecast.model_counts(),
+        "items": [{"item": f.item, "forecast": f.units, "prep": f.prep} for f in items],
+    }
+
+
+def query_filter(query_string: str) -> bot.QueryFilter:
+    """``?store=&from=&to=`` dashboard filter; raises ValueError for a bad date."""
+    return bot.filter_from_params({k: v[0] for k, v in parse_qs(query_string).items()})
+
+
+class Response(NamedTuple):
+    status: int
+    headers: List[Tuple[str, str]]
+    body: bytes
+
+
+@timed("serialize")
+def json_response(payload: dict, status: int = 200) -> Response:
+    body = json.dumps(payload).encode("utf-8")
+    return Response(status, [("Content-Type", "application/json"), ("Content-Length", str(len(body)))], body)
+
+
+def health_payload() -> dict:
+    return {
+        "ok": True,
+        "service": "ai-store-assistant-mvp",
+        "render_git_commit": os.getenv("RENDER_GIT_COMMIT", "unknown"),
+        "render_service_id": os.getenv("RENDER_SERVICE_ID", "unknown"),
+    }
+
+
+# Bodies smaller than this are sent uncompressed; the headers would outweigh the savings.
+MIN_COMPRESS_BYTES = 256
+# Preferred first when the client accepts several.
+_ENCODINGS = ("br", "gzip", "identity")
+
+
+class EncodedBody(NamedTuple):
+    """A response body encoded once, with its compressed variants and strong ETag."""
+
+    content_type: str
+    etag: str
+    variants: Dict[str, bytes]
+
+
+def encode_body(body: bytes, content_type: str) -> EncodedBody:
+    variants = {"identity": body}
+    if len(body) >= MIN_COMPRESS_BYTES:
+        variants["gzip"] = gzip.compress(body, compresslevel=6, mtime=0)
+        if brotli is not None:
+            variants["br"] = brotli.compress(body)
+    # Content hash, so every worker process derives the same tag for the same data.
+    return EncodedBody(content_type, hashlib.sha256(body).hexdigest()[:24], variants)
+
+
+def _accepted(accept_encoding: str) -> Dict[str, float]:
+    accepted: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if name:
+            accepted[name.strip().lower()] = q
+    return accepted
+
+
+def _pick_encoding(accept_encoding: str, variants: Mapping[str, bytes]) -> str:
+    accepted = _accepted(accept_encoding)
+    for encoding in _ENCODINGS:
+        if encoding in variants and accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+            return encoding
+    return "identity"
+
+
+def _etag(tag: str, encoding: str) -> str:
+    # Strong tags must differ per representation, so compressed variants get a suffix.
+    return f'"{tag}"' if encoding == "identity" else f'"{tag}-{encoding}"'
+
+
+def _not_modified(if_none_match: str, enc: EncodedBody) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    current = {_etag(enc.etag, encoding) for encoding in enc.variants}
+    # If-None-Match uses weak comparison: a W/ prefix still matches.
+    return any(candidate.strip().removeprefix("W/") in current for candidate in if_none_match.split(","))
+
+
+def encoded_response(enc: EncodedBody, headers: Mapping[str, str]) -> Response:
+    """200 with the best accepted variant, or a bodiless 304 when the client's copy is current."""
+    encoding = _pick_encoding(headers.get("accept-encoding", ""), enc.variants)
+    cache_headers = [("ETag", _etag(enc.etag, encoding)), ("Vary", "Accept-Encoding"), ("Cache-Control", "no-cache")]
+    if _not_modified(headers.get("if-none-match", ""), enc):
+        return Response(304, cache_headers, b"")
+    body = enc.variants[encoding]
+    out = [("Content-Type", enc.content_type), ("Content-Length", str(len(body)))]
+    if encoding != "identity":
+        out.append(("Content-Encoding", encoding))
+    return Response(200, out + cache_headers, body)
+
+
+HTML_BODY = encode_body(HTML.encode("utf-8"), "text/html; charset=utf-8")
+
+def snapshot_body(snapshot: bot.AnalyticsSnapshot, name: str, build: Callable[[], bytes],
+                  content_type: str = "application/json") -> EncodedBody:
+    """``build()`` encoded once per snapshot, kept on the snapshot (so per tenant) until it is replaced."""
+    key = ("body", name)
+    enc = snapshot.derived.get(key)
+    if enc is None:
+        with span("serialize"):
+            enc = snapshot.derived[key] = encode_body(build(), content_type)
+    return enc
+
+
+def snapshot_body_cached(snapshot: bot.AnalyticsSnapshot, name: str) -> bool:
+    """Whether ``snapshot_body(snapshot, name, ...)`` would be served without building it."""
+    return ("body", name) in snapshot.derived
+
+
+def dashboard_body(snapshot: bot.AnalyticsSnapshot) -> EncodedBody:
+    return snapshot_body(snapshot, "dashboard", lambda: json.dumps(
+        dashboard_payload(snapshot.rows, snapshot.metrics, snapshot=snapshot)
+    ).encode("utf-8"))
+
+
+def forecast_body(snapshot: bot.AnalyticsSnapshot) -> EncodedBody:
+    return snapshot_body(snapshot, "forecast", lambda: json.dumps(forecast_payload(snapshot)).encode("utf-8"))
+
+
+# Chat answers keyed by (tenant, snapshot version, bot name, intent, filter); a refresh changes the version.
+ANSWER_CACHE = AnswerCache(
+    maxsize=int(os.getenv("ANSWER_CACHE_SIZE", "1024")),
+    ttl=float(os.getenv("ANSWER_CACHE_TTL", "300")),
+)
+
+
+def chat_answer(state: AppState, q: str) -> Tuple[str, str]:
+    """(answer, intent) for ``q``, served from ``ANSWER_CACHE`` when possible."""
+    snap = state.snapshot
+    bot_name = str(state.account["bot_name"])
+    resolved = bot.resolve_query(q, snap.rows, snap, aliases=state.account.get("store_aliases"))
+    key = (state.tenant, snap.version, bot_name, resolved.intent, resolved.flt)
+    t0 = time.perf_counter()
+    answer = ANSWER_CACHE.get(key)
+    if answer is None:
+        answer = bot.answer(resolved, q, snap.metrics, snap.rows, bot_name, snap)
+        ANSWER_CACHE.put(key, answer)
+        cache = "miss"
+    else:
+        bot.ROUTER.record(resolved.intent)
+        cache = "hit"
+    CHAT_SECONDS.observe(time.perf_counter() - t0, resolved.intent, cache)
+    return answer, resolved.intent
+
+
+def stats_payload() -> dict:
+    return {"answer_cache": ANSWER_CACHE.stats(), "intents": bot.ROUTER.stats()}
+
+
+HTTP_REQUESTS = METRICS.counter("pos_http_requests_total", "HTTP requests by route and status.",
+                                ("method", "route", "status"))
+HTTP_SECONDS = METRICS.histogram("pos_http_request_seconds", "HTTP request latency by route.", ("route",))
+CHAT_SECONDS = METRICS.histogram("pos_chat_seconds", "Chat answer latency by intent and answer cache result.",
+                                 ("intent", "cache"))
+# Routes get their own label; any other path is "other", so scanners cannot grow the label set.
+_ROUTE_LABELS = {p: p for p in ("/", "/healthz", "/metrics", "/api/dashboard", "/api/forecast", "/api/chat",
+                                 "/api/stats")}
+# Opt-in: PROFILE_EVERY=N profiles every Nth request into PROFILE_DIR.
+PROFILER = SamplingProfiler.from_env()
+
+
+@METRICS.collector
+def _app_metrics():
+    yield ("pos_chat_intent_total", "counter", "Chat messages answered per intent.",
+           [({"intent": name}, n) for name, n in sorted(bot.ROUTER.stats().items())])
+    cache = ANSWER_CACHE.stats()
+    yield "pos_answer_cache_entries", "gauge", "Chat answers currently cached.", [({}, cache["size"])]
+    for name in ("hits", "misses", "evictions", "expirations"):
+        yield f"pos_answer_cache_{name}_total", "counter", f"Answer cache {name}.", [({}, cache[name])]
+
+
+def configure_profiler(every: int, out_dir: str, memory: bool = False) -> None:
+    PROFILER.every, PROFILER.out_dir, PROFILER.memory = every, out_dir, memory or PROFILER.memory
+
+
+def metrics_response() -> Response:
+    body = METRICS.render().encode("utf-8")
+    return Response(200, [("Content-Type", METRICS_CONTENT_TYPE), ("Content-Length", str(len(body)))], body)
+
+
+def dispatch(state: AppState, method: str, path: str, query: str = "", body: bytes = b"",
+             headers: Optional[Mapping[str, str]] = None) -> Response:
+    """Serve one request against ``state``; shared by every server front end.
+
+    ``headers`` maps lower-cased request header names to values. Every request
+    is counted and timed per route for ``/metrics``.
+    """
+    route = _ROUTE_LABELS.get(path) or ("/" if path.startswith("/index") else "other")
+    t0 = time.perf_counter()
+    if PROFILER.every:
+        with PROFILER.sample(route):
+            response = _route(state, method, path, query, body, headers or {})
+    else:
+        response = _route(state, method, path, query, body, headers or {})
+    HTTP_SECONDS.observe(time.perf_counter() - t0, route)
+    HTTP_REQUESTS.inc(method, route, str(response.status))
+    return response
+
+
+def _route(state: AppState, method: str, path: str, query: str, body: bytes,
+           headers: Mapping[str, str]) -> Response:
+    if method == "GET" and path == "/healthz":
+        return json_response(health_payload())
+    if method == "GET" and path == "/metrics":
+        return metrics_response()
+    if method == "GET" and path == "/api/dashboard":
+        if not query:
+            return encoded_response(dashboard_body(state.snapshot), headers)
+        try:
+            flt = query_filter(query)
+        except ValueError as exc:
+            return json_response({"error": f"Invalid date: {exc}"}, 400)
+        snap = state.snapshot
+        return json_response(dashboard_payload(snap.rows, snap.metrics, snapshot=snap, flt=flt))
+    if method == "GET" and path == "/api/forecast":
+        if not query:
+            return encoded_response(forecast_body(state.snapshot), headers)
+        params = {k: v[0] for k, v in parse_qs(query).items()}
+        try:
+            day = date.fromisoformat(params["date"]) if params.get("date") else None
+        except ValueError as exc:
+            return json_response({"error": f"Invalid date: {exc}"}, 400)
+        return json_response(forecast_payload(state.snapshot, params.get("store"), day))
+    if method == "GET" and path == "/api/stats":
+        return json_response(stats_payload())
+    if method == "GET" and (path == "/" or path.startswith("/index")):
+        return encoded_response(HTML_BODY, headers)
+    if method == "POST" and path == "/api/chat":
+        try:
+            if body:
+                payload = json.loads(body)
+            else:
+                payload = {k: v[0] for k, v in parse_qs(query).items()}
+            q = str(payload.get("q", "")).strip()
+            if not q:
+                return json_response({"answer": "Please ask a question."}, 400)
+            answer, intent = chat_answer(state, q)
+            return json_response({"answer": answer, "intent": intent})
+        except Exception as exc:
+            return json_response({"answer": f"Error: {exc}"}, 500)
+    return json_response({"error": "Not Found"}, 404)
 
 
 class Handler(BaseHTTPRequestHandler):
     account = None
     rows = None
     metrics = None
-
-    def _json(self, payload: dict, code: int = 200):
-        body = json.dumps(payload).encode()
-        self.send_response(code)
-        self.send_header('Content-Type', 'application/json')
-        self.send_header('Content-Length', str(len(body)))
+    snapshot = None
+    _snapshot_lock = threading.Lock()
+
+    @classmethod
+    def current_snapshot(cls) -> bot.AnalyticsSnapshot:
+        """The snapshot for ``rows``; built once if only rows/metrics were assigned."""
+        snap = cls.snapshot
+        if snap is not None and (cls.rows is None or snap.rows is cls.rows):
+            return snap
+        with cls._snapshot_lock:
+            snap = cls.snapshot
+            if snap is None or (cls.rows is not None and snap.rows is not cls.rows):
+                snap = cls.snapshot = bot.build_snapshot(cls.rows, cls.metrics)
+        return snap
+
+    @classmethod
+    def publish(cls, snapshot: bot.AnalyticsSnapshot) -> None:
+        """Swap in a new snapshot; requests already holding the old one are unaffected."""
+        with cls._snapshot_lock:
+            cls.rows = snapshot.rows
+            cls.metrics = snapshot.metrics
+            cls.snapshot = snapshot
+
+    def _send(self, response: Response) -> None:
+        self.send_response(response.status)
+        for name, value in response.headers:
+            self.send_header(name, value)
         self.end_headers()
-        self.wfile.write(body)
+        if response.body:
+            self.wfile.write(response.body)
+
+    def _dispatch(self, method: str, body: bytes = b"") -> None:
+        url = urlsplit(self.path)
+        state = AppState(self.account, self.current_snapshot())
+        headers = {name.lower(): value for name, value in self.headers.items()}
+        self._send(dispatch(state, method, url.path, url.query, body, headers))
 
     def do_GET(self):
-        if self.path == '/healthz':
-            self._json({
-                'ok': True,
-                'service': 'ai-store-assistant-mvp',
-                'render_git_commit': os.getenv('RENDER_GIT_COMMIT', 'unknown'),
-                'render_service_id': os.getenv('RENDER_SERVICE_ID', 'unknown'),
-            })
-            return
-        if self.path == '/api/dashboard':
-            self._json(dashboard_payload(self.rows, self.metrics))
-            return
-        if self.path == '/' or self.path.startswith('/index'):
-            content = HTML.encode()
-            self.send_response(200)
-            self.send_header('Content-Type', 'text/html; charset=utf-8')
-            self.send_header('Content-Length', str(len(content)))
-            self.end_headers()
-            self.wfile.write(content)
-            return
-        self.send_error(404)
+        self._dispatch('GET')
 
     def do_POST(self):
-        if self.path != '/api/chat':
-            self.send_error(404)
-            return
         try:
             length = int(self.headers.get('Content-Length', '0'))
-            payload = json.loads(self.rfile.read(length) or b'{}')
-            q = str(payload.get('q', '')).strip()
-            if not q:
-                self._json({'answer': 'Please ask a question.'}, 400)
-                return
-            answer = bot.respond(q, self.metrics, self.rows, str(self.account['bot_name']))
-            self._json({'answer': answer})
-        except Exception as exc:
-            self._json({'answer': f'Error: {exc}'}, 500)
+        except ValueError:
+            length = 0
+        self._dispatch('POST', self.rfile.read(length) if length > 0 else b'')
 
 
 def main():
@@ -278,12 +634,26 @@ def main():
     p.add_argument('--config', default='./data/sample_account.json')
     p.add_argument('--host', default='0.0.0.0')
     p.add_argument('--port', type=int, default=8000)
+    p.add_argument('--refresh-interval', type=float, default=0,
+                   help='Seconds between data dir polls for new/changed CSVs (0 disables)')
+    p.add_argument('--cache-dir', help='Normalized column cache dir (default: POS_CACHE_DIR or <data-dir>/.pos_cache)')
+    p.add_argument('--no-cache', action='store_true', help='Always parse CSVs; do not read or write the column cache')
+    p.add_argument('--workers', type=int, default=1, help='Parse CSV files in N processes')
+    p.add_argument('--sqlite', help='Serve KPIs from this SQLite database (sql/schema.sql), synced from --data-dir')
+    p.add_argument('--profile-every', type=int, default=PROFILER.every,
+                   help='cProfile every Nth request into --profile-dir (0 disables; default PROFILE_EVERY)')
+    p.add_argument('--profile-dir', default=PROFILER.out_dir)
+    p.add_argument('--profile-memory', action='store_true', help='Also dump tracemalloc top allocations per sample')
     args = p.parse_args()
-
-    account, rows, metrics = build_state(args.data_dir, args.config if Path(args.config).exists() else None)
-    Handler.account = account
-    Handler.rows = rows
-    Handler.metrics = metrics
+    configure_profiler(args.profile_every, args.profile_dir, args.profile_memory)
+
+    cache_dir = None if args.no_cache else (args.cache_dir or default_cache_dir(args.data_dir))
+    state = load_state(args.data_dir, args.config if Path(args.config).exists() else None, cache_dir, args.workers,
+                       args.sqlite)
+    Handler.account = state.account
+    Handler.publish(state.snapshot)
+    if args.refresh_interval > 0:
+        DataRefresher(state.catalog, Handler.publish, args.refresh_interval).start()
 
     server = ThreadingHTTPServer((args.host, args.port), Handler)
     print(f"Serving on http://{args.host}:{args.port}")
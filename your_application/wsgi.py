@@ -1,65 +1,64 @@
 from __future__ import annotations
 
-import json
 import os
+from http import HTTPStatus
 from pathlib import Path
 from typing import Iterable
-from urllib.parse import parse_qs
 
-import mvp_pos_insight_bot as bot
-from web_app import HTML, build_state
+from pos_metrics import METRICS
+from pos_refresh import DataRefresher
+from tenant_registry import TenantRegistry, tenant_dispatch
+from web_app import default_cache_dir, dispatch, load_state
 
 DATA_DIR = os.getenv("DATA_DIR", "./data")
 CONFIG_PATH = os.getenv("ACCOUNT_CONFIG", "./data/sample_account.json")
+REFRESH_SECONDS = float(os.getenv("DATA_REFRESH_SECONDS", "0"))
+# Shared by all workers: each maps the same read-only cache files. POS_CACHE=0 disables.
+CACHE_DIR = default_cache_dir(DATA_DIR) if os.getenv("POS_CACHE", "1") != "0" else None
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "1"))
+SQLITE_PATH = os.getenv("SQLITE_PATH") or None
+# Multi-tenant mode: one directory per tenant under TENANTS_ROOT, loaded on first request.
+TENANTS_ROOT = os.getenv("TENANTS_ROOT") or None
+TENANT_MEMORY_MB = int(os.getenv("TENANT_MEMORY_MB", "512"))
 
-_account, _rows, _metrics = build_state(DATA_DIR, CONFIG_PATH if Path(CONFIG_PATH).exists() else None)
+_state = None
+_registry = None
+if TENANTS_ROOT:
+    _registry = TenantRegistry(TENANTS_ROOT, TENANT_MEMORY_MB * 1024 * 1024, REFRESH_SECONDS,
+                               cache_root=os.getenv("POS_CACHE_DIR"), use_cache=os.getenv("POS_CACHE", "1") != "0",
+                               workers=INGEST_WORKERS)
+    METRICS.collector(_registry.collect)
+else:
+    _state = load_state(DATA_DIR, CONFIG_PATH if Path(CONFIG_PATH).exists() else None, CACHE_DIR, INGEST_WORKERS,
+                        SQLITE_PATH)
 
 
-def _json(start_response, payload: dict, status: str = "200 OK") -> list[bytes]:
-    body = json.dumps(payload).encode("utf-8")
-    start_response(status, [
-        ("Content-Type", "application/json"),
-        ("Content-Length", str(len(body))),
-    ])
-    return [body]
+def _publish(snapshot) -> None:
+    # Rebinding the module global is atomic; each request reads _state once.
+    global _state
+    _state = _state._replace(snapshot=snapshot)
 
 
-def application(environ, start_response) -> Iterable[bytes]:
-    method = environ.get("REQUEST_METHOD", "GET")
-    path = environ.get("PATH_INFO", "/")
-
-    if method == "GET" and path == "/healthz":
-        return _json(start_response, {
-            "ok": True,
-            "service": "ai-store-assistant-mvp",
-            "render_git_commit": os.getenv("RENDER_GIT_COMMIT", "unknown"),
-            "render_service_id": os.getenv("RENDER_SERVICE_ID", "unknown"),
-        })
+if _state is not None and REFRESH_SECONDS > 0:
+    DataRefresher(_state.catalog, _publish, REFRESH_SECONDS).start()
 
-    if method == "GET" and (path == "/" or path.startswith("/index")):
-        body = HTML.encode("utf-8")
-        start_response("200 OK", [
-            ("Content-Type", "text/html; charset=utf-8"),
-            ("Content-Length", str(len(body))),
-        ])
-        return [body]
 
-    if method == "POST" and path == "/api/chat":
-        try:
-            length = int(environ.get("CONTENT_LENGTH") or "0")
-        except ValueError:
-            length = 0
-        raw = environ.get("wsgi.input").read(length) if length else b""
-        payload = {}
-        if raw:
-            payload = json.loads(raw.decode("utf-8"))
-        elif environ.get("QUERY_STRING"):
-            payload = {k: v[0] for k, v in parse_qs(environ["QUERY_STRING"]).items()}
-        q = str(payload.get("q", "")).strip()
-        if not q:
-            return _json(start_response, {"answer": "Please ask a question."}, "400 Bad Request")
+def _request_headers(environ) -> dict:
+    headers = {key[5:].replace("_", "-").lower(): value for key, value in environ.items() if key.startswith("HTTP_")}
+    if environ.get("CONTENT_TYPE"):
+        headers["content-type"] = environ["CONTENT_TYPE"]
+    return headers
 
-        answer = bot.respond(q, _metrics, _rows, str(_account["bot_name"]))
-        return _json(start_response, {"answer": answer})
 
-    return _json(start_response, {"error": "Not Found"}, "404 Not Found")
+def application(environ, start_response) -> Iterable[bytes]:
+    state = _state
+    method = environ.get("REQUEST_METHOD", "GET")
+    try:
+        length = int(environ.get("CONTENT_LENGTH") or "0")
+    except ValueError:
+        length = 0
+    body = environ["wsgi.input"].read(length) if length > 0 else b""
+    args = (method, environ.get("PATH_INFO", "/"), environ.get("QUERY_STRING", ""), body, _request_headers(environ))
+    response = tenant_dispatch(_registry, *args) if _registry is not None else dispatch(state, *args)
+    start_response(f"{response.status} {HTTPStatus(response.status).phrase}", response.headers)
+    return [response.body]